@@ -0,0 +1,243 @@
+# Контроль нагрузки на дорогие и пишущие маршруты.
+# Для каждого клиента (пользователь или IP) и эндпоинта — token bucket:
+# корзина на burst запросов пополняется со скоростью rate в секунду.
+# Если корзина пуста — сразу 429 с Retry-After, без очереди. Тяжёлые
+# маршруты дополнительно ограничены числом одновременных запросов
+# в процессе — при превышении 503.
+# Счётчики по умолчанию в памяти процесса (ADMISSION_BACKEND=memory);
+# 'database' хранит их в таблице rate_limit_bucket, тогда лимиты общие
+# для всех воркеров; 'shared' — счётчики в общем хранилище (shared_state.py),
+# общие и для нескольких машин.
+# Анонимные клиенты различаются по IP: за обратным прокси нужно указать
+# TRUSTED_PROXIES, иначе у всех будет адрес прокси и одна корзина на всех
+from flask import request, Response, g
+from flask_login import current_user
+from collections import OrderedDict, namedtuple, defaultdict
+from sqlalchemy import case
+import threading
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+# rate — токенов в секунду, burst — ёмкость корзины, methods — какие запросы считать
+Rule = namedtuple('Rule', 'rate burst methods')
+
+DEFAULT_RULES = {
+    'auth.login': Rule(10 / 60, 10, ('POST',)),
+    'auth.register': Rule(5 / 3600, 5, ('POST',)),
+    'chat.chat': Rule(1, 5, ('POST',)),
+    'memes.memes_page': Rule(10 / 60, 5, ('POST',)),
+    'search.search': Rule(2, 10, ('GET',)),
+    # Подсказки запрашиваются на каждое нажатие клавиши, но стоят микросекунды
+    'search.suggest': Rule(10, 30, ('GET',)),
+}
+# Маршруты, которые грузят базу или диск: поиск и загрузка картинок
+EXPENSIVE_ENDPOINTS = {'search.search', 'memes.memes_page'}
+MAX_CONCURRENT = 8
+
+
+class MemoryBuckets:
+    name = 'memory'
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Возвращает 0, если токен выдан, иначе через сколько секунд он появится
+    def take(self, key, rate, burst, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                retry_after = 0
+            else:
+                self._buckets[key] = (tokens, now)
+                retry_after = (1 - tokens) / rate
+            self._buckets.move_to_end(key)
+            # Самые давние корзины к этому времени всё равно полные
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+    def cleanup(self, older_than):
+        pass
+
+
+# Одна корзина — одна строка; проверка и списание — один UPSERT,
+# поэтому параллельные воркеры не выдают лишних токенов
+class DatabaseBuckets:
+    name = 'database'
+
+    def __init__(self, db, model, cleanup_every=1000):
+        self.db = db
+        self.model = model
+        self.cleanup_every = cleanup_every
+        self._calls = 0
+
+    def take(self, key, rate, burst, now=None):
+        from uploads import upsert
+        now = time.time() if now is None else now
+        table = self.model.__table__
+        refilled = table.c.tokens + (now - table.c.updated_at) * rate
+        available = case((refilled > burst, burst), else_=refilled)
+        statement = (
+            upsert(self.model)
+            .values(key=key, tokens=burst - 1, updated_at=now)
+            .on_conflict_do_update(index_elements=[table.c.key],
+                                   set_={'tokens': available - 1, 'updated_at': now},
+                                   where=available >= 1)
+            .returning(table.c.tokens)
+        )
+        with self.db.engine.begin() as conn:
+            if conn.execute(statement).first() is not None:
+                return 0
+            row = conn.execute(
+                self.db.select(table.c.tokens, table.c.updated_at).where(table.c.key == key)).first()
+        if row is None:
+            return 0
+        tokens = min(burst, row.tokens + (now - row.updated_at) * rate)
+        return max((1 - tokens) / rate, 0.001)
+
+    # Корзина, не тронутая дольше времени полного пополнения, равна новой — её можно удалить
+    def cleanup(self, older_than):
+        self._calls += 1
+        if self._calls % self.cleanup_every:
+            return
+        table = self.model.__table__
+        with self.db.engine.begin() as conn:
+            conn.execute(table.delete().where(table.c.updated_at < time.time() - older_than))
+
+
+# Общее хранилище даёт только атомарный инкремент, поэтому корзина заменена
+# окном длиной burst/rate секунд, в котором разрешено burst запросов:
+# средняя скорость та же, на стыке двух окон пик до 2*burst
+class SharedBuckets:
+    name = 'shared'
+
+    def __init__(self, store):
+        self.store = store
+
+    def take(self, key, rate, burst, now=None):
+        now = time.time() if now is None else now
+        window = burst / rate
+        slot = int(now // window)
+        if self.store.incr(f'ratelimit:{key}:{slot}', ttl=window * 2) <= burst:
+            return 0
+        return max((slot + 1) * window - now, 0.001)
+
+    # Счётчики окон истекают в хранилище сами
+    def cleanup(self, older_than):
+        pass
+
+
+def create_bucket_store(name, db=None, model=None, store=None):
+    if name == 'database':
+        return DatabaseBuckets(db, model)
+    if name == 'shared':
+        return SharedBuckets(store)
+    if name != 'memory':
+        logger.warning(f"Неизвестный ADMISSION_BACKEND={name!r}, используется memory")
+    return MemoryBuckets()
+
+
+def client_key():
+    if current_user.is_authenticated:
+        return f'user:{current_user.id}'
+    return f'ip:{request.remote_addr}'
+
+
+def reject(status, message, retry_after):
+    response = Response(message, status)
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+class AdmissionControl:
+    def __init__(self, app=None, db=None):
+        self.rules = dict(DEFAULT_RULES)
+        self.expensive = set(EXPENSIVE_ENDPOINTS)
+        self.buckets = MemoryBuckets()
+        self.idle_after = 3600
+        self.enabled = False
+        self._slots = threading.BoundedSemaphore(MAX_CONCURRENT)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.throttled = defaultdict(int)
+        self.shed = defaultdict(int)
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db=None):
+        self.enabled = app.config.get('ADMISSION_ENABLED', True)
+        if not self.enabled:
+            return
+        from models import RateLimitBucket
+        # Правила собираются заново, а не дополняются: настройки прошлого приложения не наследуются
+        self.rules = {**DEFAULT_RULES, **app.config.get('ADMISSION_RULES', {})}
+        self.buckets = create_bucket_store(app.config.get('ADMISSION_BACKEND', 'memory'), db, RateLimitBucket,
+                                           app.extensions['services'].shared_state)
+        self._slots = threading.BoundedSemaphore(app.config.get('ADMISSION_MAX_CONCURRENT', MAX_CONCURRENT))
+        self.idle_after = max(rule.burst / rule.rate for rule in self.rules.values())
+
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    # 0 — токен выдан, иначе через сколько секунд повторить
+    def take(self, endpoint, key):
+        rule = self.rules[endpoint]
+        retry_after = self.buckets.take(f'{endpoint}:{key}', rule.rate, rule.burst)
+        self.buckets.cleanup(self.idle_after)
+        if retry_after:
+            with self._lock:
+                self.throttled[endpoint] += 1
+            return math.ceil(retry_after)
+        return 0
+
+    def acquire(self, endpoint):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.shed[endpoint] += 1
+            return False
+        with self._lock:
+            self.in_flight += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def applies(self, endpoint, method):
+        rule = self.rules.get(endpoint)
+        return rule is not None and method in rule.methods
+
+    def _before_request(self):
+        if not self.applies(request.endpoint, request.method):
+            return None
+        retry_after = self.take(request.endpoint, client_key())
+        if retry_after:
+            return reject(429, 'Слишком много запросов, попробуйте позже', retry_after)
+        if request.endpoint in self.expensive:
+            if not self.acquire(request.endpoint):
+                return reject(503, 'Сервер перегружен, попробуйте через несколько секунд', 1)
+            g.admission_slot = True
+        return None
+
+    def _teardown_request(self, exc):
+        if g.pop('admission_slot', False):
+            self.release()
+
+    # Значения для /metrics
+    def metrics(self):
+        with self._lock:
+            metrics = {'admission_in_flight': self.in_flight}
+            for endpoint, count in self.throttled.items():
+                metrics[f"admission_throttled_{endpoint.replace('.', '_')}"] = count
+            for endpoint, count in self.shed.items():
+                metrics[f"admission_shed_{endpoint.replace('.', '_')}"] = count
+        return metrics
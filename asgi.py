@@ -0,0 +1,219 @@
+# ASGI-точка входа для продакшена:
+#   uvicorn asgi:application --host 0.0.0.0 --workers 4
+# Маршруты, которые в основном ждут ввода-вывода (поток чата, загрузка мемов),
+# обслуживаются корутинами; все остальные — прежнее Flask-приложение,
+# которое a2wsgi выполняет в пуле потоков. Новости обновляются через
+# httpx.AsyncClient с переиспользованием соединения
+from starlette.applications import Starlette
+from starlette.responses import StreamingResponse, RedirectResponse, PlainTextResponse
+from starlette.routing import Route, Mount
+from starlette.requests import Request
+from itsdangerous import BadSignature
+from a2wsgi import WSGIMiddleware
+from functools import partial
+import contextlib
+import asyncio
+import httpx
+
+from app import create_app
+from models import messages_after, latest_message_id
+from uploads import allowed_file, sniff_image, record_upload
+from views.memes import add_meme
+from chat_broadcast import AsyncHub, DatabaseBroadcaster, async_event_stream, poll_database
+from news_cache import fetch_news_async
+from server_sessions import SharedSessionInterface
+from extensions import instrumentation, admission
+
+# Поток чата здесь асинхронный и не занимает потоки, страница чата подключается к нему
+flask_app = create_app({'CHAT_STREAM': True})
+services = flask_app.extensions['services']
+hub = AsyncHub()
+
+
+def in_app_context(fn, *args):
+    with flask_app.app_context():
+        return fn(*args)
+
+
+# Сессия Flask (подписанная cookie или id в общем хранилище) читается и пишется
+# напрямую, чтобы асинхронные маршруты видели вход пользователя и могли оставить flash
+def load_session(request):
+    cookie = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if isinstance(flask_app.session_interface, SharedSessionInterface):
+        return flask_app.session_interface.load(flask_app, cookie)
+    if not cookie:
+        return {}
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    try:
+        return serializer.loads(cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return {}
+
+
+def save_session(response, session):
+    if isinstance(flask_app.session_interface, SharedSessionInterface):
+        value = flask_app.session_interface.dump(flask_app, session)
+    else:
+        value = flask_app.session_interface.get_signing_serializer(flask_app).dumps(session)
+    response.set_cookie(
+        flask_app.config['SESSION_COOKIE_NAME'], value,
+        path=flask_app.config['SESSION_COOKIE_PATH'] or '/',
+        httponly=flask_app.config['SESSION_COOKIE_HTTPONLY'],
+        secure=flask_app.config['SESSION_COOKIE_SECURE'],
+        samesite=flask_app.config['SESSION_COOKIE_SAMESITE'],
+    )
+
+
+# Адрес клиента по тем же правилам, что ProxyFix в create_app: берём
+# TRUSTED_PROXIES-й адрес с конца X-Forwarded-For, остальное мог подставить клиент
+def client_ip(request):
+    trusted = flask_app.config['TRUSTED_PROXIES']
+    forwarded = [ip.strip() for ip in request.headers.get('x-forwarded-for', '').split(',') if ip.strip()]
+    if trusted and len(forwarded) >= trusted:
+        return forwarded[-trusted]
+    return request.client.host
+
+
+def flash(session, message):
+    session.setdefault('_flashes', []).append(('message', message))
+
+
+async def fetch_after(after_id):
+    return await asyncio.to_thread(in_app_context, messages_after, after_id)
+
+
+# Поток чата: ожидание новых сообщений — это future в цикле событий, а не поток.
+# Вход по remember-cookie здесь не восстанавливается: страница чата, загруженная
+# через Flask, обновит сессию, и EventSource переподключится уже с ней
+async def chat_stream(request):
+    if not load_session(request).get('_user_id'):
+        return PlainTextResponse('Требуется вход', 401)
+    try:
+        after_id = int(request.headers.get('last-event-id') or request.query_params.get('after_id') or 0)
+    except ValueError:
+        after_id = 0
+    return StreamingResponse(async_event_stream(hub, fetch_after, after_id), media_type='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+def save_meme(stored, description):
+    with flask_app.app_context():
+        record_upload(stored)
+        add_meme(stored.relpath, description)
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+# Счётчик байт тела поверх receive: лимит соблюдается и без Content-Length
+# (chunked), и если заголовок занижен
+def limit_body(receive, limit):
+    received = 0
+
+    async def limited_receive():
+        nonlocal received
+        message = await receive()
+        if message['type'] == 'http.request':
+            received += len(message.get('body', b''))
+            if received > limit:
+                raise BodyTooLarge()
+        return message
+    return limited_receive
+
+
+# Загрузка мема: тело запроса читается асинхронно, медленный клиент не держит поток
+async def memes_upload(request):
+    session = load_session(request)
+    endpoint = 'memes.memes_page'
+    if admission.enabled:
+        client = f"user:{session['_user_id']}" if session.get('_user_id') else f'ip:{client_ip(request)}'
+        retry_after = await asyncio.to_thread(in_app_context, admission.take, endpoint, client)
+        if retry_after:
+            return PlainTextResponse('Слишком много запросов, попробуйте позже', 429,
+                                     headers={'Retry-After': str(retry_after)})
+
+    limit = flask_app.config['UPLOAD_LIMITS'][endpoint]
+    length = request.headers.get('content-length')
+    if length is not None:
+        if not length.isdigit():
+            return PlainTextResponse('Некорректный Content-Length', 400)
+        if int(length) > limit:
+            return PlainTextResponse('Файл слишком большой', 413)
+
+    # Тот же лимит одновременных тяжёлых запросов, что и у WSGI-маршрута
+    expensive = admission.enabled and endpoint in admission.expensive
+    if expensive and not admission.acquire(endpoint):
+        return PlainTextResponse('Сервер перегружен, попробуйте через несколько секунд', 503,
+                                 headers={'Retry-After': '1'})
+    try:
+        return await save_upload(Request(request.scope, limit_body(request.receive, limit)), session)
+    except BodyTooLarge:
+        return PlainTextResponse('Файл слишком большой', 413)
+    finally:
+        if expensive:
+            admission.release()
+
+
+async def save_upload(request, session):
+    async with request.form(max_files=1) as form:
+        file = form.get('file')
+        description = form.get('description')
+        if not file or not getattr(file, 'filename', None):
+            message = 'Файл не выбран'
+        elif not description:
+            message = 'Описание не может быть пустым'
+        elif not allowed_file(file.filename):
+            message = 'Недопустимый формат файла'
+        else:
+            try:
+                stored = await services.upload_store.save_async(file, sniff=sniff_image)
+                await asyncio.to_thread(save_meme, stored, description)
+                message = 'Мем добавлен успешно!'
+            except Exception as e:
+                message = f'Ошибка загрузки файла: {e}'
+
+    response = RedirectResponse('/memes', status_code=302)
+    flash(session, message)
+    save_session(response, session)
+    return response
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_):
+    loop = asyncio.get_running_loop()
+    hub.attach(loop)
+    tasks = []
+
+    broadcaster = services.chat_broadcaster
+    if isinstance(broadcaster, DatabaseBroadcaster):
+        tasks.append(asyncio.create_task(poll_database(
+            hub,
+            partial(in_app_context, messages_after),
+            partial(in_app_context, latest_message_id),
+            flask_app.config['CHAT_POLL_INTERVAL'],
+        )))
+    else:
+        broadcaster.subscribe(hub.publish)
+
+    async with httpx.AsyncClient(follow_redirects=True) as client:
+        news_cache = services.news_cache
+        fetch = instrumentation.timed_outbound('tass', partial(fetch_news_async, client))
+        news_cache.attach_loop(loop, fetch)
+        tasks.append(asyncio.create_task(news_cache.run_async()))
+        try:
+            yield
+        finally:
+            news_cache.stop()
+            for task in tasks:
+                task.cancel()
+            services.credentials.shutdown(wait=False)
+
+
+application = Starlette(routes=[
+    Route('/chat/stream', chat_stream, methods=['GET']),
+    Route('/memes', memes_upload, methods=['POST']),
+    Mount('/', app=WSGIMiddleware(flask_app, workers=flask_app.config['ASGI_WSGI_THREADS'])),
+], lifespan=lifespan)
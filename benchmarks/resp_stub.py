@@ -0,0 +1,173 @@
+# Локальная замена Redis для проверки STATE_BACKEND=resp без внешнего сервера:
+# в памяти, только команды, которые использует shared_state.RespStateStore.
+#   python -m benchmarks.resp_stub 6379
+from socketserver import ThreadingTCPServer, StreamRequestHandler
+import threading
+import time
+import sys
+import re
+
+
+class RespStubServer(ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, RespStubHandler)
+        self.data = {}  # ключ -> (значение, срок или None)
+        self.channels = {}  # канал -> множество обработчиков
+        self.lock = threading.Lock()
+
+    def live(self, key):
+        item = self.data.get(key)
+        if item is not None and item[1] is not None and item[1] < time.time():
+            del self.data[key]
+            return None
+        return item
+
+
+# Шаблон SCAN MATCH: * и ?, экранирование обратной косой; классов [...] клиент не шлёт
+def glob_to_regex(pattern):
+    parts, escaped = [], False
+    for char in pattern:
+        if escaped:
+            parts.append(re.escape(char))
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char == '*':
+            parts.append('.*')
+        elif char == '?':
+            parts.append('.')
+        else:
+            parts.append(re.escape(char))
+    return re.compile(''.join(parts) + r'\Z', re.S)
+
+
+def encode(value):
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, str):
+        return f'+{value}\r\n'.encode()
+    if isinstance(value, list):
+        return b'*%d\r\n' % len(value) + b''.join(encode(item) for item in value)
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+class RespStubHandler(StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.write_lock = threading.Lock()
+
+    def send(self, value):
+        with self.write_lock:
+            self.wfile.write(encode(value))
+            self.wfile.flush()
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            size = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def handle(self):
+        server = self.server
+        try:
+            while True:
+                args = self.read_command()
+                if args is None:
+                    break
+                command = args[0].upper().decode()
+                handler = getattr(self, f'cmd_{command.lower()}', None)
+                if handler is None:
+                    with self.write_lock:
+                        self.wfile.write(f'-ERR unknown command {command}\r\n'.encode())
+                        self.wfile.flush()
+                    continue
+                with server.lock:
+                    reply = handler(*args[1:])
+                if reply is not NotImplemented:
+                    self.send(reply)
+        except (OSError, ValueError):
+            pass
+        finally:
+            with server.lock:
+                for handlers in server.channels.values():
+                    handlers.discard(self)
+
+    def cmd_ping(self, *args):
+        return 'PONG'
+
+    def cmd_select(self, db):
+        return 'OK'
+
+    def cmd_auth(self, *args):
+        return 'OK'
+
+    def cmd_get(self, key):
+        item = self.server.live(key)
+        return item[0] if item else None
+
+    def cmd_set(self, key, value, *options):
+        expires = None
+        if options and options[0].upper() == b'PX':
+            expires = time.time() + int(options[1]) / 1000
+        self.server.data[key] = (value, expires)
+        return 'OK'
+
+    def cmd_del(self, *keys):
+        return sum(self.server.data.pop(key, None) is not None for key in keys)
+
+    def cmd_incrby(self, key, amount):
+        item = self.server.live(key)
+        value = int(item[0] if item else 0) + int(amount)
+        self.server.data[key] = (str(value).encode(), item[1] if item else None)
+        return value
+
+    def cmd_pexpire(self, key, ms):
+        item = self.server.live(key)
+        if item is None:
+            return 0
+        self.server.data[key] = (item[0], time.time() + int(ms) / 1000)
+        return 1
+
+    # Курсор не нужен: все подходящие ключи за один вызов
+    def cmd_scan(self, cursor, *options):
+        pattern = glob_to_regex('*')
+        if len(options) >= 2 and options[0].upper() == b'MATCH':
+            pattern = glob_to_regex(options[1].decode())
+        keys = [key for key in list(self.server.data)
+                if self.server.live(key) and pattern.match(key.decode())]
+        return [b'0', keys]
+
+    def cmd_publish(self, channel, message):
+        handlers = list(self.server.channels.get(channel, ()))
+        for handler in handlers:
+            handler.send([b'message', channel, message])
+        return len(handlers)
+
+    def cmd_subscribe(self, *channels):
+        for channel in channels:
+            handlers = self.server.channels.setdefault(channel, set())
+            handlers.add(self)
+            self.send([b'subscribe', channel, len(handlers)])
+        return NotImplemented
+
+
+# Запускает сервер в фоновом потоке и возвращает (сервер, STATE_URL)
+def start_resp_stub(host='127.0.0.1', port=0):
+    server = RespStubServer((host, port))
+    threading.Thread(target=server.serve_forever, name='resp-stub', daemon=True).start()
+    return server, f'redis://{host}:{server.server_address[1]}/0'
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 6379
+    print(f'RESP-заглушка на 127.0.0.1:{port}')
+    RespStubServer(('127.0.0.1', port)).serve_forever()
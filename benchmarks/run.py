@@ -0,0 +1,262 @@
+# Нагрузочный бенчмарк всех основных маршрутов.
+#
+#   python -m benchmarks.run                          # тестовый клиент Flask
+#   python -m benchmarks.run --mode http -c 16        # настоящий HTTP, 16 потоков
+#   python -m benchmarks.run --save before            # сохранить базовую линию
+#   python -m benchmarks.run --compare before         # сравнить с сохранённой
+#
+# База SQLite наполняется заново во временном каталоге, лента ТАСС
+# подменяется локальной заглушкой
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+import http.client
+import threading
+import argparse
+import platform
+import tempfile
+import json
+import time
+import sys
+import os
+import re
+
+from benchmarks.seed import seed_database, BENCH_PASSWORD, DEFAULT_VOLUMES
+from benchmarks.stub_server import start_stub_server
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'baselines')
+
+# (имя, метод, путь, данные формы, нужна ли авторизация)
+ROUTES = [
+    ('index', 'GET', '/', None, False),
+    ('search', 'GET', '/search?' + urlencode({'q': 'засуха ледники'}), None, False),
+    ('chat', 'GET', '/chat', None, True),
+    ('diary', 'GET', '/diary', None, True),
+    ('memes', 'GET', '/memes', None, False),
+    ('bot', 'GET', '/bot', None, False),
+    ('bot_ask', 'POST', '/bot', {'question': 'что такое засуха и ледники'}, False),
+    ('login_form', 'GET', '/login', None, False),
+    ('login', 'POST', '/login', {'username': 'bench_user_0', 'password': BENCH_PASSWORD}, False),
+]
+
+_queries_re = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, queries, wall_time):
+    return {
+        'requests': len(latencies),
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        'rps': len(latencies) / wall_time if wall_time else 0.0,
+        'queries': sum(queries) / len(queries) if queries else None,
+    }
+
+
+def query_count(server_timing):
+    match = _queries_re.search(server_timing or '')
+    return int(match.group(1)) if match else None
+
+
+def prepare_app(volumes, workdir):
+    _, news_url = start_stub_server()
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'NEWS_URL': news_url,
+        'NEWS_CACHE_FILE': '',
+        'INSTRUMENTATION_ENABLED': '1',
+        # Нагрузочный прогон сам упирается в лимиты — меряем маршруты, а не ограничитель
+        'ADMISSION_ENABLED': '0',
+    })
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+    from app import create_app
+    from extensions import db
+
+    app = create_app({'TESTING': True})
+    services = app.extensions['services']
+    # В репозитории шаблоны лежат рядом с app.py, а не в templates/
+    if not os.path.isdir(os.path.join(app.root_path, app.template_folder)):
+        app.template_folder = app.root_path
+
+    with app.app_context():
+        db.create_all()
+        services.search_backend.ensure_schema()
+        seed_database(volumes)
+    services.news_cache.refresh()
+    return app
+
+
+def run_client(app, routes, requests_per_route):
+    clients = {False: app.test_client(), True: app.test_client()}
+    clients[True].post('/login', data={'username': 'bench_user_1', 'password': BENCH_PASSWORD})
+
+    results = {}
+    for name, method, path, data, auth in routes:
+        client = clients[auth]
+        client.open(path, method=method, data=data)  # прогрев
+        latencies, queries = [], []
+        started = time.perf_counter()
+        for _ in range(requests_per_route):
+            t0 = time.perf_counter()
+            response = client.open(path, method=method, data=data)
+            latencies.append(time.perf_counter() - t0)
+            count = query_count(response.headers.get('Server-Timing'))
+            if count is not None:
+                queries.append(count)
+            response.close()
+        results[name] = summarize(latencies, queries, time.perf_counter() - started)
+    return results
+
+
+def _http_request(port, method, path, data=None, cookie=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    headers = {}
+    body = None
+    if data is not None:
+        body = urlencode(data)
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    if cookie:
+        headers['Cookie'] = cookie
+    try:
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response
+    finally:
+        conn.close()
+
+
+def run_http(app, routes, requests_per_route, concurrency):
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-server', daemon=True).start()
+    port = server.server_port
+
+    login = _http_request(port, 'POST', '/login', {'username': 'bench_user_1', 'password': BENCH_PASSWORD})
+    cookie = (login.getheader('Set-Cookie') or '').split(';', 1)[0]
+
+    results = {}
+    try:
+        for name, method, path, data, auth in routes:
+            _http_request(port, method, path, data, cookie if auth else None)  # прогрев
+
+            def one(_):
+                t0 = time.perf_counter()
+                response = _http_request(port, method, path, data, cookie if auth else None)
+                return time.perf_counter() - t0, query_count(response.getheader('Server-Timing'))
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as pool:
+                samples = list(pool.map(one, range(requests_per_route)))
+            wall = time.perf_counter() - started
+            results[name] = summarize(
+                [s[0] for s in samples], [s[1] for s in samples if s[1] is not None], wall)
+    finally:
+        server.shutdown()
+    return results
+
+
+def print_report(results):
+    print(f"{'маршрут':<12} {'p50 мс':>9} {'p95 мс':>9} {'p99 мс':>9} {'rps':>9} {'SQL':>6}")
+    for name, r in results.items():
+        queries = f"{r['queries']:.1f}" if r['queries'] is not None else '-'
+        print(f"{name:<12} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+              f"{r['rps']:>9.1f} {queries:>6}")
+
+
+# Возвращает число маршрутов, у которых p95 вырос больше допустимого
+def print_comparison(results, baseline, threshold):
+    regressions = 0
+    print(f"\nСравнение с базовой линией ({baseline['meta'].get('name')}), порог {threshold:.0%}:")
+    print(f"{'маршрут':<12} {'p50':>16} {'p95':>16} {'rps':>16} {'SQL':>10}")
+    for name, r in results.items():
+        base = baseline['routes'].get(name)
+        if base is None:
+            print(f"{name:<12} нет в базовой линии")
+            continue
+
+        def delta(key):
+            if not base[key]:
+                return '-'
+            return f"{r[key]:.1f} ({(r[key] - base[key]) / base[key]:+.0%})"
+
+        regressed = base['p95_ms'] and (r['p95_ms'] - base['p95_ms']) / base['p95_ms'] > threshold
+        regressions += bool(regressed)
+        sql = f"{base['queries']}->{r['queries']}" if base['queries'] != r['queries'] else 'без изм.'
+        print(f"{name:<12} {delta('p50_ms'):>16} {delta('p95_ms'):>16} {delta('rps'):>16} {sql:>10}"
+              f"{'  РЕГРЕССИЯ' if regressed else ''}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Бенчмарк маршрутов приложения')
+    parser.add_argument('--mode', choices=('client', 'http'), default='client')
+    parser.add_argument('-n', '--requests', type=int, default=200, help='запросов на маршрут')
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help='потоков в режиме http')
+    parser.add_argument('--routes', help='через запятую, по умолчанию все')
+    for key, default in DEFAULT_VOLUMES.items():
+        parser.add_argument(f'--{key}', type=int, default=default, help=f'строк {key} (по умолчанию {default})')
+    parser.add_argument('--save', metavar='NAME', help='сохранить результат как базовую линию')
+    parser.add_argument('--compare', metavar='NAME', help='сравнить с базовой линией')
+    parser.add_argument('--threshold', type=float, default=0.10, help='допустимый рост p95')
+    args = parser.parse_args(argv)
+
+    routes = ROUTES
+    if args.routes:
+        wanted = set(args.routes.split(','))
+        routes = [r for r in ROUTES if r[0] in wanted]
+
+    volumes = {key: getattr(args, key) for key in DEFAULT_VOLUMES}
+    with tempfile.TemporaryDirectory(prefix='gw-bench-') as workdir:
+        cwd = os.getcwd()
+        try:
+            started = time.perf_counter()
+            app = prepare_app(volumes, workdir)
+            print(f"База наполнена за {time.perf_counter() - started:.1f} с: {volumes}")
+            if args.mode == 'http':
+                results = run_http(app, routes, args.requests, args.concurrency)
+            else:
+                results = run_client(app, routes, args.requests)
+        finally:
+            os.chdir(cwd)
+
+    print_report(results)
+
+    meta = {
+        'name': args.save or args.compare,
+        'mode': args.mode,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'volumes': volumes,
+        'python': platform.python_version(),
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    status = 0
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f'{args.compare}.json'), encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['meta'].get('mode') != args.mode:
+            print(f"Внимание: базовая линия снята в режиме {baseline['meta'].get('mode')}")
+        status = 1 if print_comparison(results, baseline, args.threshold) else 0
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f'{args.save}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'routes': results}, f, ensure_ascii=False, indent=2)
+        print(f"Базовая линия сохранена: {path}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
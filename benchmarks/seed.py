@@ -0,0 +1,66 @@
+# Наполнение базы тестовыми данными пачками (executemany), без ORM-объектов
+from datetime import datetime, timedelta
+from werkzeug.security import generate_password_hash
+from sqlalchemy import insert
+from extensions import db, services
+from models import User, Note, DiaryEntry, Meme, ChatMessage
+import random
+
+BENCH_PASSWORD = 'bench-password'
+
+WORDS = (
+    'климат ледники засуха наводнения COP28 выбросы углерод океан потепление '
+    'лесные пожары энергия солнца ветер биоразнообразие мерзлота переработка '
+    'электромобили озеленение города вода урожай'
+).split()
+
+DEFAULT_VOLUMES = {'users': 100, 'notes': 5000, 'diary': 5000, 'memes': 2000, 'messages': 20000}
+
+
+def sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _bulk_insert(model, rows, chunk_size=1000):
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(insert(model), rows[start:start + chunk_size])
+    db.session.commit()
+
+
+# Вызывается внутри контекста приложения
+def seed_database(volumes=None, seed=42):
+    volumes = {**DEFAULT_VOLUMES, **(volumes or {})}
+    rng = random.Random(seed)
+
+    # Один хэш на всех: сидирование не должно упираться в KDF
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    users = [
+        {'username': f'bench_user_{i}', 'password_hash': password_hash, 'bio': sentence(rng, 6)}
+        for i in range(volumes['users'])
+    ]
+    _bulk_insert(User, users)
+    user_ids = [row[0] for row in db.session.execute(db.select(User.id))]
+
+    _bulk_insert(Note, [
+        {'content': sentence(rng, 30), 'user_id': rng.choice(user_ids)}
+        for _ in range(volumes['notes'])
+    ])
+    _bulk_insert(DiaryEntry, [
+        {'title': sentence(rng, 4), 'content': sentence(rng, 40)}
+        for _ in range(volumes['diary'])
+    ])
+    _bulk_insert(Meme, [
+        {'filename': f'seed_{i}.png', 'description': sentence(rng, 6)}
+        for i in range(volumes['memes'])
+    ])
+
+    start = datetime.utcnow() - timedelta(seconds=volumes['messages'])
+    _bulk_insert(ChatMessage, [
+        {'content': sentence(rng, 10), 'user_id': rng.choice(user_ids),
+         'timestamp': start + timedelta(seconds=i)}
+        for i in range(volumes['messages'])
+    ])
+
+    # Вставки мимо ORM не попадают в поисковый индекс, строим его один раз
+    services.search_backend.reindex()
+    return volumes
@@ -0,0 +1,108 @@
+# Бюджет холодного старта: сколько стоит импорт и create_app() в новом процессе.
+#
+#   python -m benchmarks.startup                  # медиана по 5 запускам, бюджет 750 мс
+#   python -m benchmarks.startup --budget-ms 400 --top 15
+#
+# Замер идёт через python -X importtime; отдельно проверяется, что модули,
+# которые должны импортироваться лениво, при старте не загружаются
+import subprocess
+import statistics
+import argparse
+import tempfile
+import sys
+import os
+import re
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Нужны только при обращении к ТАСС, обработке картинок, миграциях и в ASGI-режиме
+LAZY_MODULES = ('bs4', 'requests', 'PIL', 'flask_migrate', 'alembic', 'httpx', 'starlette')
+
+PROBE = (
+    "import time\n"
+    "t0 = time.perf_counter()\n"
+    "from app import create_app\n"
+    "t1 = time.perf_counter()\n"
+    "create_app()\n"
+    "t2 = time.perf_counter()\n"
+    "print(f'{(t1 - t0) * 1000:.1f} {(t2 - t1) * 1000:.1f}')\n"
+)
+
+_line_re = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def _run(code, workdir):
+    env = dict(os.environ,
+               PYTHONPATH=REPO_ROOT,
+               NEWS_CACHE_FILE='',
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'startup.db')}")
+    # В продакшене .pyc уже лежат на диске, компиляцию в замер не включаем
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          cwd=workdir, env=env, capture_output=True, text=True, check=True)
+
+
+def _imports(stderr):
+    for line in stderr.splitlines():
+        match = _line_re.match(line)
+        if match:
+            yield match.group(4), int(match.group(1))
+
+
+# Возвращает (мс на импорт app, мс на create_app, {пакет: собственное время, мкс}, загруженные модули).
+# Модули, которые интерпретатор грузит и без приложения (site, .pth), не учитываются
+def measure_once(workdir, baseline):
+    proc = _run(PROBE, workdir)
+    import_ms, factory_ms = (float(v) for v in proc.stdout.split()[-2:])
+
+    packages = {}
+    loaded = set()
+    for name, self_us in _imports(proc.stderr):
+        if name in baseline:
+            continue
+        loaded.add(name)
+        root = name.split('.')[0]
+        packages[root] = packages.get(root, 0) + self_us
+    return import_ms, factory_ms, packages, loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Замер холодного старта приложения')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=750,
+                        help='допустимая медиана импорт + create_app(), мс')
+    parser.add_argument('--top', type=int, default=10, help='сколько самых тяжёлых импортов показать')
+    args = parser.parse_args(argv)
+
+    samples = []
+    with tempfile.TemporaryDirectory(prefix='gw-startup-') as workdir:
+        baseline = {name for name, _ in _imports(_run('pass', workdir).stderr)}
+        measure_once(workdir, baseline)  # прогрев: компиляция .pyc
+        for _ in range(args.runs):
+            samples.append(measure_once(workdir, baseline))
+
+    import_ms = statistics.median(s[0] for s in samples)
+    factory_ms = statistics.median(s[1] for s in samples)
+    total_ms = import_ms + factory_ms
+    packages, loaded = samples[-1][2], samples[-1][3]
+
+    print(f"импорт app:   {import_ms:8.1f} мс (медиана из {args.runs})")
+    print(f"create_app(): {factory_ms:8.1f} мс")
+    print(f"итого:        {total_ms:8.1f} мс, бюджет {args.budget_ms:.0f} мс")
+    print("\nСобственное время импорта по пакетам (последний запуск):")
+    for name, micros in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {micros / 1000:8.1f} мс  {name}")
+
+    status = 0
+    eager = [name for name in LAZY_MODULES if name in loaded]
+    if eager:
+        print(f"\nЗагружены при старте, хотя должны импортироваться лениво: {', '.join(eager)}")
+        status = 1
+    if total_ms > args.budget_ms:
+        print(f"\nБюджет превышен на {total_ms - args.budget_ms:.1f} мс")
+        status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,32 @@
+# Локальная заглушка страницы ТАСС, чтобы бенчмарки не ходили в интернет
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+
+
+def news_page(items=20):
+    blocks = ''.join(
+        f'<div class="news-item__title"><a href="/obschestvo/{1000 + i}">Климатическая новость №{i}</a></div>'
+        for i in range(items)
+    )
+    return f'<html><body>{blocks}</body></html>'.encode('utf-8')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    body = news_page()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Запускает сервер в фоновом потоке и возвращает (сервер, URL ленты)
+def start_stub_server(host='127.0.0.1', port=0):
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    threading.Thread(target=server.serve_forever, name='tass-stub', daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}/tag/izmenenie-klimata'
@@ -0,0 +1,197 @@
+# Массовый импорт и экспорт контента в JSON Lines и CSV:
+#   flask --app app data export diary diary.jsonl
+#   flask --app app data import notes notes.csv --format csv --batch-size 5000
+# Файлы читаются и пишутся потоком: в памяти не больше одной пачки строк.
+# Вставка идёт пачками (executemany) в отдельных транзакциях, мимо ORM-событий,
+# поэтому поисковый индекс перестраивается один раз в конце
+from flask.cli import AppGroup
+from sqlalchemy import insert
+from datetime import datetime
+from extensions import db, services
+from models import User, Note, DiaryEntry, Meme, ChatMessage
+import click
+import json
+import csv
+import sys
+import io
+
+data_cli = AppGroup('data', help='Массовый импорт и экспорт контента')
+
+# Поля, которые переносятся для каждой таблицы; user_id можно заменить на username
+KINDS = {
+    'diary': (DiaryEntry, ('id', 'title', 'content'), ('content',)),
+    'notes': (Note, ('id', 'content', 'user_id'), ('content',)),
+    'memes': (Meme, ('id', 'filename', 'description', 'width', 'height', 'variants'),
+              ('filename', 'description')),
+    'chat': (ChatMessage, ('id', 'content', 'timestamp', 'user_id'), ('content',)),
+}
+# Источники поиска, индекс которых нужно перестроить после импорта
+SEARCHABLE = {'diary', 'notes', 'memes'}
+DATETIME_FIELDS = {'timestamp'}
+JSON_FIELDS = {'variants'}
+INT_FIELDS = {'id', 'user_id', 'width', 'height'}
+
+
+def detect_format(path, fmt):
+    if fmt:
+        return fmt
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def open_stream(path, mode):
+    if path == '-':
+        stream = sys.stdin if 'r' in mode else sys.stdout
+        return io.TextIOWrapper(stream.buffer, encoding='utf-8', newline=''), False
+    return open(path, mode, encoding='utf-8', newline=''), True
+
+
+def read_records(stream, fmt):
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+# Значения из CSV приходят строками, из JSON — уже с типами
+def coerce(field, value):
+    if value is None or value == '':
+        return None
+    if field in INT_FIELDS:
+        return int(value)
+    if field in DATETIME_FIELDS and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if field in JSON_FIELDS and isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def serialize(field, value, fmt):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if field in JSON_FIELDS and fmt == 'csv' and value is not None:
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+class UserResolver:
+    def __init__(self):
+        self._ids = {}
+
+    def __call__(self, username):
+        if username not in self._ids:
+            self._ids[username] = db.session.execute(
+                db.select(User.id).where(User.username == username)).scalar()
+        return self._ids[username]
+
+
+def import_records(kind, records, batch_size=1000, keep_ids=False):
+    model, fields, required = KINDS[kind]
+    resolve_user = UserResolver()
+    stats = {'imported': 0, 'skipped': 0, 'errors': []}
+    batch = []
+
+    def flush():
+        if batch:
+            db.session.execute(insert(model), batch)
+            db.session.commit()
+            stats['imported'] += len(batch)
+            batch.clear()
+
+    for number, record in enumerate(records, 1):
+        try:
+            row = {field: coerce(field, record.get(field)) for field in fields if field in record}
+            if not keep_ids:
+                row.pop('id', None)
+            if 'user_id' in fields and row.get('user_id') is None and record.get('username'):
+                row['user_id'] = resolve_user(record['username'])
+                if row['user_id'] is None:
+                    raise ValueError(f"нет пользователя {record['username']!r}")
+            missing = [field for field in required if not row.get(field)]
+            if missing:
+                raise ValueError(f"не заполнены поля: {', '.join(missing)}")
+        except (ValueError, TypeError) as e:
+            stats['skipped'] += 1
+            if len(stats['errors']) < 10:
+                stats['errors'].append(f'строка {number}: {e}')
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return stats
+
+
+# Строки читаются курсором порциями, без объектов ORM в identity map
+def export_records(kind, batch_size=1000):
+    model, fields, _ = KINDS[kind]
+    columns = [getattr(model, field) for field in fields]
+    query = db.select(*columns).order_by(model.id)
+    if 'user_id' in fields:
+        query = query.add_columns(User.username).outerjoin(User, User.id == model.user_id)
+    result = db.session.execute(query.execution_options(stream_results=True, yield_per=batch_size))
+    for row in result.mappings():
+        yield dict(row)
+
+
+@data_cli.command('import')
+@click.argument('kind', type=click.Choice(sorted(KINDS)))
+@click.argument('path')
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']), help='по умолчанию по расширению')
+@click.option('--batch-size', default=1000, show_default=True, help='строк в одной транзакции')
+@click.option('--keep-ids', is_flag=True, help='сохранить id из файла (перенос в пустую базу)')
+@click.option('--no-reindex', is_flag=True, help='не перестраивать поисковый индекс')
+def import_command(kind, path, fmt, batch_size, keep_ids, no_reindex):
+    """Импорт diary|notes|memes|chat из файла (- — stdin)."""
+    fmt = detect_format(path, fmt)
+    stream, close = open_stream(path, 'r')
+    try:
+        stats = import_records(kind, read_records(stream, fmt), batch_size, keep_ids)
+    finally:
+        if close:
+            stream.close()
+
+    for error in stats['errors']:
+        click.echo(f'  пропущена {error}', err=True)
+    click.echo(f"Импортировано: {stats['imported']}, пропущено: {stats['skipped']}", err=True)
+
+    if kind == 'memes':
+        services.render_cache.invalidate('memes')
+    if kind in SEARCHABLE and stats['imported'] and not no_reindex:
+        services.search_backend.reindex()
+        services.suggest_index.invalidate()
+        click.echo(f'Поисковый индекс ({services.search_backend.name}) перестроен', err=True)
+
+
+@data_cli.command('export')
+@click.argument('kind', type=click.Choice(sorted(KINDS)))
+@click.argument('path', default='-')
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']), help='по умолчанию по расширению')
+@click.option('--batch-size', default=1000, show_default=True, help='строк за одно чтение из базы')
+def export_command(kind, path, fmt, batch_size):
+    """Экспорт diary|notes|memes|chat в файл (- — stdout)."""
+    fmt = detect_format(path, fmt)
+    _, fields, _ = KINDS[kind]
+    header = list(fields) + (['username'] if 'user_id' in fields else [])
+    stream, close = open_stream(path, 'w')
+    count = 0
+    try:
+        writer = csv.DictWriter(stream, fieldnames=header) if fmt == 'csv' else None
+        if writer:
+            writer.writeheader()
+        for record in export_records(kind, batch_size):
+            record = {field: serialize(field, value, fmt) for field, value in record.items()}
+            if writer:
+                writer.writerow(record)
+            else:
+                stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
+    finally:
+        if close:
+            stream.close()
+        else:
+            stream.flush()
+            stream.detach()
+    click.echo(f'Экспортировано: {count}', err=True)
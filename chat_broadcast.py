@@ -0,0 +1,220 @@
+# Рассылка новых сообщений чата подключённым клиентам (Server-Sent Events).
+# 'memory' — внутри одного процесса; 'database' — опрос таблицы по id,
+# работает и при нескольких воркерах без общей шины; 'shared' — pub/sub
+# общего хранилища (shared_state.py), без опроса базы
+from collections import deque
+import threading
+import asyncio
+import logging
+import json
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBroadcaster:
+    def __init__(self, history=200):
+        self._messages = deque(maxlen=history)
+        self._cond = threading.Condition()
+        self._subscribers = []
+
+    # Дополнительный получатель сообщений (например, AsyncHub в ASGI-режиме)
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+        return callback
+
+    def publish(self, message):
+        with self._cond:
+            self._messages.append(message)
+            self._cond.notify_all()
+        for callback in self._subscribers:
+            callback(message)
+
+    # Ждёт сообщения с id больше after_id не дольше timeout секунд
+    def listen(self, after_id, timeout=15):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                fresh = [m for m in self._messages if m['id'] > after_id]
+                if fresh:
+                    return fresh
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+
+
+# Сообщение уходит в канал общего хранилища; каждый воркер получает его
+# в потоке подписки и раздаёт своим клиентам как MemoryBroadcaster
+class SharedBroadcaster(MemoryBroadcaster):
+    channel = 'chat'
+
+    def __init__(self, store, history=200):
+        super().__init__(history)
+        self.store = store
+        store.subscribe(self.channel, self._receive)
+
+    def publish(self, message):
+        self.store.publish(self.channel, json.dumps(message, ensure_ascii=False))
+
+    def _receive(self, payload):
+        super().publish(json.loads(payload))
+
+
+# Один фоновый опрос таблицы на процесс, а не на каждое соединение: поток
+# спит, пока никто не ждёт, найденное раздаётся слушателям как в MemoryBroadcaster
+class DatabaseBroadcaster(MemoryBroadcaster):
+    def __init__(self, fetch_after, poll_interval=1.0, history=200):
+        super().__init__(history)
+        self.fetch_after = fetch_after
+        self.poll_interval = poll_interval
+        self._last_id = None
+        self._waiting = 0
+        self._thread = None
+
+    def publish(self, message):
+        # Сообщение уже в базе, все воркеры увидят его при следующем опросе
+        pass
+
+    def listen(self, after_id, timeout=15):
+        with self._cond:
+            if self._thread is None:
+                # Первый слушатель уже дочитал пропущенное из базы, опрос начинается с его id
+                self._last_id = after_id
+                self._thread = threading.Thread(target=self._run, name='chat-poll', daemon=True)
+                self._thread.start()
+            self._waiting += 1
+            self._cond.notify_all()
+        try:
+            return super().listen(after_id, timeout)
+        finally:
+            with self._cond:
+                self._waiting -= 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._waiting:
+                    self._cond.wait()
+            try:
+                fresh = self.fetch_after(self._last_id)
+            except Exception as e:
+                logger.error(f"Ошибка опроса сообщений чата: {e}")
+                fresh = []
+            if fresh:
+                self._last_id = fresh[-1]['id']
+                for message in fresh:
+                    MemoryBroadcaster.publish(self, message)
+            time.sleep(self.poll_interval)
+
+
+# Рассылка для ASGI-режима: ожидающие клиенты — это futures в цикле событий,
+# поэтому тысячи простаивающих соединений не занимают ни одного потока
+class AsyncHub:
+    def __init__(self, history=200):
+        self._messages = deque(maxlen=history)
+        self._waiters = set()
+        self._loop = None
+
+    def attach(self, loop):
+        self._loop = loop
+
+    # Можно вызывать из любого потока, например из синхронного обработчика Flask
+    def publish(self, message):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._deliver, message)
+
+    def _deliver(self, message):
+        self._messages.append(message)
+        waiters, self._waiters = self._waiters, set()
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def listen(self, after_id, timeout=15):
+        fresh = [m for m in self._messages if m['id'] > after_id]
+        if fresh:
+            return fresh
+        waiter = self._loop.create_future()
+        self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            self._waiters.discard(waiter)
+            return []
+        return [m for m in self._messages if m['id'] > after_id]
+
+
+# Один опрос базы на процесс вместо опроса на каждое соединение (CHAT_BROADCASTER=database)
+async def poll_database(hub, fetch_after, latest_id, poll_interval=1.0):
+    last_id = None
+    while True:
+        try:
+            if last_id is None:
+                last_id = await asyncio.to_thread(latest_id)
+            for message in await asyncio.to_thread(fetch_after, last_id):
+                last_id = message['id']
+                hub.publish(message)
+        except Exception as e:
+            logger.error(f"Ошибка опроса сообщений чата: {e}")
+        await asyncio.sleep(poll_interval)
+
+
+def create_broadcaster(name, fetch_after, poll_interval=1.0, store=None):
+    if name == 'database':
+        return DatabaseBroadcaster(fetch_after, poll_interval)
+    if name == 'shared':
+        return SharedBroadcaster(store)
+    if name != 'memory':
+        logger.warning(f"Неизвестный CHAT_BROADCASTER={name!r}, используется memory")
+    return MemoryBroadcaster()
+
+
+def sse_event(message):
+    data = json.dumps(message, ensure_ascii=False)
+    return f"id: {message['id']}\nevent: message\ndata: {data}\n\n"
+
+
+# Поток событий для одного клиента: сначала пропущенное из базы, затем новые сообщения
+def event_stream(broadcaster, fetch_after, after_id, keepalive=15):
+    last_id = after_id
+    while True:
+        missed = fetch_after(last_id)
+        if not missed:
+            break
+        for message in missed:
+            last_id = message['id']
+            yield sse_event(message)
+
+    yield "retry: 3000\n\n"
+    while True:
+        fresh = broadcaster.listen(last_id, timeout=keepalive)
+        if not fresh:
+            # Комментарий не даёт прокси закрыть простаивающее соединение
+            yield ': keepalive\n\n'
+            continue
+        for message in fresh:
+            last_id = message['id']
+            yield sse_event(message)
+
+
+# Асинхронный вариант event_stream; fetch_after — корутина
+async def async_event_stream(hub, fetch_after, after_id, keepalive=15):
+    last_id = after_id
+    while True:
+        missed = await fetch_after(last_id)
+        if not missed:
+            break
+        for message in missed:
+            last_id = message['id']
+            yield sse_event(message)
+
+    yield "retry: 3000\n\n"
+    while True:
+        fresh = await hub.listen(last_id, timeout=keepalive)
+        if not fresh:
+            yield ': keepalive\n\n'
+            continue
+        for message in fresh:
+            last_id = message['id']
+            yield sse_event(message)
@@ -0,0 +1,264 @@
+# Хранение истории чата: в таблице chat_message остаются только свежие
+# сообщения, старые переносятся в архив — по файлу на месяц,
+# chat-ГГГГ-ММ.jsonl.gz. Файлы только дописываются: каждая пачка — отдельный
+# gzip-член, gzip.open читает их подряд как один поток.
+# Перенос идёт пачками: записали в архив и fsync, запомнили id пачки
+# в pending.json, удалили строки, забыли id. Если процесс упал после записи,
+# при следующем запуске строки из pending.json просто удаляются; в худшем
+# случае (падение до pending.json) пачка окажется в архиве дважды.
+# После переноса в SQLite освобождённые страницы возвращаются через
+# PRAGMA incremental_vacuum
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from models import ChatMessage, User
+import threading
+import logging
+import gzip
+import json
+import time
+import re
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка между воркерами не нужна для разработки
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MONTH_RE = re.compile(r'^chat-(\d{4}-\d{2})\.jsonl\.gz$')
+PENDING_FILE = 'pending.json'
+LOCK_FILE = '.lock'
+
+
+class ChatArchive:
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, month):
+        return os.path.join(self.root, f'chat-{month}.jsonl.gz')
+
+    def append(self, month, records):
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.path(month), 'ab') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as gz:
+                for record in records:
+                    gz.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n')
+            raw.flush()
+            os.fsync(raw.fileno())
+
+    # Месяцы, за которые есть архив, от новых к старым
+    def months(self):
+        if not os.path.isdir(self.root):
+            return []
+        months = [m.group(1) for m in map(MONTH_RE.match, os.listdir(self.root)) if m]
+        return sorted(months, reverse=True)
+
+    def exists(self, month):
+        return os.path.isfile(self.path(month))
+
+    # Страница месяца: файл читается потоком, в памяти только per_page записей
+    def page(self, month, page=1, per_page=50):
+        start = (page - 1) * per_page
+        records = []
+        with gzip.open(self.path(month), 'rt', encoding='utf-8') as f:
+            for number, line in enumerate(f):
+                if number < start:
+                    continue
+                if len(records) > per_page:
+                    break
+                records.append(json.loads(line))
+        return records[:per_page], len(records) > per_page
+
+
+class ChatRetention:
+    def __init__(self, db, archive, max_age_days=90, max_messages=10000, batch_size=500,
+                 interval=3600, vacuum_pages=2000, pause=0.05):
+        self.db = db
+        self.archive = archive
+        self.max_age_days = max_age_days
+        self.max_messages = max_messages
+        self.batch_size = batch_size
+        self.interval = interval
+        self.vacuum_pages = vacuum_pages
+        self.pause = pause
+        self.archived = 0
+        self.runs = 0
+        self.last_run = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    # Фоновый перенос раз в interval секунд; 0 — только командой flask chat-retention
+    def start(self, app):
+        if self._thread is not None or not self.interval:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(app,), name='chat-retention', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, app):
+        while not self._stop.wait(self.interval):
+            try:
+                with app.app_context():
+                    self.run_once()
+            except Exception as e:
+                logger.error(f"Ошибка переноса чата в архив: {e}")
+
+    # Возвращает число перенесённых сообщений или None, если перенос уже идёт в другом процессе
+    def run_once(self):
+        with self._exclusive() as acquired:
+            if not acquired:
+                return None
+            self._finish_pending()
+            condition = self._condition()
+            archived = 0
+            while condition is not None:
+                batch = self._next_batch(condition)
+                if not batch:
+                    break
+                self._move(batch)
+                archived += len(batch)
+                time.sleep(self.pause)
+            if archived:
+                self.vacuum()
+                logger.info(f"Перенесено в архив сообщений чата: {archived}")
+        self.archived += archived
+        self.runs += 1
+        self.last_run = time.time()
+        return archived
+
+    def _condition(self):
+        db = self.db
+        conditions = []
+        if self.max_age_days:
+            conditions.append(ChatMessage.timestamp < datetime.utcnow() - timedelta(days=self.max_age_days))
+        if self.max_messages:
+            # id, начиная с которого сообщения уже не входят в max_messages последних
+            cutoff = db.session.execute(
+                db.select(ChatMessage.id).order_by(ChatMessage.id.desc()).offset(self.max_messages).limit(1)
+            ).scalar()
+            if cutoff is not None:
+                conditions.append(ChatMessage.id <= cutoff)
+        db.session.rollback()
+        return or_(*conditions) if conditions else None
+
+    def _next_batch(self, condition):
+        db = self.db
+        rows = db.session.execute(
+            db.select(ChatMessage.id, ChatMessage.content, ChatMessage.timestamp,
+                      ChatMessage.user_id, User.username)
+            .outerjoin(User, User.id == ChatMessage.user_id)
+            .where(condition)
+            .order_by(ChatMessage.id)
+            .limit(self.batch_size)
+        ).mappings().all()
+        db.session.rollback()
+        return rows
+
+    def _move(self, batch):
+        by_month = {}
+        for row in batch:
+            record = dict(row)
+            timestamp = record['timestamp'] or datetime.utcnow()
+            record['timestamp'] = timestamp.isoformat()
+            by_month.setdefault(timestamp.strftime('%Y-%m'), []).append(record)
+        for month, records in by_month.items():
+            self.archive.append(month, records)
+
+        ids = [row['id'] for row in batch]
+        self._write_pending(ids)
+        self._delete(ids)
+        os.remove(self._pending_path())
+
+    def _delete(self, ids):
+        self.db.session.execute(self.db.delete(ChatMessage).where(ChatMessage.id.in_(ids)))
+        self.db.session.commit()
+
+    def _pending_path(self):
+        return os.path.join(self.archive.root, PENDING_FILE)
+
+    def _write_pending(self, ids):
+        tmp_path = self._pending_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(ids, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._pending_path())
+
+    # Пачка уже в архиве, но процесс не успел удалить её из таблицы
+    def _finish_pending(self):
+        try:
+            with open(self._pending_path()) as f:
+                ids = json.load(f)
+        except (OSError, ValueError):
+            return
+        logger.warning(f"Удаляем {len(ids)} сообщений чата, перенесённых в архив до сбоя")
+        self._delete(ids)
+        os.remove(self._pending_path())
+
+    # Освобождённые страницы возвращаются в файловую систему порциями, без полного VACUUM.
+    # Работает, если база создана с auto_vacuum=INCREMENTAL (см. db_config.sqlite_pragmas)
+    # или переведена в этот режим командой flask chat-retention --setup-vacuum
+    def vacuum(self):
+        db = self.db
+        if db.engine.dialect.name != 'sqlite':
+            return 0
+        with db.engine.connect() as conn:
+            if conn.exec_driver_sql('PRAGMA auto_vacuum').scalar() != 2:
+                logger.info("auto_vacuum не INCREMENTAL, место после удаления останется в файле базы")
+                return 0
+            before = conn.exec_driver_sql('PRAGMA freelist_count').scalar()
+            conn.rollback()
+            # sqlite3 делает execute() за один шаг, а прагма освобождает страницу на каждом шаге;
+            # executescript выполняет её до конца
+            conn.connection.dbapi_connection.executescript(f'PRAGMA incremental_vacuum({int(self.vacuum_pages)});')
+            after = conn.exec_driver_sql('PRAGMA freelist_count').scalar()
+            conn.rollback()
+        return before - after
+
+    def setup_incremental_vacuum(self):
+        with self.db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.exec_driver_sql('PRAGMA auto_vacuum=INCREMENTAL')
+            conn.exec_driver_sql('VACUUM')
+
+    # Один перенос на все воркеры: блокировка файла в каталоге архива
+    def _exclusive(self):
+        return _FileLock(os.path.join(self.archive.root, LOCK_FILE))
+
+    def stats(self):
+        return {
+            'archived': self.archived,
+            'runs': self.runs,
+            'last_run_age_seconds': time.time() - self.last_run if self.last_run else 0,
+        }
+
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        if fcntl is None:
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, 'a')
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._file.close()
+            self._file = None
+            return False
+        return True
+
+    def __exit__(self, *exc):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
@@ -0,0 +1,205 @@
+# Сжатие ответов.
+# Страницы сжимаются на лету (brotli, если установлен пакет Brotli, иначе gzip),
+# когда тело больше порога и клиент прислал подходящий Accept-Encoding.
+# Статика из static/assets собирается заранее командой flask assets build:
+# минифицированные файлы с хэшем в имени и рядом готовые .br и .gz
+from flask import current_app, request, url_for, send_from_directory
+from flask.cli import AppGroup
+from werkzeug.http import parse_accept_header
+import mimetypes
+import hashlib
+import click
+import json
+import gzip
+import re
+import os
+
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript',
+    'application/javascript', 'application/json', 'image/svg+xml',
+}
+MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Для сборки статики время не важно, жмём по максимуму
+BUILD_GZIP_LEVEL = 9
+BUILD_BROTLI_QUALITY = 11
+
+ASSETS_DIR = 'assets'
+MANIFEST_NAME = 'manifest.json'
+# Логическое имя в шаблоне -> исходный файл относительно корня приложения
+DEFAULT_ASSET_SOURCES = {
+    'css/style.css': 'style.css',
+}
+EXTENSIONS = {'br': '.br', 'gzip': '.gz'}
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def compress(data, encoding, build=False):
+    if encoding == 'br':
+        return _brotli().compress(data, quality=BUILD_BROTLI_QUALITY if build else BROTLI_QUALITY)
+    # mtime=0: одинаковое тело даёт одинаковые байты и одинаковый ETag
+    return gzip.compress(data, compresslevel=BUILD_GZIP_LEVEL if build else GZIP_LEVEL, mtime=0)
+
+
+def supported_encodings():
+    return ('br', 'gzip') if _brotli() else ('gzip',)
+
+
+# Выбор кодировки по Accept-Encoding с учётом q; при равенстве — в порядке encodings
+def negotiate(accept_encoding, encodings):
+    accept = parse_accept_header(accept_encoding)
+    best, best_quality = None, 0
+    for encoding in encodings:
+        quality = accept[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def minify_css(text):
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{}:;,>])\s*', r'\1', text)
+    return text.replace(';}', '}').strip()
+
+
+MINIFIERS = {'.css': minify_css}
+
+
+class Compression:
+    def __init__(self, app=None):
+        self.encodings = ()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_MIN_SIZE', MIN_SIZE)
+        app.config.setdefault('ASSET_SOURCES', DEFAULT_ASSET_SOURCES)
+        self.encodings = supported_encodings()
+        app.extensions['compression'] = self
+        app.extensions['asset_manifest'] = self.load_manifest(app)
+
+        app.after_request(self.process_response)
+        app.add_template_global(self.asset_url)
+        if 'static' in app.view_functions:
+            app.view_functions['static'] = self.send_static
+        app.cli.add_command(assets_cli)
+
+    def assets_root(self, app):
+        return os.path.join(app.static_folder, ASSETS_DIR)
+
+    def load_manifest(self, app):
+        try:
+            with open(os.path.join(self.assets_root(app), MANIFEST_NAME), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    # Без собранного манифеста отдаём исходный путь, как раньше
+    def asset_url(self, name):
+        return url_for('static', filename=current_app.extensions['asset_manifest'].get(name, name))
+
+    # Готовые .br/.gz лежат рядом с файлами из static/assets
+    def send_static(self, filename):
+        if filename.startswith(f'{ASSETS_DIR}/'):
+            encoding = negotiate(request.headers.get('Accept-Encoding', ''), self.available(filename))
+            if encoding:
+                mimetype, _ = mimetypes.guess_type(filename)
+                response = send_from_directory(current_app.static_folder, filename + EXTENSIONS[encoding],
+                                               mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                response.vary.add('Accept-Encoding')
+                return response
+        return current_app.send_static_file(filename)
+
+    def available(self, filename):
+        path = os.path.join(current_app.static_folder, *filename.split('/'))
+        return [encoding for encoding in ('br', 'gzip') if os.path.isfile(path + EXTENSIONS[encoding])]
+
+    def process_response(self, response):
+        if request.endpoint == 'static' or request.method == 'HEAD':
+            return response
+        if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+            return response
+        if 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_TYPES:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+            return response
+        encoding = negotiate(request.headers.get('Accept-Encoding', ''), self.encodings)
+        if encoding is None:
+            return response
+
+        response.set_data(compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    # Сборка: минификация, имя с хэшем содержимого, .br и .gz, манифест
+    def build(self, app):
+        assets_root = self.assets_root(app)
+        os.makedirs(assets_root, exist_ok=True)
+        manifest = {}
+        for name, source in app.config['ASSET_SOURCES'].items():
+            with open(os.path.join(app.root_path, source), 'rb') as f:
+                data = f.read()
+            base, ext = os.path.splitext(os.path.basename(name))
+            minify = MINIFIERS.get(ext)
+            if minify:
+                data = minify(data.decode('utf-8')).encode('utf-8')
+
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            built = f'{ASSETS_DIR}/{base}.{digest}{ext}'
+            path = os.path.join(app.static_folder, *built.split('/'))
+            with open(path, 'wb') as f:
+                f.write(data)
+            for encoding in self.encodings:
+                with open(path + EXTENSIONS[encoding], 'wb') as f:
+                    f.write(compress(data, encoding, build=True))
+            manifest[name] = built
+
+        with open(os.path.join(assets_root, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        app.extensions['asset_manifest'] = manifest
+        return manifest
+
+    # Файлы прошлых сборок, которых нет в манифесте
+    def clean(self, app):
+        keep = set()
+        for built in app.extensions['asset_manifest'].values():
+            keep.update(built + suffix for suffix in ('', '.br', '.gz'))
+        assets_root = self.assets_root(app)
+        removed = []
+        for filename in os.listdir(assets_root):
+            relpath = f'{ASSETS_DIR}/{filename}'
+            if filename != MANIFEST_NAME and relpath not in keep:
+                os.remove(os.path.join(assets_root, filename))
+                removed.append(relpath)
+        return removed
+
+
+assets_cli = AppGroup('assets', help='Сборка статики')
+
+
+@assets_cli.command('build')
+@click.option('--clean', is_flag=True, help='удалить файлы прошлых сборок')
+def build_command(clean):
+    """Минифицирует статику, пишет файлы с хэшем в имени, .br/.gz и манифест."""
+    app = current_app._get_current_object()
+    compression = app.extensions['compression']
+    for name, built in compression.build(app).items():
+        click.echo(f'{name} -> {built}')
+    if clean:
+        for relpath in compression.clean(app):
+            click.echo(f'удалён {relpath}')
+    if 'br' not in compression.encodings:
+        click.echo('Пакет Brotli не установлен, собраны только .gz', err=True)
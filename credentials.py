@@ -0,0 +1,137 @@
+# Хэширование и проверка паролей в пуле процессов: KDF нагружает процессор
+# и не должна занимать потоки веб-сервера. Очередь ограничена, при
+# переполнении запрос сразу получает отказ (503), а не ждёт в хвосте
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+import multiprocessing
+import threading
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Дочерние процессы не наследуют потоки и блокировки воркера (fork в процессе с потоками
+# новостей, пулов и подписок может зависнуть на чужой блокировке). Windows умеет только spawn
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# Как у Werkzeug по умолчанию: scrypt требует памяти, подбор на GPU дороже, чем у pbkdf2
+DEFAULT_METHOD = 'scrypt'
+
+
+class CredentialsBusy(Exception):
+    def __init__(self, retry_after=1):
+        super().__init__('Слишком много одновременных проверок пароля')
+        self.retry_after = retry_after
+
+
+# Приводит метод к виду, в котором Werkzeug пишет его в начало хэша,
+# чтобы по префиксу понять, устарели ли параметры
+def normalize_method(method):
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = args[1] if len(args) > 1 else '600000'
+        return f'pbkdf2:{hash_name}:{iterations}'
+    if name == 'scrypt' and not args:
+        return 'scrypt:32768:8:1'
+    return method
+
+
+# Функции ниже выполняются в дочерних процессах, поэтому живут на уровне модуля
+def _hash(password, method):
+    return generate_password_hash(password, method)
+
+
+def _verify(pwhash, password, method):
+    if not check_password_hash(pwhash, password):
+        return False, None
+    if pwhash.split('$', 1)[0] != method:
+        return True, generate_password_hash(password, method)
+    return True, None
+
+
+class CredentialService:
+    def __init__(self, method=DEFAULT_METHOD, workers=None, max_pending=None, timeout=10):
+        self.method = normalize_method(method)
+        # workers=0 — считать в текущем потоке (отладка, тесты)
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or max(self.workers, 1) * 4
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        # Пул создаётся сразу, в create_app(), до запуска фоновых потоков
+        self._executor = self._create_executor() if self.workers else None
+
+    def _create_executor(self):
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(START_METHOD))
+
+    # После shutdown() (остановка ASGI-приложения) пул создаётся заново
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._create_executor()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise CredentialsBusy()
+        with self._lock:
+            self.pending += 1
+        if not self.workers:
+            try:
+                return fn(*args)
+            finally:
+                self._release()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        # Место в очереди освобождается, когда процесс действительно закончил:
+        # cancel() не останавливает уже начатое хэширование
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            logger.warning(f"Проверка пароля не уложилась в {self.timeout} с")
+            raise CredentialsBusy()
+
+    def _release(self, future=None):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method)
+
+    # Возвращает (пароль верен, новый хэш или None). Новый хэш приходит,
+    # если пароль был захэширован со старыми параметрами
+    def verify(self, pwhash, password):
+        ok, new_hash = self._run(_verify, pwhash, password, self.method)
+        if new_hash is not None:
+            with self._lock:
+                self.rehashed += 1
+        return ok, new_hash
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'pending': self.pending,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'rehashed': self.rehashed,
+        }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
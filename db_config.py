@@ -0,0 +1,73 @@
+# Настройки базы данных: URI из окружения, параметры пула соединений
+# и PRAGMA для SQLite (WAL, synchronous=NORMAL, busy_timeout, кэш, mmap)
+from sqlalchemy import event
+import sqlite3
+import os
+
+DEFAULT_DATABASE_URI = 'sqlite:///global_warming.db'
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def sqlite_pragmas():
+    return {
+        # Действует для новой базы; существующую переводит flask chat-retention --setup-vacuum
+        'auto_vacuum': os.environ.get('SQLITE_AUTO_VACUUM', 'INCREMENTAL'),
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': _env_int('SQLITE_BUSY_TIMEOUT', 5000),  # мс
+        'cache_size': _env_int('SQLITE_CACHE_SIZE', -20000),  # отрицательное значение — в КиБ
+        'mmap_size': _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+        'temp_store': 'MEMORY',
+    }
+
+
+def is_memory_sqlite(uri):
+    return uri.startswith('sqlite') and (uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri)
+
+
+# Вызывается до SQLAlchemy(app): выставляет URI и параметры движка.
+# URI, переданный в create_app(config), важнее DATABASE_URL из окружения
+def configure_database(app):
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI') or os.environ.get('DATABASE_URL') or DEFAULT_DATABASE_URI
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config.setdefault('SQLITE_PRAGMAS', sqlite_pragmas())
+
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    if is_memory_sqlite(uri):
+        # Для базы в памяти Flask-SQLAlchemy сам выбирает StaticPool
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+        return
+
+    # Пул рассчитан на многопоточные воркеры: соединения переиспользуются между запросами
+    options.setdefault('pool_size', _env_int('DB_POOL_SIZE', 10))
+    options.setdefault('max_overflow', _env_int('DB_MAX_OVERFLOW', 20))
+    options.setdefault('pool_timeout', _env_int('DB_POOL_TIMEOUT', 10))
+    options.setdefault('pool_recycle', _env_int('DB_POOL_RECYCLE', 3600))
+    if uri.startswith('sqlite'):
+        connect_args = dict(options.get('connect_args', {}))
+        connect_args.setdefault('timeout', app.config['SQLITE_PRAGMAS']['busy_timeout'] / 1000)
+        connect_args.setdefault('check_same_thread', False)
+        options['connect_args'] = connect_args
+    else:
+        options.setdefault('pool_pre_ping', True)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+# PRAGMA действуют на соединение, поэтому выставляются при каждом новом подключении
+def install_sqlite_pragmas(engine, pragmas):
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
@@ -0,0 +1,29 @@
+# Расширения Flask создаются без приложения и подключаются в create_app()
+from flask import current_app
+from werkzeug.local import LocalProxy
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import LoginManager
+from http_cache import HttpCache
+from compression import Compression
+from instrumentation import Instrumentation
+from admission import AdmissionControl
+
+db = SQLAlchemy()
+
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+
+# ETag, 304 и Cache-Control для страниц и загруженных файлов
+http_cache = HttpCache()
+
+# Сжатие страниц на лету и отдача заранее сжатой статики (flask assets build)
+compression = Compression()
+
+# Метрики и профилировщик (/metrics), по умолчанию выключены
+instrumentation = Instrumentation()
+
+# Token bucket на клиента и лимит одновременных запросов для тяжёлых маршрутов
+admission = AdmissionControl()
+
+# Сервисы текущего приложения (кэши, пулы, поиск), см. services.py
+services = LocalProxy(lambda: current_app.extensions['services'])
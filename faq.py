@@ -0,0 +1,107 @@
+# Движок ответов бота: FAQ загружается из faq.json один раз и
+# перестраивается, только когда файл изменился (горячая перезагрузка)
+from functools import lru_cache
+import threading
+import logging
+import json
+import time
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+FAQ_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'faq.json')
+
+_word_re = re.compile(r'\w+')
+
+
+# Стеммер Whoosh импортируется при первом вопросе, а не при старте
+@lru_cache(maxsize=None)
+def _stemmer():
+    from whoosh.lang import stemmer_for_language
+    return stemmer_for_language('ru')
+
+
+# Слова приводятся к основе, чтобы «засухе» и «засуха» совпадали
+def normalize(text):
+    stem = _stemmer()
+    return [stem(word) for word in _word_re.findall(text.lower().replace('ё', 'е'))]
+
+
+class FaqEngine:
+    def __init__(self, path=FAQ_FILE, reload_interval=5):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0
+        # (список ответов, сколько слов нужно каждому ответу, индекс слово -> номера записей)
+        self._state = ([], [], {})
+        self._questions = []
+
+    # Индекс строится при первом обращении
+    def _ensure_loaded(self):
+        if self._mtime is None:
+            with self._lock:
+                if self._mtime is None:
+                    self.load()
+
+    def load(self):
+        with open(self.path, encoding='utf-8') as f:
+            faq = json.load(f)
+        mtime = os.path.getmtime(self.path)
+
+        answers, required, index = [], [], {}
+        for key, response in faq.items():
+            # Однобуквенные союзы и предлоги («и», «в») не должны влиять на совпадение
+            words = {word for word in normalize(key) if len(word) > 1}
+            if not words:
+                continue
+            entry = len(answers)
+            answers.append(response)
+            required.append(len(words))
+            for word in words:
+                index.setdefault(word, []).append(entry)
+
+        self._state = (answers, required, index)
+        self._questions = list(faq)
+        self._mtime = mtime
+        logger.info(f"FAQ загружен: {len(answers)} записей, {len(index)} слов в индексе")
+
+    # Вопросы из faq.json как есть — для подсказок в поиске
+    def questions(self):
+        self._ensure_loaded()
+        return self._questions
+
+    def reload_if_changed(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return False
+        with self._lock:
+            if now - self._checked_at < self.reload_interval:
+                return False
+            self._checked_at = now
+            try:
+                if os.path.getmtime(self.path) == self._mtime:
+                    return False
+                self.load()
+            except (OSError, ValueError) as e:
+                logger.error(f"Не удалось перезагрузить FAQ {self.path}: {e}")
+                return False
+        return True
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._state[0])
+
+    # Ответ подходит, если в вопросе встречаются все слова его ключа
+    def find(self, question):
+        self._ensure_loaded()
+        self.reload_if_changed()
+        answers, required, index = self._state
+
+        hits = {}
+        for word in set(normalize(question)):
+            for entry in index.get(word, ()):
+                hits[entry] = hits.get(entry, 0) + 1
+        return [answers[entry] for entry in sorted(hits) if hits[entry] == required[entry]]
@@ -0,0 +1,61 @@
+# HTTP-кэширование: ETag для страниц, ответы 304 на If-None-Match
+# и политики Cache-Control по эндпоинтам
+from flask import request, current_app
+from flask_login import current_user
+
+# Загрузки и собранная статика лежат по хэшу содержимого и никогда не меняются
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+DEFAULT_POLICIES = {
+    'main.index': 'public, max-age=60',
+    'memes.memes_page': 'public, max-age=30',
+    'bot.bot': 'public, max-age=300',
+    'search.search': 'public, max-age=60',
+    'search.suggest': 'public, max-age=60',
+    'main.stats': 'no-store',
+}
+DEFAULT_POLICY = 'no-cache'
+PRIVATE_POLICY = 'private, no-cache'
+STATIC_POLICY = 'public, max-age=3600'
+
+
+class HttpCache:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    # Политики свои у каждого приложения: объект расширения общий на процесс
+    def init_app(self, app):
+        app.extensions['http_cache_policies'] = {**DEFAULT_POLICIES, **app.config.get('HTTP_CACHE_POLICIES', {})}
+        app.after_request(self.process_response)
+
+    def static_policy(self, filename):
+        if filename and filename.startswith(('uploads/', 'assets/')):
+            return IMMUTABLE
+        return STATIC_POLICY
+
+    def process_response(self, response):
+        if request.method not in ('GET', 'HEAD'):
+            return response
+
+        # Статику отдаёт send_file: ETag и 304 уже есть, добавляем только срок жизни
+        if request.endpoint == 'static':
+            if response.status_code in (200, 304):
+                response.headers['Cache-Control'] = self.static_policy(request.view_args.get('filename'))
+            return response
+
+        if response.status_code != 200 or response.is_streamed or 'Cache-Control' in response.headers:
+            return response
+
+        if current_user.is_authenticated:
+            policy = PRIVATE_POLICY
+        else:
+            policy = current_app.extensions['http_cache_policies'].get(request.endpoint, DEFAULT_POLICY)
+        response.headers['Cache-Control'] = policy
+        response.vary.add('Cookie')
+        if policy == 'no-store':
+            return response
+
+        if not response.get_etag()[0]:
+            response.add_etag()
+        return response.make_conditional(request)
@@ -0,0 +1,106 @@
+# Обработка загруженных изображений: миниатюры и WebP-варианты для srcset.
+# Работа идёт в пуле потоков, запрос на загрузку её не ждёт
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (300, 600)
+VARIANTS_SUBDIR = 'variants'
+
+_FORMATS = {
+    'JPEG': ('jpg', 'image/jpeg'),
+    'PNG': ('png', 'image/png'),
+    'GIF': ('png', 'image/png'),
+    'WEBP': ('webp', 'image/webp'),
+}
+
+
+def variant_filename(filename, width, ext):
+    base = os.path.splitext(os.path.basename(filename))[0]
+    return f"{base}_{width}.{ext}"
+
+
+# Создаёт уменьшенные копии в исходном формате и в WebP, возвращает метаданные для модели
+def build_variants(folder, filename, widths=VARIANT_WIDTHS):
+    from PIL import Image, ImageOps
+
+    src = os.path.join(folder, filename)
+    out_dir = os.path.join(folder, VARIANTS_SUBDIR)
+    os.makedirs(out_dir, exist_ok=True)
+
+    with Image.open(src) as original:
+        width, height = original.size
+        fallback_ext, fallback_type = _FORMATS.get(original.format, ('png', 'image/png'))
+        # У анимированных GIF миниатюра потеряла бы анимацию, оставляем оригинал
+        if getattr(original, 'is_animated', False):
+            return {'width': width, 'height': height, 'variants': []}
+
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+        variants = []
+        for target in sorted(set(min(w, width) for w in widths)):
+            resized = image.copy()
+            resized.thumbnail((target, height), Image.LANCZOS)
+            for ext, mime in (('webp', 'image/webp'), (fallback_ext, fallback_type)):
+                name = variant_filename(filename, target, ext)
+                frame = resized
+                if ext == 'jpg' and frame.mode == 'RGBA':
+                    frame = frame.convert('RGB')
+                save_args = {'quality': 80, 'method': 4} if ext == 'webp' else {'optimize': True}
+                frame.save(os.path.join(out_dir, name), **save_args)
+                variants.append({'file': name, 'width': resized.width, 'type': mime})
+
+    return {'width': width, 'height': height, 'variants': variants}
+
+
+def remove_variants(folder, variants):
+    for variant in variants or []:
+        path = os.path.join(folder, VARIANTS_SUBDIR, variant['file'])
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class ImagePipeline:
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.processed = 0
+        self.failed = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='images')
+            return self._executor
+
+    def submit(self, fn, *args):
+        with self._lock:
+            self.pending += 1
+        future = self._get_executor().submit(fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self.pending -= 1
+            if future.exception() is not None:
+                self.failed += 1
+                logger.error(f"Ошибка обработки изображения: {future.exception()}")
+            else:
+                self.processed += 1
+
+    def stats(self):
+        return {'pending': self.pending, 'processed': self.processed, 'failed': self.failed}
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
@@ -0,0 +1,343 @@
+# Инструментирование приложения (включается INSTRUMENTATION_ENABLED):
+# гистограммы задержек по эндпоинтам, SQL-запросы, рендеринг шаблонов,
+# внешние HTTP-запросы, /metrics в текстовом формате Prometheus и
+# сэмплирующий профилировщик медленных запросов (стеки в формате flamegraph)
+from flask import g, request, current_app, Response, has_request_context, before_render_template, template_rendered
+from collections import defaultdict
+from sqlalchemy import event
+import threading
+import inspect
+import hmac
+import logging
+import time
+import sys
+import os
+
+logger = logging.getLogger(__name__)
+
+MAX_DUMPS = 100
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{n}="{str(v).replace(chr(34), chr(39))}"' for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket in zip(self.buckets, counts):
+                    labels = _format_labels(self.labels + ('le',), label_values + (bound,))
+                    lines.append(f'{self.name}_bucket{labels} {bucket}')
+                labels = _format_labels(self.labels + ('le',), label_values + ('+Inf',))
+                lines.append(f'{self.name}_bucket{labels} {count}')
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f'{self.name}_sum{labels} {total}')
+                lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values = defaultdict(float)
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {value}')
+        return lines
+
+
+# Сэмплирующий профилировщик: фоновый поток периодически снимает стеки потоков,
+# обслуживающих запросы; стеки медленных запросов сохраняются в «свёрнутом» формате
+# (flamegraph.pl, speedscope)
+class SlowRequestProfiler:
+    def __init__(self, threshold=1.0, interval=0.005, output_dir='profiles', max_dumps=MAX_DUMPS):
+        self.threshold = threshold
+        self.interval = interval
+        self.output_dir = output_dir
+        self.max_dumps = max_dumps
+        self.enabled = False
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.dumped = 0
+
+    def enable(self):
+        self.enabled = True
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+            self._thread.start()
+
+    def disable(self):
+        self.enabled = False
+
+    def begin(self):
+        if self.enabled:
+            with self._lock:
+                self._active[threading.get_ident()] = defaultdict(int)
+
+    def end(self, endpoint, duration):
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if samples and duration >= self.threshold:
+            self._dump(endpoint, duration, samples)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            if not self.enabled:
+                continue
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, samples in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[self._fold(frame)] += 1
+
+    @staticmethod
+    def _fold(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def _dump(self, endpoint, duration, samples):
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = f'{endpoint or "unknown"}-{int(time.time() * 1000)}-{int(duration * 1000)}ms.folded'
+        path = os.path.join(self.output_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in samples.items():
+                f.write(f'{stack} {count}\n')
+        self.dumped += 1
+        logger.info(f"Медленный запрос {endpoint} ({duration:.3f} с), стеки сохранены в {path}")
+        self._rotate()
+
+    # В каталоге остаются только max_dumps последних файлов
+    def _rotate(self):
+        with self._lock:
+            try:
+                dumps = [entry for entry in os.scandir(self.output_dir) if entry.name.endswith('.folded')]
+            except OSError:
+                return
+            if len(dumps) <= self.max_dumps:
+                return
+            dumps.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in dumps[:len(dumps) - self.max_dumps]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+
+class Instrumentation:
+    def __init__(self, app=None, db=None):
+        self.request_latency = Histogram(
+            'http_request_duration_seconds', 'Время обработки запроса', ('endpoint', 'method', 'status'))
+        self.sql_latency = Histogram(
+            'db_query_duration_seconds', 'Время выполнения SQL-запроса', ('statement',))
+        self.sql_per_request = Histogram(
+            'db_queries_per_request', 'Число SQL-запросов на HTTP-запрос', ('endpoint',),
+            buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+        self.template_latency = Histogram(
+            'template_render_duration_seconds', 'Время рендеринга шаблона', ('template',))
+        self.outbound_latency = Histogram(
+            'outbound_request_duration_seconds', 'Время внешних HTTP-запросов', ('target', 'outcome'))
+        self.errors = Counter('http_request_exceptions_total', 'Необработанные исключения', ('endpoint',))
+        self.profiler = SlowRequestProfiler()
+        self.enabled = False
+        self._local = threading.local()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db=None):
+        self.enabled = app.config.get('INSTRUMENTATION_ENABLED', False)
+        if not self.enabled:
+            return
+
+        self.profiler.threshold = app.config.get('PROFILER_THRESHOLD', 1.0)
+        self.profiler.output_dir = app.config.get('PROFILER_DIR', 'profiles')
+        self.profiler.max_dumps = app.config.get('PROFILER_MAX_DUMPS', MAX_DUMPS)
+        if app.config.get('PROFILER_ENABLED'):
+            self.profiler.enable()
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        if db is not None:
+            with app.app_context():
+                self._install_sql_events(db.engine)
+
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        # Переключатель профилировщика есть, только если задан PROFILER_TOKEN
+        if app.config.get('PROFILER_TOKEN'):
+            app.add_url_rule('/metrics/profiler', 'metrics_profiler', self.profiler_view, methods=['POST'])
+
+    # Дополнительные значения для /metrics: функция возвращает {имя: число}.
+    # Сборщики хранятся в приложении, объект расширения общий на процесс
+    def register_collector(self, app, collect):
+        app.extensions.setdefault('metrics_collectors', []).append(collect)
+        return collect
+
+    def timed_outbound(self, target, fn):
+        if inspect.iscoroutinefunction(fn):
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                outcome = 'error'
+                try:
+                    result = await fn(*args, **kwargs)
+                    outcome = 'ok'
+                    return result
+                finally:
+                    self.outbound_latency.observe(time.perf_counter() - start, target, outcome)
+            return async_wrapper
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = fn(*args, **kwargs)
+                outcome = 'ok'
+                return result
+            finally:
+                self.outbound_latency.observe(time.perf_counter() - start, target, outcome)
+        return wrapper
+
+    def _before_request(self):
+        g._instr_start = time.perf_counter()
+        g._instr_sql_count = 0
+        g._instr_sql_time = 0.0
+        g._instr_template_time = 0.0
+        self.profiler.begin()
+
+    def _after_request(self, response):
+        start = g.get('_instr_start')
+        if start is None:
+            return response
+        duration = time.perf_counter() - start
+        endpoint = request.endpoint or 'unknown'
+        self.request_latency.observe(duration, endpoint, request.method, str(response.status_code))
+        self.sql_per_request.observe(g._instr_sql_count, endpoint)
+        response.headers['Server-Timing'] = ', '.join([
+            f'app;dur={duration * 1000:.1f}',
+            f'db;dur={g._instr_sql_time * 1000:.1f};desc="{g._instr_sql_count} queries"',
+            f'tpl;dur={g._instr_template_time * 1000:.1f}',
+        ])
+        g._instr_duration = duration
+        return response
+
+    def record_exception(self):
+        if self.enabled and has_request_context():
+            self.errors.inc(1, request.endpoint or 'unknown')
+
+    def _teardown_request(self, exc):
+        start = g.get('_instr_start')
+        if start is None:
+            return
+        duration = g.get('_instr_duration', time.perf_counter() - start)
+        self.profiler.end(request.endpoint, duration)
+
+    def _install_sql_events(self, engine):
+        @event.listens_for(engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('_instr_start', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            duration = time.perf_counter() - conn.info['_instr_start'].pop()
+            verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+            self.sql_latency.observe(duration, verb)
+            if has_request_context() and '_instr_start' in g:
+                g._instr_sql_count += 1
+                g._instr_sql_time += duration
+
+    def _before_render(self, sender, template, context, **extra):
+        stack = getattr(self._local, 'templates', None)
+        if stack is None:
+            stack = self._local.templates = []
+        stack.append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        stack = getattr(self._local, 'templates', None)
+        if not stack:
+            return
+        duration = time.perf_counter() - stack.pop()
+        self.template_latency.observe(duration, template.name or 'string')
+        # Вложенные шаблоны (фрагменты) не считаем дважды
+        if not stack and has_request_context() and '_instr_start' in g:
+            g._instr_template_time += duration
+
+    def render(self):
+        lines = []
+        for metric in (self.request_latency, self.sql_latency, self.sql_per_request,
+                       self.template_latency, self.outbound_latency, self.errors):
+            lines.extend(metric.render())
+        for collect in current_app.extensions.get('metrics_collectors', ()):
+            try:
+                values = collect()
+            except Exception as e:
+                logger.error(f"Ошибка сборщика метрик: {e}")
+                continue
+            for name, value in sorted(values.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f'# TYPE {name} gauge')
+                    lines.append(f'{name} {value}')
+        lines.append('# TYPE profiler_dumps_total counter')
+        lines.append(f'profiler_dumps_total {self.profiler.dumped}')
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+    # Включение профилировщика на лету: заголовок Authorization: Bearer <PROFILER_TOKEN>.
+    # Адрес клиента не проверяем — за прокси он у всех локальный
+    def profiler_view(self):
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        expected = current_app.config['PROFILER_TOKEN']
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(token.encode(), expected.encode()):
+            return 'Доступ запрещён', 403
+        if request.values.get('enabled') in ('1', 'true', 'on'):
+            self.profiler.enable()
+        else:
+            self.profiler.disable()
+        threshold = request.values.get('threshold', type=float)
+        if threshold is not None:
+            self.profiler.threshold = threshold
+        return {'enabled': self.profiler.enabled, 'threshold': self.profiler.threshold}
@@ -0,0 +1,92 @@
+# Выборка мемов для ленты: одна страница одним запросом, общее число
+# мемов хранится в памяти и поправляется при добавлении и удалении
+# (разницу считают слушатели в models.py, после коммита её применяет services.py)
+import threading
+import time
+
+
+class MemePage:
+    def __init__(self, items, total, has_next, next_args, prev_args=None):
+        self.items = items
+        self.total = total
+        self.has_next = has_next
+        self.next_args = next_args
+        self.prev_args = prev_args
+
+    @property
+    def has_prev(self):
+        return self.prev_args is not None
+
+
+class MemeRepository:
+    def __init__(self, db, model, count_ttl=60):
+        self.db = db
+        self.model = model
+        self.count_ttl = count_ttl
+        self._count = None
+        self._counted_at = 0
+        self._lock = threading.Lock()
+
+    def apply_delta(self, delta):
+        with self._lock:
+            if self._count is not None:
+                self._count += delta
+
+    # COUNT(*) выполняется редко: при старте и раз в count_ttl секунд,
+    # чтобы подтянуть изменения из других воркеров
+    def count(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._count is not None and now - self._counted_at < self.count_ttl:
+                return self._count
+        total = self.db.session.query(self.db.func.count(self.model.id)).scalar()
+        with self._lock:
+            self._count = total
+            self._counted_at = now
+        return total
+
+    def page(self, page, per_page):
+        page = max(page, 1)
+        items = (self.model.query
+                 .order_by(self.model.id)
+                 .offset((page - 1) * per_page)
+                 .limit(per_page + 1)
+                 .all())
+        has_next = len(items) > per_page
+        items = items[:per_page]
+        # Ссылка «дальше» уже ведёт на курсор, смещение нужно только для прямых ссылок на ?page=N
+        return MemePage(
+            items, self.count(), has_next,
+            next_args={'after': items[-1].id} if items else None,
+            prev_args={'page': page - 1} if page > 1 else None,
+        )
+
+    # Постраничный вывод по курсору: стоимость не зависит от глубины листания
+    def after(self, after_id, per_page):
+        items = (self.model.query
+                 .filter(self.model.id > after_id)
+                 .order_by(self.model.id)
+                 .limit(per_page + 1)
+                 .all())
+        has_next = len(items) > per_page
+        items = items[:per_page]
+        return MemePage(
+            items, self.count(), has_next,
+            next_args={'after': items[-1].id} if items else None,
+            prev_args={'before': items[0].id} if items else {},
+        )
+
+    # Страница перед курсором (ссылка «Назад»): те же окна, что и при листании вперёд
+    def before(self, before_id, per_page):
+        items = (self.model.query
+                 .filter(self.model.id < before_id)
+                 .order_by(self.model.id.desc())
+                 .limit(per_page + 1)
+                 .all())
+        has_prev = len(items) > per_page
+        items = items[:per_page][::-1]
+        return MemePage(
+            items, self.count(), bool(items),
+            next_args={'after': items[-1].id} if items else None,
+            prev_args={'before': items[0].id} if has_prev else None,
+        )
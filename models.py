@@ -0,0 +1,169 @@
+# Модели базы данных
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload, object_session
+from datetime import datetime
+from extensions import db, services
+from storage import is_stored_path, upload_static_path
+
+
+# Модель пользователя
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(150), unique=True, nullable=False)
+    password_hash = db.Column(db.String(150), nullable=False)
+
+    avatar = db.Column(db.String(255), default='default.png')  # путь к аватарке
+    bio = db.Column(db.Text, default='')
+    registered_on = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def set_password(self, password):
+        self.password_hash = services.credentials.hash(password)
+
+    # При смене параметров хэширования хэш пересчитывается при входе
+    def check_password(self, password):
+        ok, new_hash = services.credentials.verify(self.password_hash, password)
+        if new_hash is not None:
+            self.password_hash = new_hash
+        return ok
+
+    @property
+    def avatar_path(self):
+        return upload_static_path(self.avatar) if self.avatar else None
+
+# Модель заметок (дневника)
+class Note(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    content = db.Column(db.Text, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    user = db.relationship('User', backref='notes')
+
+    __table_args__ = (
+        db.Index('ix_note_user_id_id', 'user_id', 'id'),
+    )
+
+class DiaryEntry(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(255))
+    content = db.Column(db.Text)
+
+class Meme(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False, index=True)
+    description = db.Column(db.String(255), nullable=False)
+
+    # Заполняются фоновой обработкой изображения (images.py)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    variants = db.Column(db.JSON)
+
+    def variants_of(self, mime):
+        return [v for v in self.variants or [] if v['type'] == mime]
+
+    @property
+    def is_stored(self):
+        return is_stored_path(self.filename)
+
+    # Каталог внутри static: новые мемы лежат в хранилище по хэшу, старые — в static/memes
+    @property
+    def static_dir(self):
+        return 'uploads/' if self.is_stored else 'memes/'
+
+    @property
+    def static_path(self):
+        return self.static_dir + self.filename
+
+# Изменения мемов сбрасывают кэш списка, но только после коммита
+# (обработчик after_commit — в services.py)
+@event.listens_for(Meme, 'after_insert')
+@event.listens_for(Meme, 'after_update')
+@event.listens_for(Meme, 'after_delete')
+def meme_changed(mapper, connection, target):
+    object_session(target).info['memes_changed'] = True
+
+# Снимок пользователя в кэше load_user устарел: сбрасывается после коммита
+# во всех воркерах (services.py, канал user-invalidate)
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def user_changed(mapper, connection, target):
+    object_session(target).info.setdefault('users_changed', set()).add(target.id)
+
+# Разница в числе мемов для счётчика MemeRepository, применяется после коммита
+@event.listens_for(Meme, 'after_insert')
+def meme_added(mapper, connection, target):
+    info = object_session(target).info
+    info['memes_delta'] = info.get('memes_delta', 0) + 1
+
+@event.listens_for(Meme, 'after_delete')
+def meme_removed(mapper, connection, target):
+    info = object_session(target).info
+    info['memes_delta'] = info.get('memes_delta', 0) - 1
+
+# Изменения всего, что ищется: кэш результатов поиска сбрасывается после коммита,
+# новые заголовки и описания попадают в подсказки (services.py)
+@event.listens_for(DiaryEntry, 'after_insert')
+@event.listens_for(Meme, 'after_insert')
+def searchable_inserted(mapper, connection, target):
+    info = object_session(target).info
+    info['search_changed'] = True
+    info.setdefault('suggest_texts', []).append(
+        target.title if isinstance(target, DiaryEntry) else target.description)
+
+@event.listens_for(DiaryEntry, 'after_update')
+@event.listens_for(DiaryEntry, 'after_delete')
+@event.listens_for(Meme, 'after_delete')
+@event.listens_for(Note, 'after_insert')
+@event.listens_for(Note, 'after_update')
+@event.listens_for(Note, 'after_delete')
+def searchable_changed(mapper, connection, target):
+    object_session(target).info['search_changed'] = True
+
+
+class StoredFile(db.Model):
+    hash = db.Column(db.String(64), primary_key=True)
+    path = db.Column(db.String(255), unique=True, nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    created_on = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Корзины ограничителя запросов (admission.py, ADMISSION_BACKEND=database)
+class RateLimitBucket(db.Model):
+    key = db.Column(db.String(255), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False, index=True)
+
+class ChatMessage(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    content = db.Column(db.Text, nullable=False)
+    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    user = db.relationship('User', backref='messages')
+
+    __table_args__ = (
+        db.Index('ix_chat_message_timestamp_id', 'timestamp', 'id'),
+    )
+
+def message_to_dict(msg):
+    return {
+        'id': msg.id,
+        'user': msg.user.username if msg.user else None,
+        'content': msg.content,
+        'timestamp': msg.timestamp.strftime('%d.%m.%Y %H:%M') if msg.timestamp else None,
+    }
+
+def messages_after(after_id, limit=100):
+    messages = (ChatMessage.query
+                .options(joinedload(ChatMessage.user))
+                .filter(ChatMessage.id > after_id)
+                .order_by(ChatMessage.id)
+                .limit(limit)
+                .all())
+    result = [message_to_dict(msg) for msg in messages]
+    # Завершаем читающую транзакцию, чтобы следующий опрос видел новые строки
+    db.session.rollback()
+    return result
+
+def latest_message_id():
+    latest = db.session.query(db.func.max(ChatMessage.id)).scalar()
+    db.session.rollback()
+    return latest or 0
@@ -0,0 +1,235 @@
+# Кэш новостей ТАСС: фоновое обновление по расписанию и отдача
+# последних удачных данных, пока идёт перезагрузка (stale-while-revalidate)
+from urllib.parse import urljoin
+import threading
+import hashlib
+import asyncio
+import logging
+import json
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+NEWS_URL = 'https://tass.ru/tag/izmenenie-klimata'
+NEWS_SELECTOR = '.news-item__title a'
+
+
+# Версия ленты — хэш содержимого: одинакова во всех воркерах, получивших те же новости
+def news_version(news):
+    return hashlib.sha1(json.dumps(news, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+# bs4 и requests импортируются при первом обращении к ТАСС, а не при старте воркера
+def parse_news(html, url, limit=6):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    news_blocks = soup.select(NEWS_SELECTOR)
+    return [
+        {
+            'title': item.get_text(strip=True),
+            'link': urljoin(url, item['href'])
+        }
+        for item in news_blocks[:limit]
+        if item.get('href')
+    ]
+
+
+def fetch_news(url, timeout=5, limit=6):
+    import requests
+
+    resp = requests.get(url, timeout=timeout)
+    resp.raise_for_status()
+    return parse_news(resp.text, url, limit)
+
+
+# Асинхронный вариант для ASGI-режима: client — общий httpx.AsyncClient,
+# соединение с сервером переиспользуется между обновлениями
+async def fetch_news_async(client, url, timeout=5, limit=6):
+    resp = await client.get(url, timeout=timeout)
+    resp.raise_for_status()
+    return parse_news(resp.text, url, limit)
+
+
+class NewsCache:
+    def __init__(self, url=NEWS_URL, refresh_interval=600, timeout=5,
+                 cache_file=None, fetcher=fetch_news):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self.cache_file = cache_file
+        self.fetcher = fetcher
+
+        self._news = []
+        self._fetched_at = None
+        self._version = news_version([])
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._listeners = []
+        self._loop = None
+        self._async_fetcher = None
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+
+        self._load_from_disk()
+
+    # Вызывается после каждого удачного обновления (например, для сброса кэша страниц)
+    def on_refresh(self, callback):
+        self._listeners.append(callback)
+        return callback
+
+    # ASGI-режим: обновления идут корутиной в цикле событий, поток не нужен
+    def attach_loop(self, loop, fetcher):
+        self._loop = loop
+        self._async_fetcher = fetcher
+
+    def get(self):
+        return self.snapshot()[0]
+
+    # Новости вместе с версией: ключ кэша фрагментов с версией не даст
+    # сохранить фрагмент, отрендеренный по ленте, которая уже сменилась
+    def snapshot(self):
+        self.start()
+        with self._lock:
+            news, fetched_at, version = self._news, self._fetched_at, self._version
+
+        if fetched_at is None:
+            self.misses += 1
+            self.revalidate()
+        elif time.time() - fetched_at > self.refresh_interval:
+            self.stale_hits += 1
+            self.revalidate()
+        else:
+            self.hits += 1
+        return list(news), version
+
+    def age(self):
+        if self._fetched_at is None:
+            return None
+        return time.time() - self._fetched_at
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'errors': self.errors,
+            'age': self.age(),
+            'items': len(self._news),
+        }
+
+    # Обновление в отдельном потоке, запрос пользователя его не ждёт
+    def revalidate(self):
+        if self._refreshing.locked():
+            return
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self.refresh_async(), self._loop)
+            return
+        threading.Thread(target=self.refresh, name='news-revalidate', daemon=True).start()
+
+    def refresh(self):
+        if not self._refreshing.acquire(blocking=False):
+            return False
+        try:
+            news = self.fetcher(self.url, timeout=self.timeout)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Не удалось обновить новости: {e}")
+            return False
+        finally:
+            self._refreshing.release()
+        self._store(news)
+        return True
+
+    async def refresh_async(self):
+        if not self._refreshing.acquire(blocking=False):
+            return False
+        try:
+            news = await self._async_fetcher(self.url, timeout=self.timeout)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Не удалось обновить новости: {e}")
+            return False
+        finally:
+            self._refreshing.release()
+        self._store(news)
+        return True
+
+    def _store(self, news):
+        with self._lock:
+            self._news = news
+            self._fetched_at = time.time()
+            self._version = news_version(news)
+        self.refreshes += 1
+        self._save_to_disk()
+
+        for callback in self._listeners:
+            try:
+                callback(news)
+            except Exception as e:
+                logger.error(f"Ошибка обработчика обновления новостей: {e}")
+
+    def start(self):
+        if self._thread is not None or self._loop is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='news-refresher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            age = self.age()
+            if age is None or age >= self.refresh_interval:
+                # После ошибки пробуем снова раньше, чем через полный интервал
+                ok = self.refresh()
+                wait = self.refresh_interval if ok else min(30, self.refresh_interval)
+            else:
+                wait = self.refresh_interval - age
+            self._stop.wait(max(wait, 1))
+
+    # Аналог _run для ASGI-режима, запускается задачей при старте сервера
+    async def run_async(self):
+        while not self._stop.is_set():
+            age = self.age()
+            if age is None or age >= self.refresh_interval:
+                ok = await self.refresh_async()
+                wait = self.refresh_interval if ok else min(30, self.refresh_interval)
+            else:
+                wait = self.refresh_interval - age
+            await asyncio.sleep(max(wait, 1))
+
+    def _load_from_disk(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, encoding='utf-8') as f:
+                data = json.load(f)
+            self._news = data['news']
+            self._fetched_at = data['fetched_at']
+            self._version = news_version(self._news)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Не удалось прочитать кэш новостей {self.cache_file}: {e}")
+
+    def _save_to_disk(self):
+        if not self.cache_file:
+            return
+        tmp_path = f"{self.cache_file}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'fetched_at': self._fetched_at, 'news': self._news}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить кэш новостей {self.cache_file}: {e}")
@@ -0,0 +1,121 @@
+# Кэш отрендеренных фрагментов страниц: LRU с временем жизни в памяти
+# и необязательный второй уровень на диске (переживает перезапуск воркера)
+# или в общем хранилище (shared_state.py) — тогда фрагмент, отрендеренный
+# одним воркером, берут все, а сброс раздела рассылается всем воркерам
+from markupsafe import Markup
+from ttl_cache import TTLCache
+import hashlib
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+STORE_PREFIX = 'render:'
+INVALIDATE_CHANNEL = 'render-invalidate'
+
+
+class RenderCache:
+    def __init__(self, maxsize=256, ttl=300, cache_dir=None, store=None):
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.store = store
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.disk_hits = 0
+        self.shared_hits = 0
+        self.renders = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        if store is not None:
+            store.subscribe(INVALIDATE_CHANNEL, self._drop_memory)
+
+    # Ключи вида 'раздел:параметры'; раздел используется при сбросе
+    def _disk_path(self, key):
+        section = key.split(':', 1)[0]
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f'{section}__{digest}.html')
+
+    def _read_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, html):
+        path = self._disk_path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(html)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Не удалось записать фрагмент {key} на диск: {e}")
+
+    def get_or_render(self, key, render, ttl=None):
+        html = self._memory.get(key)
+        if html is not None:
+            return html
+
+        if self.store is not None:
+            cached = self.store.get(STORE_PREFIX + key)
+            if cached is not None:
+                self.shared_hits += 1
+                html = Markup(cached.decode('utf-8'))
+                self._memory.set(key, html, ttl)
+                return html
+
+        if self.cache_dir:
+            cached = self._read_disk(key)
+            if cached is not None:
+                self.disk_hits += 1
+                html = Markup(cached)
+                self._memory.set(key, html, ttl)
+                return html
+
+        self.renders += 1
+        html = Markup(render())
+        self._memory.set(key, html, ttl)
+        if self.store is not None:
+            self.store.set(STORE_PREFIX + key, str(html), ttl or self.ttl)
+        if self.cache_dir:
+            self._write_disk(key, str(html))
+        return html
+
+    # Сообщение о сбросе от любого воркера, включая этот; '' — весь кэш
+    def _drop_memory(self, section):
+        if section:
+            self._memory.delete_prefix(f'{section}:')
+        else:
+            self._memory.clear()
+
+    def invalidate(self, section=None):
+        self._drop_memory(section)
+        if self.store is not None:
+            self.store.delete_prefix(STORE_PREFIX + (f'{section}:' if section else ''))
+            self.store.publish(INVALIDATE_CHANNEL, section or '')
+        if not self.cache_dir:
+            return
+        for name in os.listdir(self.cache_dir):
+            if section is None or name.startswith(f'{section}__'):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def stats(self):
+        memory = self._memory.stats()
+        lookups = memory['hits'] + memory['misses']
+        hits = memory['hits'] + self.disk_hits + self.shared_hits
+        return {
+            'size': memory['size'],
+            'memory_hits': memory['hits'],
+            'disk_hits': self.disk_hits,
+            'shared_hits': self.shared_hits,
+            'renders': self.renders,
+            'evictions': memory['evictions'],
+            'hit_rate': hits / lookups if lookups else 0.0,
+        }
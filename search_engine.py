@@ -0,0 +1,301 @@
+# Полнотекстовый поиск по дневнику, мемам и заметкам.
+# Движок выбирается настройкой SEARCH_BACKEND: 'whoosh' (индекс Whooshee) или 'fts5' (SQLite FTS5)
+from functools import lru_cache
+from sqlalchemy import text
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Стеммер нужен только FTS5-движку и импортируется при первом запросе
+@lru_cache(maxsize=None)
+def _stemmer():
+    from whoosh.lang import stemmer_for_language
+    return stemmer_for_language('ru')
+
+
+def clean_query(query):
+    return re.sub(r'[^\w\s]', '', query.lower()).strip()
+
+
+def query_terms(query):
+    return clean_query(query).split()
+
+
+# Личные записи (модели с user_id): владелец лежит в индексе, фильтр по нему
+# применяется внутри Whoosh, и из индекса берутся только top-N совпадений владельца
+def owned_whoosheer(model, fields, analyzer):
+    import whoosh.fields
+    from flask_whooshee import AbstractWhoosheer
+
+    schema = whoosh.fields.Schema(
+        id=whoosh.fields.NUMERIC(stored=True, unique=True),
+        user_id=whoosh.fields.ID(),
+        **{field: whoosh.fields.TEXT(analyzer=analyzer) for field in fields}
+    )
+
+    # update_document и для новых строк: повторное событие не создаст дубликат
+    def update(cls, writer, obj):
+        document = {field: str(getattr(obj, field)) for field in fields}
+        if obj.user_id is not None:
+            document['user_id'] = str(obj.user_id)
+        writer.update_document(id=obj.id, **document)
+
+    def delete(cls, writer, obj):
+        writer.delete_by_term('id', obj.id)
+
+    name = model.__name__.lower()
+    return type(f'{model.__name__}OwnedWhoosheer', (AbstractWhoosheer,), {
+        'models': [model],
+        'schema': schema,
+        # Отдельный каталог: индекс со старой схемой (без user_id) не подхватится
+        'index_subdir': f'{model.__tablename__}_owned',
+        'index_document': classmethod(update),
+        f'insert_{name}': classmethod(update),
+        f'update_{name}': classmethod(update),
+        f'delete_{name}': classmethod(delete),
+    })
+
+
+# Whooshee и анализатор Whoosh импортируются, только если выбран этот движок
+class WhooshSearchBackend:
+    name = 'whoosh'
+
+    def __init__(self, app, db, sources):
+        from whoosh.analysis import LanguageAnalyzer
+        from flask_whooshee import Whooshee
+
+        self.db = db
+        self.sources = sources
+        self.whooshee = Whooshee()
+        self.whooshee.init_app(app)
+        self.whooshee.on_commit = self._scoped(self.whooshee.on_commit)
+        # Анализатор с русской морфологией (snowball), общий для всех индексируемых полей
+        analyzer = LanguageAnalyzer('ru')
+        self.owned = {}
+        self._ready = False
+        for kind, (model, fields) in sources.items():
+            if hasattr(model, 'user_id'):
+                self.owned[kind] = owned_whoosheer(model, fields, analyzer)
+                self.whooshee.register_whoosheer(self.owned[kind])
+            else:
+                self.whooshee.register_model(*fields, analyzer=analyzer)(model)
+
+    # Слушатели моделей у SQLAlchemy общие на процесс: при нескольких create_app
+    # (тесты, бенчмарки) индекс пишет только Whooshee текущего приложения
+    def _scoped(self, on_commit):
+        from flask import current_app
+
+        def scoped(changes):
+            config = current_app.extensions.get('whooshee')
+            if config is not None and config['whoosheers'] is self.whooshee.whoosheers:
+                on_commit(changes)
+        return scoped
+
+    # Индекс личных записей появился позже остальных: при первом запуске наполняется из базы
+    def ensure_schema(self):
+        from whoosh.index import LockError
+        from flask import current_app
+        from flask_whooshee import Whooshee
+
+        if self._ready:
+            return
+        for kind, whoosheer in self.owned.items():
+            model, _ = self.sources[kind]
+            index = Whooshee.get_or_create_index(current_app, whoosheer)
+            if index.doc_count_all() or not self.db.session.query(model.id).limit(1).first():
+                continue
+            try:
+                with index.writer(timeout=current_app.config.get('WHOOSHEE_WRITER_TIMEOUT', 2)) as writer:
+                    for obj in model.query.yield_per(1000):
+                        whoosheer.index_document(writer, obj)
+            except LockError:
+                # Индекс заполняет соседний воркер; проверим ещё раз при следующем поиске
+                return
+            logger.info(f"Заполнен индекс {whoosheer.index_subdir}")
+        self._ready = True
+
+    def reindex(self):
+        self.whooshee.reindex()
+
+    def search(self, kind, query, limit, offset=0, user_id=None):
+        import whoosh.qparser
+
+        model, _ = self.sources[kind]
+        terms = query_terms(query)
+        if not terms:
+            return []
+        if kind in self.owned:
+            return self._search_owned(kind, ' '.join(terms), limit, offset, user_id)
+
+        try:
+            q = model.query.whooshee_search(
+                ' '.join(terms),
+                group=whoosh.qparser.AndGroup,
+                match_substrings=False,
+                limit=offset + limit,
+                order_by_relevance=-1,
+            )
+        except ValueError:
+            # Whooshee отвергает слишком короткие запросы
+            return []
+        return q.offset(offset).limit(limit).all()
+
+    def _search_owned(self, kind, query, limit, offset, user_id):
+        import whoosh.qparser
+        from whoosh.query import Term
+        from flask import current_app
+        from flask_whooshee import Whooshee
+
+        model, fields = self.sources[kind]
+        whoosheer = self.owned[kind]
+        try:
+            prepped = whoosheer.prep_search_string(query, match_substrings=False)
+        except ValueError:
+            return []
+        self.ensure_schema()
+        index = Whooshee.get_or_create_index(current_app, whoosheer)
+        with index.searcher() as searcher:
+            parser = whoosh.qparser.MultifieldParser(list(fields), index.schema, group=whoosh.qparser.AndGroup)
+            owner = Term('user_id', str(user_id)) if user_id is not None else None
+            hits = searcher.search(parser.parse(prepped), filter=owner, limit=offset + limit)
+            ids = [hit['id'] for hit in hits[offset:offset + limit]]
+        if not ids:
+            return []
+        rows = {obj.id: obj for obj in model.query.filter(model.id.in_(ids))}
+        return [rows[i] for i in ids if i in rows]
+
+
+class Fts5SearchBackend:
+    name = 'fts5'
+
+    def __init__(self, db, sources):
+        self.db = db
+        self.sources = sources
+        self._ready = False
+
+    def _fts_table(self, model):
+        return f"{model.__tablename__}_fts"
+
+    # Таблицы FTS5 с внешним содержимым и триггеры синхронизации, как в документации SQLite
+    def ensure_schema(self):
+        if self._ready:
+            return
+        with self.db.engine.begin() as conn:
+            for model, fields in self.sources.values():
+                table = model.__tablename__
+                fts = self._fts_table(model)
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {'name': fts}
+                ).first()
+                if exists:
+                    continue
+
+                columns = ', '.join(fields)
+                new_values = ', '.join(f'new.{f}' for f in fields)
+                old_values = ', '.join(f'old.{f}' for f in fields)
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE {fts} USING fts5({columns}, content='{table}', "
+                    f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+                ))
+                conn.execute(text(
+                    f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+                    f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+                ))
+                conn.execute(text(
+                    f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+                ))
+                conn.execute(text(
+                    f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+                    f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+                ))
+                # Строки, добавленные до создания индекса
+                conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+                logger.info(f"Создан полнотекстовый индекс {fts}")
+        self._ready = True
+
+    def reindex(self):
+        self.ensure_schema()
+        with self.db.engine.begin() as conn:
+            for model, _ in self.sources.values():
+                fts = self._fts_table(model)
+                conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+    # Русской морфологии в FTS5 нет, поэтому ищем по префиксу основы слова:
+    # «ледников» -> ледник* найдёт и «ледники», и «ледниками»
+    def _match_expression(self, query):
+        stem = _stemmer()
+        return ' '.join(f'"{stem(term)}"*' for term in query_terms(query))
+
+    def search(self, kind, query, limit, offset=0, user_id=None):
+        model, _ = self.sources[kind]
+        match = self._match_expression(query)
+        if not match:
+            return []
+        self.ensure_schema()
+
+        table = model.__tablename__
+        fts = self._fts_table(model)
+        sql = (
+            f"SELECT {fts}.rowid FROM {fts} JOIN {table} ON {table}.id = {fts}.rowid "
+            f"WHERE {fts} MATCH :match"
+        )
+        params = {'match': match, 'limit': limit, 'offset': offset}
+        if user_id is not None:
+            sql += f" AND {table}.user_id = :user_id"
+            params['user_id'] = user_id
+        sql += f" ORDER BY bm25({fts}) LIMIT :limit OFFSET :offset"
+
+        ids = [row[0] for row in self.db.session.execute(text(sql), params)]
+        if not ids:
+            return []
+        rows = {obj.id: obj for obj in model.query.filter(model.id.in_(ids))}
+        return [rows[i] for i in ids if i in rows]
+
+
+# Кэш результатов поверх любого движка: нормализованный запрос -> список id.
+# При попадании строки читаются по первичному ключу, индекс не трогается.
+# Сбрасывается целиком при изменении контента (services.py) и при reindex()
+class CachedSearchBackend:
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+        self.name = backend.name
+        self.sources = backend.sources
+
+    def ensure_schema(self):
+        self.backend.ensure_schema()
+
+    def reindex(self):
+        self.backend.reindex()
+        self.invalidate()
+
+    def invalidate(self):
+        self.cache.clear()
+
+    def search(self, kind, query, limit, offset=0, user_id=None):
+        key = (kind, clean_query(query), limit, offset, user_id)
+        ids = self.cache.get(key)
+        if ids is None:
+            rows = self.backend.search(kind, query, limit, offset, user_id=user_id)
+            self.cache.set(key, [row.id for row in rows])
+            return rows
+        if not ids:
+            return []
+        model, _ = self.sources[kind]
+        rows = {obj.id: obj for obj in model.query.filter(model.id.in_(ids))}
+        return [rows[i] for i in ids if i in rows]
+
+    def stats(self):
+        return self.cache.stats()
+
+
+def create_search_backend(name, app, db, sources):
+    if name == 'fts5':
+        return Fts5SearchBackend(db, sources)
+    if name != 'whoosh':
+        logger.warning(f"Неизвестный SEARCH_BACKEND={name!r}, используется whoosh")
+    return WhooshSearchBackend(app, db, sources)
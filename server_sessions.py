@@ -0,0 +1,87 @@
+# Сессии на стороне сервера (SESSION_BACKEND=shared): в cookie только
+# подписанный случайный id, данные лежат в общем хранилище (shared_state.py)
+# под ключом session:<id>. Выход или очистка сессии удаляет запись сразу,
+# а не ждёт, пока истечёт cookie. При входе и выходе id выдаётся заново:
+# id, известный до входа (фиксация сессии), к вошедшему пользователю не ведёт
+from flask.sessions import SessionInterface, SessionMixin
+from flask.json.tag import TaggedJSONSerializer
+from werkzeug.datastructures import CallbackDict
+from itsdangerous import Signer, BadSignature
+import secrets
+
+KEY_PREFIX = 'session:'
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        # Пользователь на момент загрузки: его смена означает вход или выход
+        self.loaded_user_id = self.get('_user_id')
+
+
+class SharedSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='shared-session')
+
+    def _ttl(self, app):
+        return int(app.permanent_session_lifetime.total_seconds())
+
+    def open_session(self, app, request):
+        return self.load(app, request.cookies.get(self.get_cookie_name(app)))
+
+    # Сессия по значению cookie; используется и асинхронными маршрутами asgi.py
+    def load(self, app, cookie):
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            if sid:
+                data = self.store.get(KEY_PREFIX + sid)
+                if data is not None:
+                    return ServerSession(self.serializer.loads(data.decode('utf-8')), sid=sid)
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    # Сохраняет данные и возвращает значение для cookie
+    def dump(self, app, session):
+        if session.get('_user_id') != session.loaded_user_id:
+            if not session.new:
+                self.store.delete(KEY_PREFIX + session.sid)
+            session.sid = secrets.token_urlsafe(32)
+            session.loaded_user_id = session.get('_user_id')
+        self.store.set(KEY_PREFIX + session.sid, self.serializer.dumps(dict(session)), self._ttl(app))
+        return self._signer(app).sign(session.sid).decode()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(KEY_PREFIX + session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.accessed:
+            response.vary.add('Cookie')
+        if not self.should_set_cookie(app, session):
+            return
+        response.set_cookie(
+            name, self.dump(app, session),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain, path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
@@ -0,0 +1,191 @@
+# Сервисы приложения: кэши, пулы потоков и процессов, поиск, рассылка чата.
+# Создаются в create_app() по настройкам и хранятся в app.extensions['services'],
+# обработчики обращаются к ним через extensions.services
+from flask import has_app_context
+from sqlalchemy import event
+from functools import partial
+from extensions import db, services
+from models import Note, DiaryEntry, Meme, messages_after
+from news_cache import NewsCache
+from render_cache import RenderCache
+from credentials import CredentialService
+from storage import ContentStore
+from search_engine import create_search_backend, CachedSearchBackend
+from suggest import SuggestIndex
+from faq import FaqEngine
+from ttl_cache import TTLCache
+from meme_repository import MemeRepository
+from images import ImagePipeline
+from chat_broadcast import create_broadcaster
+from chat_retention import ChatArchive, ChatRetention
+from shared_state import create_state_store
+from uploads import release_failed_upload
+import json
+
+
+class Services:
+    def __init__(self, app):
+        # Ключи, счётчики и pub/sub, общие для воркеров (STATE_BACKEND=local|resp);
+        # с memory каждый процесс живёт сам по себе, как раньше
+        self.shared_state = create_state_store(
+            app.config['STATE_BACKEND'], app.config['STATE_URL'], app.config['STATE_PREFIX'])
+        shared = self.shared_state.name != 'memory'
+
+        # Новости ТАСС обновляются в фоне, главная страница их не ждёт
+        self.news_cache = NewsCache(
+            url=app.config['NEWS_URL'],
+            refresh_interval=app.config['NEWS_REFRESH_INTERVAL'],
+            cache_file=app.config['NEWS_CACHE_FILE'] or None,
+        )
+
+        # Готовые HTML-фрагменты главной страницы и списка мемов
+        self.render_cache = RenderCache(
+            maxsize=app.config['RENDER_CACHE_SIZE'],
+            ttl=app.config['RENDER_CACHE_TTL'],
+            cache_dir=app.config['RENDER_CACHE_DIR'],
+            store=self.shared_state if shared else None,
+        )
+        self.news_cache.on_refresh(lambda news: self.render_cache.invalidate('news'))
+
+        # Пароли хэшируются в пуле процессов, а не в потоке запроса
+        self.credentials = CredentialService(
+            method=app.config['PASSWORD_HASH_METHOD'],
+            workers=app.config['PASSWORD_HASH_WORKERS'],
+            max_pending=app.config['PASSWORD_HASH_QUEUE'],
+        )
+
+        self.upload_store = ContentStore(app.config['STORAGE_FOLDER'], app.config['STORAGE_WORK_DIR'])
+
+        # Повторные запросы берут список id из кэша и не трогают полнотекстовый индекс
+        self.search_backend = CachedSearchBackend(
+            create_search_backend(app.config['SEARCH_BACKEND'], app, db, {
+                'diary': (DiaryEntry, ('title', 'content')),
+                'meme': (Meme, ('description',)),
+                'note': (Note, ('content',)),
+            }),
+            TTLCache(maxsize=app.config['SEARCH_CACHE_SIZE'], ttl=app.config['SEARCH_CACHE_TTL']),
+        )
+
+        # Ответы бота: индекс строится один раз, faq.json перечитывается при изменении
+        self.faq_engine = FaqEngine(reload_interval=app.config['FAQ_RELOAD_INTERVAL'])
+
+        # Подсказки при наборе: строятся в фоне после первого запроса к /search/suggest
+        self.suggest_index = SuggestIndex(partial(self.suggest_texts, app), app.config['SUGGEST_REBUILD_INTERVAL'])
+
+        # Изменения из одного воркера доходят до кэшей поиска и подсказок остальных
+        self.shared_state.subscribe('search-invalidate', lambda _: self.search_backend.invalidate())
+        self.shared_state.subscribe('suggest-texts', lambda payload: self.suggest_index.add_texts(json.loads(payload)))
+
+        # Снимки пользователей для load_user: страницы не ходят в таблицу user на каждый запрос.
+        # Изменённый профиль сбрасывается во всех воркерах, а не ждёт USER_CACHE_TTL
+        self.user_cache = TTLCache(maxsize=app.config['USER_CACHE_SIZE'], ttl=app.config['USER_CACHE_TTL'])
+        self.shared_state.subscribe('user-invalidate', lambda payload: self.user_cache.delete(int(payload)))
+
+        self.meme_repo = MemeRepository(db, Meme)
+
+        # Миниатюры и WebP-варианты мемов строятся в пуле потоков после ответа пользователю
+        self.image_pipeline = ImagePipeline(max_workers=app.config['IMAGE_WORKERS'])
+
+        # Новые сообщения доставляются через Server-Sent Events, а не перезагрузкой страницы
+        self.chat_broadcaster = create_broadcaster(
+            app.config['CHAT_BROADCASTER'], partial(self.chat_messages_after, app),
+            app.config['CHAT_POLL_INTERVAL'], self.shared_state)
+
+        # Старые сообщения чата уходят в помесячные архивы, таблица остаётся небольшой
+        self.chat_retention = ChatRetention(
+            db, ChatArchive(app.config['CHAT_ARCHIVE_DIR']),
+            max_age_days=app.config['CHAT_RETENTION_DAYS'],
+            max_messages=app.config['CHAT_RETENTION_MAX_MESSAGES'],
+            batch_size=app.config['CHAT_RETENTION_BATCH'],
+            interval=app.config['CHAT_RETENTION_INTERVAL'],
+        )
+
+        app.extensions['services'] = self
+
+    # Тексты для подсказок; заметки личные и в подсказки не попадают.
+    # Читаются из фонового потока, поэтому со своим контекстом приложения
+    def suggest_texts(self, app):
+        yield from self.faq_engine.questions()
+        with app.app_context():
+            for column in (DiaryEntry.title, Meme.description):
+                yield from db.session.execute(db.select(column).execution_options(yield_per=1000)).scalars()
+            db.session.rollback()
+
+    # Опрос чата из фонового потока рассылки (CHAT_BROADCASTER=database)
+    def chat_messages_after(self, app, after_id):
+        with app.app_context():
+            return messages_after(after_id)
+
+    # Значения для /metrics
+    def metrics(self):
+        metrics = {
+            'news_cache_age_seconds': self.news_cache.age() or 0,
+            'memes_total': self.meme_repo.count(),
+            'image_pipeline_pending': self.image_pipeline.stats()['pending'],
+        }
+        for prefix, source in (('news_cache', self.news_cache), ('user_cache', self.user_cache),
+                               ('render_cache', self.render_cache), ('credentials', self.credentials),
+                               ('chat_retention', self.chat_retention), ('search_cache', self.search_backend),
+                               ('suggest', self.suggest_index)):
+            for name, value in source.stats().items():
+                metrics[f'{prefix}_{name}'] = value
+        return metrics
+
+
+# Кэш списка мемов сбрасывается после коммита, чтобы параллельный запрос
+# не закэшировал старые данные (флаги ставят models.meme_changed и meme_added/meme_removed).
+# Слушатели сессии ставятся один раз при импорте и работают с сервисами текущего приложения
+@event.listens_for(db.session, 'after_commit')
+def invalidate_memes_cache(session):
+    changed = session.info.pop('memes_changed', False)
+    delta = session.info.pop('memes_delta', 0)
+    if not has_app_context():
+        return
+    if delta:
+        services.meme_repo.apply_delta(delta)
+    if changed:
+        services.render_cache.invalidate('memes')
+
+# Флаги ставят обработчики в models.py: кэш поиска сбрасывается, новые тексты идут в подсказки
+@event.listens_for(db.session, 'after_commit')
+def update_search_caches(session):
+    changed = session.info.pop('search_changed', False)
+    texts = session.info.pop('suggest_texts', None)
+    if not has_app_context():
+        return
+    # Свой кэш сбрасывается сразу, остальные воркеры — по сообщению
+    if changed:
+        services.search_backend.invalidate()
+        services.shared_state.publish('search-invalidate', '')
+    if texts:
+        services.shared_state.publish('suggest-texts', json.dumps(list(texts), ensure_ascii=False))
+
+# Флаг ставит models.user_changed: свой кэш сбрасывается сразу, остальные воркеры — по сообщению
+@event.listens_for(db.session, 'after_commit')
+def invalidate_users(session):
+    user_ids = session.info.pop('users_changed', None)
+    if user_ids and has_app_context():
+        for user_id in user_ids:
+            services.user_cache.delete(user_id)
+            services.shared_state.publish('user-invalidate', str(user_id))
+
+# Ссылки на загруженные файлы закоммичены: запасные копии больше не нужны (storage.settle)
+@event.listens_for(db.session, 'after_commit')
+def settle_uploads(session):
+    spares = session.info.pop('upload_spares', None)
+    if spares and has_app_context():
+        for spare, relpath in spares:
+            services.upload_store.settle(spare, relpath)
+
+@event.listens_for(db.session, 'after_rollback')
+def forget_memes_changes(session):
+    session.info.pop('memes_changed', None)
+    session.info.pop('memes_delta', None)
+    session.info.pop('users_changed', None)
+    session.info.pop('search_changed', None)
+    session.info.pop('suggest_texts', None)
+    spares = session.info.pop('upload_spares', None)
+    if spares and has_app_context():
+        # Ссылка на файл не записана: только что поставленный файл никому не нужен
+        for spare, relpath in spares:
+            release_failed_upload(spare, relpath)
@@ -0,0 +1,393 @@
+# Общее состояние для нескольких воркеров и машин: ключи со сроком жизни,
+# атомарные счётчики и pub/sub. Хранилище выбирается настройкой STATE_BACKEND:
+#   memory — словарь в процессе (по умолчанию, один воркер);
+#   local  — файл SQLite (STATE_URL — путь), общий для воркеров на одной машине;
+#   resp   — сервер с протоколом Redis (STATE_URL=redis://host:6379/0), общий для машин.
+# Значения — bytes (str кодируется в UTF-8); подписчики вызываются в фоновом потоке
+from urllib.parse import urlparse
+from collections import defaultdict
+import threading
+import sqlite3
+import logging
+import socket
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCAL_PATH = 'shared_state.db'
+MESSAGE_TTL = 60
+
+
+def _to_bytes(value):
+    return value.encode('utf-8') if isinstance(value, str) else bytes(value)
+
+
+class _StoreBase:
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self._callbacks = defaultdict(list)
+        self._listener = None
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _key(self, key):
+        return f'{self.prefix}{key}'
+
+    # После fork (gunicorn) соединения и поток подписки родителя непригодны
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._local = threading.local()
+            self._lock = threading.Lock()
+            self._listener = None
+            if self._callbacks:
+                self._start_listener()
+
+    def subscribe(self, channel, callback):
+        with self._lock:
+            self._callbacks[channel].append(callback)
+        self._check_fork()
+        self._start_listener()
+        return callback
+
+    def _deliver(self, channel, payload):
+        for callback in list(self._callbacks.get(channel, ())):
+            try:
+                callback(payload)
+            except Exception as e:
+                logger.error(f"Ошибка подписчика канала {channel}: {e}")
+
+    def _start_listener(self):
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = threading.Thread(target=self._listen, name=f'{self.name}-pubsub', daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        pass
+
+
+class MemoryStateStore(_StoreBase):
+    name = 'memory'
+
+    def __init__(self, prefix=''):
+        super().__init__(prefix)
+        self._data = {}
+
+    def _live(self, key, now):
+        item = self._data.get(key)
+        if item is not None and item[0] is not None and item[0] < now:
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key):
+        with self._lock:
+            item = self._live(self._key(key), time.time())
+        return item[1] if item else None
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[self._key(key)] = (expires, _to_bytes(value))
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(self._key(key), None)
+
+    def delete_prefix(self, prefix):
+        prefix = self._key(prefix)
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def incr(self, key, amount=1, ttl=None):
+        key = self._key(key)
+        now = time.time()
+        with self._lock:
+            item = self._live(key, now)
+            if item is None:
+                item = (now + ttl if ttl else None, b'0')
+            value = int(item[1]) + amount
+            self._data[key] = (item[0], str(value).encode())
+        return value
+
+    # Подписчики в том же процессе, доставка сразу
+    def publish(self, channel, message):
+        self._deliver(channel, message)
+
+    def _start_listener(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# Один файл SQLite в режиме WAL: запись атомарна между процессами,
+# pub/sub — таблица сообщений, которую подписчики опрашивают по id
+class LocalStateStore(_StoreBase):
+    name = 'local'
+
+    def __init__(self, path=DEFAULT_LOCAL_PATH, prefix='', poll_interval=0.2):
+        super().__init__(prefix)
+        self.path = path
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute('CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB, expires REAL)')
+        conn.execute('CREATE TABLE IF NOT EXISTS messages '
+                     '(id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT, payload BLOB, created REAL)')
+
+    def _conn(self):
+        self._check_fork()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute('SELECT value, expires FROM kv WHERE key = ?', (self._key(key),)).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return bytes(row[0]) if not isinstance(row[0], int) else str(row[0]).encode()
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        self._conn().execute('INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)',
+                             (self._key(key), _to_bytes(value), expires))
+        self._maybe_purge()
+
+    def delete(self, key):
+        self._conn().execute('DELETE FROM kv WHERE key = ?', (self._key(key),))
+
+    def delete_prefix(self, prefix):
+        prefix = self._key(prefix)
+        self._conn().execute('DELETE FROM kv WHERE key >= ? AND key < ?', (prefix, prefix + '\U0010ffff'))
+
+    # Истёкший счётчик начинается заново; срок ставится при создании
+    def incr(self, key, amount=1, ttl=None):
+        now = time.time()
+        expires = now + ttl if ttl else None
+        row = self._conn().execute(
+            'INSERT INTO kv (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET '
+            '  value = CASE WHEN kv.expires < ? THEN excluded.value ELSE CAST(kv.value AS INTEGER) + excluded.value END, '
+            '  expires = CASE WHEN kv.expires < ? THEN excluded.expires ELSE kv.expires END '
+            'RETURNING value',
+            (self._key(key), amount, expires, now, now)).fetchone()
+        self._maybe_purge()
+        return int(row[0])
+
+    def publish(self, channel, message):
+        self._conn().execute('INSERT INTO messages (channel, payload, created) VALUES (?, ?, ?)',
+                             (channel, _to_bytes(message), time.time()))
+        self._maybe_purge()
+
+    # Истёкшие ключи и старые сообщения удаляются попутно, раз в 1000 записей
+    def _maybe_purge(self):
+        self._writes += 1
+        if self._writes % 1000:
+            return
+        now = time.time()
+        conn = self._conn()
+        conn.execute('DELETE FROM kv WHERE expires < ?', (now,))
+        conn.execute('DELETE FROM messages WHERE created < ?', (now - MESSAGE_TTL,))
+
+    def _listen(self):
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM messages').fetchone()[0]
+        while not self._stop.wait(self.poll_interval):
+            try:
+                rows = conn.execute('SELECT id, channel, payload FROM messages WHERE id > ? ORDER BY id',
+                                    (last_id,)).fetchall()
+            except sqlite3.Error as e:
+                logger.warning(f"Не удалось прочитать сообщения общего состояния: {e}")
+                continue
+            for message_id, channel, payload in rows:
+                last_id = message_id
+                if channel in self._callbacks:
+                    self._deliver(channel, bytes(payload).decode('utf-8'))
+
+    def close(self):
+        self._stop.set()
+
+
+class RespError(Exception):
+    pass
+
+
+# Минимальный клиент протокола RESP2: только команды, которые нужны хранилищу
+class RespConnection:
+    def __init__(self, host, port, db=0, password=None, timeout=5):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.reader = self.sock.makefile('rb')
+        if password:
+            self.execute('AUTH', password)
+        if db:
+            self.execute('SELECT', db)
+
+    def send(self, *args):
+        parts = [f'*{len(args)}\r\n'.encode()]
+        for arg in args:
+            data = _to_bytes(arg if isinstance(arg, (str, bytes)) else str(arg))
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        self.sock.sendall(b''.join(parts))
+
+    def read(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('Соединение закрыто сервером')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            raise RespError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            size = int(rest)
+            if size < 0:
+                return None
+            data = self.reader.read(size + 2)
+            return data[:-2]
+        if kind == b'*':
+            size = int(rest)
+            return None if size < 0 else [self.read() for _ in range(size)]
+        raise RespError(f'Неизвестный ответ: {line!r}')
+
+    def execute(self, *args):
+        self.send(*args)
+        return self.read()
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def _glob_escape(value):
+    return ''.join('\\' + c if c in '*?[]\\' else c for c in value)
+
+
+class RespStateStore(_StoreBase):
+    name = 'resp'
+
+    def __init__(self, url, prefix=''):
+        super().__init__(prefix)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.password = parsed.password
+        self._stop = threading.Event()
+        self._sub_conn = None
+
+    def _connect(self, timeout=5):
+        return RespConnection(self.host, self.port, self.db, self.password, timeout)
+
+    # Соединение на поток; при обрыве одна повторная попытка с новым соединением
+    def _execute(self, *args):
+        self._check_fork()
+        for attempt in (1, 2):
+            conn = getattr(self._local, 'conn', None)
+            if conn is None:
+                conn = self._local.conn = self._connect()
+            try:
+                return conn.execute(*args)
+            except (OSError, ConnectionError):
+                conn.close()
+                self._local.conn = None
+                if attempt == 2:
+                    raise
+
+    def get(self, key):
+        return self._execute('GET', self._key(key))
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self._execute('SET', self._key(key), _to_bytes(value), 'PX', int(ttl * 1000))
+        else:
+            self._execute('SET', self._key(key), _to_bytes(value))
+
+    def delete(self, key):
+        self._execute('DEL', self._key(key))
+
+    def delete_prefix(self, prefix):
+        pattern = _glob_escape(self._key(prefix)) + '*'
+        cursor = '0'
+        while True:
+            cursor, keys = self._execute('SCAN', cursor, 'MATCH', pattern, 'COUNT', 500)
+            if keys:
+                self._execute('DEL', *keys)
+            cursor = cursor.decode() if isinstance(cursor, bytes) else str(cursor)
+            if cursor == '0':
+                break
+
+    # Срок ставится тем, кто создал счётчик (первый INCRBY вернул amount)
+    def incr(self, key, amount=1, ttl=None):
+        key = self._key(key)
+        value = self._execute('INCRBY', key, amount)
+        if ttl and value == amount:
+            self._execute('PEXPIRE', key, int(ttl * 1000))
+        return value
+
+    def publish(self, channel, message):
+        self._execute('PUBLISH', self._key(channel), _to_bytes(message))
+
+    # Канал, добавленный после старта потока, подписывается через его соединение
+    def subscribe(self, channel, callback):
+        super().subscribe(channel, callback)
+        conn = self._sub_conn
+        if conn is not None:
+            try:
+                conn.send('SUBSCRIBE', self._key(channel))
+            except OSError:
+                pass  # поток переподключится и подпишется на все каналы
+        return callback
+
+    def _listen(self):
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                conn = self._connect(timeout=None)
+            except OSError as e:
+                logger.warning(f"Нет соединения с {self.host}:{self.port} для подписки: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+                continue
+            backoff = 1
+            self._sub_conn = conn
+            try:
+                conn.send('SUBSCRIBE', *[self._key(channel) for channel in list(self._callbacks)])
+                while not self._stop.is_set():
+                    reply = conn.read()
+                    if reply[0] == b'message':
+                        self._deliver(reply[1].decode()[len(self.prefix):], reply[2].decode('utf-8'))
+            except (OSError, ConnectionError, RespError) as e:
+                logger.warning(f"Подписка на {self.host}:{self.port} прервана: {e}")
+            finally:
+                self._sub_conn = None
+                conn.close()
+
+    def close(self):
+        self._stop.set()
+        if self._sub_conn is not None:
+            self._sub_conn.close()
+
+
+def create_state_store(name, url='', prefix=''):
+    if name == 'local':
+        return LocalStateStore(url or DEFAULT_LOCAL_PATH, prefix)
+    if name == 'resp':
+        return RespStateStore(url or 'redis://localhost:6379/0', prefix)
+    if name != 'memory':
+        logger.warning(f"Неизвестный STATE_BACKEND={name!r}, используется memory")
+    return MemoryStateStore(prefix)
@@ -0,0 +1,245 @@
+# Хранилище загрузок по хэшу содержимого.
+# Файл пишется во временный файл с одновременным подсчётом SHA-256 и затем
+# переносится в <root>/ab/cd/<hash><ext>; одинаковые файлы хранятся один раз.
+# sniff(head) по первым байтам возвращает расширение или бросает исключение —
+# так неподходящий файл отклоняется до того, как прочитано всё тело.
+# Гонка «удалили последнюю ссылку — тут же загрузили тот же файл» между
+# воркерами: размещение и удаление файла идут под блокировкой по хэшу;
+# загрузка ставит файл жёсткой ссылкой и держит временный файл запасным
+# до коммита, после коммита settle() возвращает файл, если его успели удалить.
+# Временные файлы и блокировки лежат в work_dir, а не в root: root раздаётся
+# как static, и незавершённые загрузки не должны быть доступны по URL
+from collections import namedtuple
+from contextlib import contextmanager
+import threading
+import tempfile
+import hashlib
+import asyncio
+import shutil
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка только между потоками одного процесса
+    fcntl = None
+
+CHUNK_SIZE = 64 * 1024
+HEAD_SIZE = 16
+LOCK_STRIPES = 256
+
+# spare — временный файл с тем же содержимым, нужен до коммита (см. settle)
+StoredUpload = namedtuple('StoredUpload', 'digest relpath size spare')
+_thread_lock = threading.Lock()
+
+
+# Пути хранилища имеют вид ab/cd/<hash>.ext, старые имена файлов — без каталогов
+def is_stored_path(filename):
+    return '/' in filename
+
+
+def upload_static_path(filename):
+    return f'uploads/{filename}' if is_stored_path(filename) else filename
+
+
+class ContentStore:
+    # work_dir — на том же диске, что root, иначе вместо жёстких ссылок будут копии
+    def __init__(self, root, work_dir, chunk_size=CHUNK_SIZE):
+        self.root = root
+        self.work_dir = work_dir
+        self.chunk_size = chunk_size
+
+    def relpath(self, digest, ext=''):
+        return f"{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+    def path(self, relpath):
+        return os.path.join(self.root, *relpath.split('/'))
+
+    def _tmp_dir(self):
+        tmp_dir = os.path.join(self.work_dir, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        return tmp_dir
+
+    # Блокировка файла хранилища для всех воркеров; 256 файлов блокировок по первым символам хэша
+    @contextmanager
+    def lock(self, relpath):
+        if fcntl is None:
+            with _thread_lock:
+                yield
+            return
+        lock_dir = os.path.join(self.work_dir, 'locks')
+        os.makedirs(lock_dir, exist_ok=True)
+        stripe = int(os.path.basename(relpath)[:2], 16) % LOCK_STRIPES
+        with open(os.path.join(lock_dir, f'{stripe:02x}.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    # Возвращает StoredUpload; повторная загрузка того же файла ничего не пишет
+    def save(self, stream, ext='', sniff=None):
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir())
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    if sniff and not size:
+                        ext = sniff(chunk[:HEAD_SIZE])
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+            if sniff and not size:
+                ext = sniff(b'')
+            return self._commit(tmp_path, digest.hexdigest(), ext, size)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    # То же для ASGI-режима: stream.read — корутина (UploadFile Starlette),
+    # запись на диск уходит в пул потоков и не блокирует цикл событий
+    async def save_async(self, stream, ext='', sniff=None):
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir())
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                while True:
+                    chunk = await stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    if sniff and not size:
+                        ext = sniff(chunk[:HEAD_SIZE])
+                    digest.update(chunk)
+                    await asyncio.to_thread(tmp.write, chunk)
+                    size += len(chunk)
+            if sniff and not size:
+                ext = sniff(b'')
+            return await asyncio.to_thread(self._commit, tmp_path, digest.hexdigest(), ext, size)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    # Приёмник для разборщика multipart: куски файла пишутся на диск по мере прихода
+    def open_pending(self, sniff):
+        return PendingUpload(self, sniff)
+
+    def _commit(self, tmp_path, digest, ext, size):
+        relpath = self.relpath(digest, ext)
+        final_path = self.path(relpath)
+        with self.lock(relpath):
+            if not os.path.exists(final_path):
+                self._place(tmp_path, final_path)
+        return StoredUpload(digest, relpath, size, tmp_path)
+
+    def _place(self, src, final_path):
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        try:
+            os.link(src, final_path)
+        except FileExistsError:
+            pass
+        except OSError:
+            # ФС без жёстких ссылок: копия, затем атомарный os.replace
+            fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir())
+            os.close(fd)
+            shutil.copyfile(src, tmp_path)
+            os.replace(tmp_path, final_path)
+
+    # После коммита ссылки на файл: если параллельное удаление успело
+    # его стереть, запасной файл встаёт на место, иначе просто удаляется
+    def settle(self, spare, relpath):
+        final_path = self.path(relpath)
+        with self.lock(relpath):
+            if not os.path.exists(final_path) and os.path.exists(spare):
+                self._place(spare, final_path)
+        self.discard(spare)
+
+    def discard(self, spare):
+        if spare and os.path.exists(spare):
+            os.remove(spare)
+
+    # Удаляет файл, если is_referenced() под блокировкой подтвердил, что ссылок нет;
+    # cleanup — удаление производных файлов (миниатюр) там же
+    def delete_unreferenced(self, relpath, is_referenced, cleanup=None):
+        with self.lock(relpath):
+            if is_referenced(relpath):
+                return False
+            self.delete(relpath)
+            if cleanup is not None:
+                cleanup()
+        return True
+
+    def delete(self, relpath):
+        path = self.path(relpath)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# Файл, который Werkzeug заполняет во время разбора тела запроса.
+# Лежит во временном каталоге хранилища (work_dir); commit() переносит его на место
+# без копирования, а если до commit() дело не дошло, close() его удаляет
+class PendingUpload:
+    def __init__(self, store, sniff):
+        self.store = store
+        self.sniff = sniff
+        self.ext = None
+        self.size = 0
+        self.stored = None
+        self._head = b''
+        self._digest = hashlib.sha256()
+        fd, self.tmp_path = tempfile.mkstemp(dir=store._tmp_dir())
+        self._file = os.fdopen(fd, 'w+b')
+
+    def write(self, data):
+        if self.ext is None:
+            self._head += data[:HEAD_SIZE - len(self._head)]
+            if len(self._head) >= HEAD_SIZE:
+                self._check_head()
+        self._digest.update(data)
+        self._file.write(data)
+        self.size += len(data)
+        return len(data)
+
+    def _check_head(self):
+        try:
+            self.ext = self.sniff(self._head)
+        except BaseException:
+            self.close()
+            raise
+
+    # Разборщик вызывает seek(0), когда часть multipart закончилась
+    def seek(self, offset, whence=0):
+        if self.ext is None and self.size:
+            self._check_head()
+        return self._file.seek(offset, whence)
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def readline(self, size=-1):
+        return self._file.readline(size)
+
+    def tell(self):
+        return self._file.tell()
+
+    def commit(self):
+        if self.stored is None:
+            self._file.close()
+            self.stored = self.store._commit(self.tmp_path, self._digest.hexdigest(), self.ext, self.size)
+        return self.stored
+
+    # После commit() временный файл — запасной, его удаляет settle()/discard()
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if self.stored is None and os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    @property
+    def closed(self):
+        return self._file.closed
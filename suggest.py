@@ -0,0 +1,188 @@
+# Подсказки при наборе запроса: префиксное дерево по словам и коротким фразам
+# из заголовков дневника, описаний мемов и вопросов FAQ бота.
+# В каждом узле заранее хранится top-N продолжений, поэтому подсказка —
+# это проход по буквам префикса без обхода поддерева.
+# Новые записи добавляются после коммита (services.py); удаления
+# учитываются при полной перестройке раз в rebuild_interval секунд.
+# Перестройка идёт в фоновом потоке, запросы до её конца обслуживает
+# старое дерево (до первой сборки подсказок нет); готовое дерево
+# подменяется одним присваиванием
+from search_engine import clean_query
+from collections import Counter
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+TOP_N = 10
+MAX_PHRASE_WORDS = 6
+MIN_WORD_LEN = 2
+RETRY_DELAY = 60
+
+
+class _Node:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []  # [(вес, термин)] по убыванию веса
+
+
+class PrefixTrie:
+    def __init__(self, top_n=TOP_N):
+        self.top_n = top_n
+        self.root = _Node()
+        self.weights = {}
+
+    def add(self, term, weight=1):
+        weight = self.weights.get(term, 0) + weight
+        self.weights[term] = weight
+        node = self.root
+        self._update_top(node, term, weight)
+        for char in term:
+            node = node.children.setdefault(char, _Node())
+            self._update_top(node, term, weight)
+
+    # Сборка целиком: термины идут в порядке убывания веса, поэтому
+    # top каждого узла — просто первые top_n прошедших через него
+    @classmethod
+    def from_weights(cls, weights, top_n=TOP_N):
+        trie = cls(top_n)
+        trie.weights = dict(weights)
+        for term, weight in sorted(weights.items(), key=lambda item: (-item[1], len(item[0]), item[0])):
+            node = trie.root
+            if len(node.top) < top_n:
+                node.top.append((weight, term))
+            for char in term:
+                child = node.children.get(char)
+                if child is None:
+                    child = node.children[char] = _Node()
+                node = child
+                if len(node.top) < top_n:
+                    node.top.append((weight, term))
+        return trie
+
+    def _update_top(self, node, term, weight):
+        top = [item for item in node.top if item[1] != term]
+        if len(top) >= self.top_n and weight <= top[-1][0]:
+            return
+        top.append((weight, term))
+        # При равном весе короче — выше: «ледник» раньше «ледниковый период»
+        top.sort(key=lambda item: (-item[0], len(item[1]), item[1]))
+        node.top = top[:self.top_n]
+
+    def complete(self, prefix, limit=TOP_N):
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [term for _, term in node.top[:limit]]
+
+    def __len__(self):
+        return len(self.weights)
+
+
+# Термины одного текста: каждое слово и начало текста как фраза
+def terms_of(text):
+    words = [w for w in clean_query(text or '').split() if len(w) >= MIN_WORD_LEN]
+    terms = set(words)
+    if len(words) > 1:
+        terms.add(' '.join(words[:MAX_PHRASE_WORDS]))
+    return terms
+
+
+class SuggestIndex:
+    def __init__(self, load_texts, rebuild_interval=3600, top_n=TOP_N):
+        self.load_texts = load_texts
+        self.rebuild_interval = rebuild_interval
+        self.top_n = top_n
+        self._trie = None
+        self._next_build = 0
+        self._building = False
+        self._added = []  # тексты, пришедшие во время сборки
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    # Сборка без блокировки: под _lock только подмена дерева
+    def rebuild(self):
+        started = time.perf_counter()
+        weights = Counter()
+        for text in self.load_texts():
+            weights.update(terms_of(text))
+        trie = PrefixTrie.from_weights(weights, self.top_n)
+        with self._lock:
+            added, self._added = self._added, []
+            for text in added:
+                for term in terms_of(text):
+                    trie.add(term)
+            self._trie = trie
+        self._next_build = time.monotonic() + self.rebuild_interval
+        self.rebuilds += 1
+        logger.info(f"Индекс подсказок построен: {len(trie)} терминов за {time.perf_counter() - started:.2f} с")
+
+    def rebuild_async(self):
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+            self._added = []
+        threading.Thread(target=self._rebuild_background, name='suggest-rebuild', daemon=True).start()
+
+    def _rebuild_background(self):
+        try:
+            self.rebuild()
+        except Exception as e:
+            logger.error(f"Ошибка построения индекса подсказок: {e}")
+            self._next_build = time.monotonic() + RETRY_DELAY
+        finally:
+            self._building = False
+
+    def _get_trie(self):
+        if time.monotonic() >= self._next_build:
+            self.rebuild_async()
+        return self._trie
+
+    def add_texts(self, texts):
+        with self._lock:
+            if self._building:
+                self._added.extend(texts)
+            trie = self._trie
+            if trie is None:
+                return
+            for text in texts:
+                for term in terms_of(text):
+                    trie.add(term)
+
+    # После массовых изменений (импорт, удаления): перестроить в фоне при следующем
+    # запросе, пока идёт сборка, отвечает прежнее дерево
+    def invalidate(self):
+        self._next_build = 0
+
+    # Последнее слово запроса — префикс; если целиком запрос фразой не продолжается,
+    # дополняем только последнее слово, сохраняя уже набранные
+    def suggest(self, query, limit=8):
+        query = clean_query(query)
+        if not query:
+            return []
+        trie = self._get_trie()
+        if trie is None:
+            return []
+        suggestions = trie.complete(query, limit)
+        if len(suggestions) < limit and ' ' in query:
+            head, last = query.rsplit(' ', 1)
+            for word in trie.complete(last, limit):
+                if ' ' not in word:
+                    candidate = f'{head} {word}'
+                    if candidate not in suggestions:
+                        suggestions.append(candidate)
+                if len(suggestions) >= limit:
+                    break
+        return suggestions[:limit]
+
+    def stats(self):
+        return {
+            'terms': len(self._trie) if self._trie is not None else 0,
+            'rebuilds': self.rebuilds,
+        }
@@ -0,0 +1,97 @@
+# Общие фикстуры: приложение на временной базе в отдельном каталоге,
+# новости берутся с локальной заглушки ТАСС, в сеть тесты не ходят
+import io
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.stub_server import start_stub_server  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def news_url():
+    server, url = start_stub_server()
+    yield url
+    server.shutdown()
+
+
+# make_app(**config) — приложение с таблицами; относительные пути (static/,
+# whooshee/, profiles/) попадают во временный каталог теста
+@pytest.fixture
+def make_app(tmp_path, monkeypatch, news_url):
+    monkeypatch.chdir(tmp_path)
+    from app import create_app
+    from extensions import db
+
+    apps = []
+
+    def make(**config):
+        settings = {
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+            'NEWS_URL': news_url,
+            'NEWS_CACHE_FILE': '',
+            'WHOOSHEE_DIR': str(tmp_path / 'whooshee'),
+            'STORAGE_WORK_DIR': str(tmp_path / 'instance' / 'storage'),
+            'ADMISSION_ENABLED': False,
+            'CHAT_RETENTION_INTERVAL': 0,
+            # Быстрый хэш в текущем потоке: тесты проверяют логику, а не стойкость KDF
+            'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+            'PASSWORD_HASH_WORKERS': 0,
+        }
+        settings.update(config)
+        app = create_app(settings)
+        # В репозитории шаблоны лежат рядом с app.py, а не в templates/
+        app.template_folder = app.root_path
+        with app.app_context():
+            db.create_all()
+            app.extensions['services'].search_backend.ensure_schema()
+        apps.append(app)
+        return app
+
+    yield make
+
+    for app in apps:
+        services = app.extensions['services']
+        services.credentials.shutdown(wait=False)
+        services.image_pipeline.shutdown(wait=True)
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def register(client, username='alice', password='secret-password'):
+    return client.post('/register', data={'username': username, 'password': password})
+
+
+def login(client, username='alice', password='secret-password'):
+    return client.post('/login', data={'username': username, 'password': password})
+
+
+# Регистрация сама не входит в систему: регистрируемся и входим
+def sign_in(client, username='alice', password='secret-password'):
+    register(client, username, password)
+    return login(client, username, password)
+
+
+def png_bytes(color=(200, 30, 30), size=(8, 8)):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from admission import Rule, MemoryBuckets, DatabaseBuckets, SharedBuckets
+from extensions import admission, db
+from models import RateLimitBucket
+from shared_state import MemoryStateStore
+
+
+@pytest.fixture
+def limited(make_app):
+    def make(**config):
+        return make_app(ADMISSION_ENABLED=True, **config)
+    yield make
+    admission.enabled = False
+
+
+def login(client, **kwargs):
+    return client.post('/login', data={'username': 'nobody', 'password': 'wrong-password'}, **kwargs)
+
+
+def test_login_burst_gets_429_per_client(limited):
+    app = limited(ADMISSION_RULES={'auth.login': Rule(1 / 60, 2, ('POST',))})
+    client = app.test_client()
+
+    assert [login(client).status_code for _ in range(2)] == [200, 200]
+    throttled = login(client)
+    assert throttled.status_code == 429
+    assert 55 <= int(throttled.headers['Retry-After']) <= 60
+    # GET не считается, у другого адреса своя корзина
+    assert client.get('/login').status_code == 200
+    assert login(client, environ_base={'REMOTE_ADDR': '10.0.0.2'}).status_code == 200
+
+
+def test_rules_are_not_inherited_by_next_app(limited):
+    limited(ADMISSION_RULES={'auth.login': Rule(1 / 60, 1, ('POST',))})
+    limited()
+    assert admission.rules['auth.login'].burst == 10
+
+
+def test_forwarded_for_only_behind_trusted_proxy(limited):
+    rules = {'auth.login': Rule(1 / 60, 1, ('POST',))}
+    client = limited(ADMISSION_RULES=rules).test_client()
+    login(client, headers={'X-Forwarded-For': '1.1.1.1'})
+    # Без TRUSTED_PROXIES подставленный заголовок не даёт новую корзину
+    assert login(client, headers={'X-Forwarded-For': '2.2.2.2'}).status_code == 429
+
+    client = limited(ADMISSION_RULES=rules, TRUSTED_PROXIES=1).test_client()
+    login(client, headers={'X-Forwarded-For': '1.1.1.1'})
+    assert login(client, headers={'X-Forwarded-For': '2.2.2.2'}).status_code == 200
+    assert login(client, headers={'X-Forwarded-For': '2.2.2.2'}).status_code == 429
+
+
+def test_expensive_route_sheds_load(limited):
+    app = limited(ADMISSION_MAX_CONCURRENT=1)
+    client = app.test_client()
+    assert admission.acquire('search.search')
+    try:
+        response = client.get('/search?q=климат')
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+    finally:
+        admission.release()
+    assert client.get('/search?q=климат').status_code == 200
+    assert admission.metrics()['admission_shed_search_search'] == 1
+    assert admission.in_flight == 0
+
+
+def test_memory_bucket_refills():
+    buckets = MemoryBuckets()
+    assert [buckets.take('k', 1, 2, now=100) for _ in range(2)] == [0, 0]
+    assert buckets.take('k', 1, 2, now=100) == pytest.approx(1)
+    assert buckets.take('k', 1, 2, now=101) == 0
+
+
+def test_database_bucket_shared_by_threads(app):
+    buckets = DatabaseBuckets(db, RateLimitBucket)
+    results = []
+    with app.app_context():
+        def take():
+            with app.app_context():
+                results.append(buckets.take('k', 1 / 3600, 5, now=1000))
+        threads = [threading.Thread(target=take) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    # Ровно burst токенов, сколько бы воркеров ни пришло одновременно
+    assert results.count(0) == 5
+
+
+def test_shared_window_counts_across_stores():
+    store = MemoryStateStore()
+    first, second = SharedBuckets(store), SharedBuckets(store)
+    assert [first.take('k', 1, 2, now=10.0), second.take('k', 1, 2, now=10.5)] == [0, 0]
+    assert first.take('k', 1, 2, now=11.0) == pytest.approx(1.0)
+    assert second.take('k', 1, 2, now=12.0) == 0
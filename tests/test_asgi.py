@@ -0,0 +1,80 @@
+import importlib
+import sys
+import os
+
+import pytest
+
+from conftest import png_bytes
+from test_uploads import files_under
+
+
+@pytest.fixture
+def asgi(tmp_path, monkeypatch, news_url):
+    from starlette.testclient import TestClient
+
+    monkeypatch.chdir(tmp_path)
+    for name, value in {
+        'DATABASE_URL': f"sqlite:///{tmp_path / 'asgi.db'}",
+        'NEWS_URL': news_url,
+        'NEWS_CACHE_FILE': '',
+        'ADMISSION_ENABLED': '0',
+        'CHAT_RETENTION_INTERVAL': '0',
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'PASSWORD_HASH_WORKERS': '0',
+        'MEME_MAX_SIZE': '4096',
+    }.items():
+        monkeypatch.setenv(name, value)
+    sys.modules.pop('asgi', None)
+    module = importlib.import_module('asgi')
+
+    from extensions import db
+    app = module.flask_app
+    app.template_folder = app.root_path
+    with app.app_context():
+        db.create_all()
+        module.services.search_backend.ensure_schema()
+    # Без with: lifespan (фоновое обновление новостей) в тестах не запускается
+    yield module, TestClient(module.application)
+
+    module.services.image_pipeline.shutdown(wait=True)
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    sys.modules.pop('asgi', None)
+
+
+def upload(client, data, **kwargs):
+    return client.post('/memes', files={'file': ('meme.png', data, 'image/png')},
+                       data={'description': 'асинхронный мем'}, follow_redirects=False, **kwargs)
+
+
+def test_upload_goes_through_async_route(asgi):
+    module, client = asgi
+    response = upload(client, png_bytes())
+    assert response.status_code == 302
+
+    # Flash из асинхронного маршрута виден в Flask-странице
+    page = client.get('/memes').text
+    assert 'Мем добавлен успешно!' in page
+    assert 'асинхронный мем' in page
+
+
+def test_upload_over_limit_is_rejected(asgi):
+    module, client = asgi
+    big = png_bytes() + b'\0' * 8192
+    assert upload(client, big).status_code == 413
+
+    # Без Content-Length (chunked) лимит проверяется по мере чтения тела
+    body = b'--x\r\nContent-Disposition: form-data; name="file"; filename="m.png"\r\n\r\n' + big + b'\r\n--x--\r\n'
+    response = client.post('/memes', content=iter([body[:1024], body[1024:]]),
+                           headers={'Content-Type': 'multipart/form-data; boundary=x'})
+    assert response.status_code == 413
+    # Ни файла в хранилище, ни брошенных временных файлов
+    store = module.services.upload_store
+    assert files_under(store.root) == []
+    assert files_under(os.path.join(store.work_dir, 'tmp')) == []
+
+
+def test_chat_stream_needs_login(asgi):
+    _, client = asgi
+    assert client.get('/chat/stream').status_code == 401
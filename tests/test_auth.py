@@ -0,0 +1,76 @@
+import time
+
+from conftest import sign_in
+
+
+def wait_for(predicate, timeout=3):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return predicate()
+
+
+def test_profile_edit_drops_cached_user_in_other_workers(make_app, tmp_path):
+    # Два приложения с общим состоянием — как два воркера gunicorn
+    config = {'STATE_BACKEND': 'local', 'STATE_URL': str(tmp_path / 'state.db')}
+    first, second = make_app(**config), make_app(**config)
+    first_client, second_client = first.test_client(), second.test_client()
+    sign_in(first_client)
+    sign_in(second_client)
+
+    # Второй воркер закэшировал пользователя при входе
+    second_client.get('/profile')
+    second_cache = second.extensions['services'].user_cache
+    assert second_cache.get(1) is not None
+
+    first_client.post('/profile/edit', data={'bio': 'Новая подпись'})
+
+    assert first.extensions['services'].user_cache.get(1) is None
+    assert wait_for(lambda: second_cache.get(1) is None)
+    assert 'Новая подпись' in second_client.get('/profile').get_data(as_text=True)
+
+
+def test_shared_session_id_changes_on_login_and_logout(make_app):
+    app = make_app(SESSION_BACKEND='shared')
+    client = app.test_client()
+    cookie_name = app.config['SESSION_COOKIE_NAME']
+    interface = app.session_interface
+
+    def sid():
+        cookie = client.get_cookie(cookie_name)
+        return cookie.value if cookie else None
+
+    # Сессия до входа: в ней уже есть данные (сообщение flash после регистрации)
+    client.post('/register', data={'username': 'alice', 'password': 'secret-password'})
+    anonymous = sid()
+    assert anonymous is not None
+
+    client.post('/login', data={'username': 'alice', 'password': 'secret-password'})
+    signed_in = sid()
+    assert signed_in != anonymous
+    assert interface.load(app, anonymous).new
+    assert interface.load(app, signed_in).get('_user_id') == '1'
+
+    client.get('/logout')
+    assert sid() != signed_in
+    assert interface.load(app, signed_in).new
+
+
+def test_signed_in_pages_do_not_reload_user(app, client):
+    from sqlalchemy import event
+    from extensions import db
+
+    sign_in(client)
+    client.get('/profile')
+    with app.app_context():
+        engine = db.engine
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+    body = client.get('/profile').get_data(as_text=True)
+    assert 'alice' in body
+    assert not [s for s in statements if 'FROM user' in s]
+    # Хэш пароля в кэш не попадает
+    assert 'password_hash' not in app.extensions['services'].user_cache.get(1)
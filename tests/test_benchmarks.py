@@ -0,0 +1,37 @@
+from benchmarks.run import ROUTES, run_client, percentile, print_comparison
+from benchmarks.seed import seed_database, BENCH_PASSWORD
+
+SMALL_VOLUMES = {'users': 3, 'notes': 20, 'diary': 20, 'memes': 15, 'messages': 60}
+
+
+def test_every_route_answers_on_seeded_database(make_app):
+    app = make_app(INSTRUMENTATION_ENABLED=True)
+    with app.app_context():
+        seed_database(SMALL_VOLUMES)
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench_user_1', 'password': BENCH_PASSWORD})
+    for name, method, path, data, auth in ROUTES:
+        response = client.open(path, method=method, data=data)
+        assert response.status_code < 400, name
+
+    results = run_client(app, ROUTES, 2)
+    assert set(results) == {route[0] for route in ROUTES}
+    assert all(r['requests'] == 2 and r['queries'] is not None for r in results.values())
+
+
+def test_percentile_and_regression_check(capsys):
+    assert percentile([], 95) == 0.0
+    assert percentile([0.1, 0.2, 0.3, 0.4], 50) == 0.2
+    assert percentile([0.1, 0.2, 0.3, 0.4], 99) == 0.4
+
+    baseline = {'meta': {'name': 'before'}, 'routes': {
+        'index': {'p50_ms': 1.0, 'p95_ms': 2.0, 'rps': 100.0, 'queries': 1},
+        'memes': {'p50_ms': 1.0, 'p95_ms': 2.0, 'rps': 100.0, 'queries': 2},
+    }}
+    results = {
+        'index': {'p50_ms': 1.0, 'p95_ms': 2.1, 'rps': 100.0, 'queries': 1},
+        'memes': {'p50_ms': 1.0, 'p95_ms': 3.0, 'rps': 60.0, 'queries': 2},
+    }
+    assert print_comparison(results, baseline, 0.10) == 1
+    assert 'РЕГРЕССИЯ' in capsys.readouterr().out
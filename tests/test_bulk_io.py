@@ -0,0 +1,64 @@
+import json
+
+from extensions import db
+from models import DiaryEntry, Note
+from conftest import sign_in
+
+
+def run(app, *args):
+    result = app.test_cli_runner().invoke(args=['data', *args])
+    assert result.exit_code == 0, result.output
+    return result
+
+
+def test_jsonl_import_is_searchable(app, tmp_path):
+    path = tmp_path / 'diary.jsonl'
+    path.write_text('\n'.join(json.dumps(record, ensure_ascii=False) for record in [
+        {'title': 'Таяние ледников', 'content': 'Ледники Гренландии теряют массу'},
+        {'title': 'Без текста'},
+        {'title': 'Засуха', 'content': 'Урожай под угрозой'},
+    ]), encoding='utf-8')
+
+    result = run(app, 'import', 'diary', str(path), '--batch-size', '1')
+    assert 'Импортировано: 2, пропущено: 1' in result.output
+    assert 'строка 2: не заполнены поля: content' in result.output
+
+    with app.app_context():
+        found = app.extensions['services'].search_backend.search('diary', 'ледники', 10)
+        assert [entry.title for entry in found] == ['Таяние ледников']
+
+
+def test_csv_round_trip_maps_users_by_name(app, client, tmp_path):
+    sign_in(client)
+    client.post('/diary', data={'content': 'заметка про климат, с запятой'})
+    client.post('/diary', data={'content': 'вторая заметка'})
+
+    path = tmp_path / 'notes.csv'
+    run(app, 'export', 'notes', str(path))
+    assert path.read_text(encoding='utf-8').splitlines()[0] == 'id,content,user_id,username'
+
+    # Перенос в другую базу: id пользователей там другие, поэтому user_id пустой, остаётся username
+    with app.app_context():
+        db.session.execute(db.delete(Note))
+        db.session.commit()
+    rows = path.read_text(encoding='utf-8').splitlines()
+    path.write_text('\n'.join([rows[0]] + [row.replace(',1,alice', ',,alice') for row in rows[1:]]
+                              + [',ничья заметка,,nobody']), encoding='utf-8')
+
+    result = run(app, 'import', 'notes', str(path))
+    assert 'Импортировано: 2, пропущено: 1' in result.output
+    assert "нет пользователя 'nobody'" in result.output
+    with app.app_context():
+        notes = db.session.execute(db.select(Note).order_by(Note.id)).scalars().all()
+        assert [(note.content, note.user.username) for note in notes] == [
+            ('заметка про климат, с запятой', 'alice'), ('вторая заметка', 'alice')]
+
+
+def test_export_streams_jsonl_to_stdout(app):
+    with app.app_context():
+        db.session.add_all([DiaryEntry(title=f'запись {i}', content='текст') for i in range(3)])
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['data', 'export', 'diary', '-'])
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [record['title'] for record in records] == ['запись 0', 'запись 1', 'запись 2']
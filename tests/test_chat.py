@@ -0,0 +1,72 @@
+import threading
+import time
+
+from chat_broadcast import DatabaseBroadcaster
+from conftest import sign_in
+
+
+def test_messages_polling_after_id(client):
+    sign_in(client)
+    client.post('/chat', data={'content': 'первое'})
+    client.post('/chat', data={'content': 'второе'})
+
+    messages = client.get('/chat/messages?after_id=0').get_json()['messages']
+    assert [m['content'] for m in messages] == ['первое', 'второе']
+    newer = client.get(f"/chat/messages?after_id={messages[0]['id']}").get_json()['messages']
+    assert [m['content'] for m in newer] == ['второе']
+
+
+def test_wsgi_page_polls_instead_of_streaming(client):
+    sign_in(client)
+    body = client.get('/chat').get_data(as_text=True)
+    assert 'EventSource' not in body
+    assert '/chat/messages?after_id=' in body
+    # Поток выключен: 204 останавливает переподключения EventSource
+    assert client.get('/chat/stream').status_code == 204
+
+
+def test_stream_replays_missed_messages(make_app):
+    app = make_app(CHAT_STREAM=True)
+    client = app.test_client()
+    sign_in(client)
+    client.post('/chat', data={'content': 'пропущенное'})
+
+    assert 'EventSource' in client.get('/chat').get_data(as_text=True)
+    response = client.get('/chat/stream?after_id=0', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    first = next(response.response)
+    response.close()
+    assert 'пропущенное' in (first.decode() if isinstance(first, bytes) else first)
+
+
+def test_database_broadcaster_polls_once_for_all_listeners():
+    calls = []
+    lock = threading.Lock()
+
+    def fetch_after(after_id):
+        with lock:
+            calls.append(after_id)
+            if len(calls) == 3:
+                return [{'id': after_id + 1, 'content': 'новое'}]
+        return []
+
+    broadcaster = DatabaseBroadcaster(fetch_after, poll_interval=0.05)
+    results = []
+
+    def listen():
+        results.append(broadcaster.listen(10, timeout=2))
+
+    threads = [threading.Thread(target=listen) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(fresh == [{'id': 11, 'content': 'новое'}] for fresh in results)
+    # Опросы не умножаются на число слушателей
+    assert len(calls) < 20
+    # Без слушателей поток не ходит в базу
+    time.sleep(0.2)
+    idle = len(calls)
+    time.sleep(0.2)
+    assert len(calls) == idle
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+import json
+import os
+
+import pytest
+
+from chat_retention import ChatArchive, ChatRetention, _FileLock, LOCK_FILE, PENDING_FILE
+from extensions import db
+from models import ChatMessage, User
+from conftest import sign_in
+
+
+@pytest.fixture
+def chat_app(make_app, tmp_path):
+    app = make_app(CHAT_ARCHIVE_DIR=str(tmp_path / 'archive'), CHAT_RETENTION_DAYS=30,
+                   CHAT_RETENTION_MAX_MESSAGES=3, CHAT_RETENTION_BATCH=2)
+    with app.app_context():
+        user = User(username='alice', password_hash='-')
+        now = datetime.utcnow()
+        db.session.add_all(
+            [ChatMessage(content=f'старое {i}', user=user, timestamp=datetime(2024, 1 + i % 2, 10 + i))
+             for i in range(3)] +
+            [ChatMessage(content=f'свежее {i}', user=user, timestamp=now - timedelta(minutes=10 - i))
+             for i in range(4)])
+        db.session.commit()
+    return app
+
+
+def contents(app):
+    with app.app_context():
+        return db.session.execute(db.select(ChatMessage.content).order_by(ChatMessage.id)).scalars().all()
+
+
+def test_old_and_excess_messages_move_to_monthly_archive(chat_app):
+    retention = chat_app.extensions['services'].chat_retention
+    retention.pause = 0
+    with chat_app.app_context():
+        assert retention.run_once() == 4
+
+    # Старше 30 дней и всё, что не входит в 3 последних
+    assert contents(chat_app) == ['свежее 1', 'свежее 2', 'свежее 3']
+    archive = retention.archive
+    month = datetime.utcnow().strftime('%Y-%m')
+    assert archive.months() == sorted({'2024-01', '2024-02', month}, reverse=True)
+    records, has_next = archive.page('2024-01', per_page=10)
+    assert [(r['content'], r['username']) for r in records] == [('старое 0', 'alice'), ('старое 2', 'alice')]
+    assert not has_next
+    assert not os.path.exists(os.path.join(archive.root, PENDING_FILE))
+
+    with chat_app.app_context():
+        assert retention.run_once() == 0
+    assert retention.stats()['archived'] == 4
+
+
+def test_batch_left_by_crash_is_deleted_on_next_run(chat_app):
+    retention = chat_app.extensions['services'].chat_retention
+    retention.max_age_days = retention.max_messages = 0
+    with chat_app.app_context():
+        first_id = db.session.execute(db.select(db.func.min(ChatMessage.id))).scalar()
+    os.makedirs(retention.archive.root, exist_ok=True)
+    with open(os.path.join(retention.archive.root, PENDING_FILE), 'w') as f:
+        json.dump([first_id], f)
+
+    with chat_app.app_context():
+        assert retention.run_once() == 0
+    assert 'старое 0' not in contents(chat_app)
+
+
+def test_one_run_at_a_time(chat_app):
+    retention = chat_app.extensions['services'].chat_retention
+    with _FileLock(os.path.join(retention.archive.root, LOCK_FILE)) as acquired:
+        assert acquired
+        with chat_app.app_context():
+            assert retention.run_once() is None
+    assert len(contents(chat_app)) == 7
+
+
+def test_archive_pages_and_cli(chat_app):
+    result = chat_app.test_cli_runner().invoke(args=['chat-retention'])
+    assert 'Перенесено в архив: 4' in result.output
+
+    client = chat_app.test_client()
+    sign_in(client, 'bob')
+    assert '2024-02' in client.get('/chat/archive').get_data(as_text=True)
+    assert 'старое 1' in client.get('/chat/archive/2024-02').get_data(as_text=True)
+    assert client.get('/chat/archive/2023-01').status_code == 404
+    assert client.get('/chat/archive/..%2F..').status_code == 404
+
+
+def test_archive_appends_gzip_members(tmp_path):
+    archive = ChatArchive(str(tmp_path))
+    archive.append('2024-03', [{'id': 1}])
+    archive.append('2024-03', [{'id': 2}, {'id': 3}])
+    assert archive.page('2024-03', per_page=2) == ([{'id': 1}, {'id': 2}], True)
+    assert archive.page('2024-03', page=2, per_page=2) == ([{'id': 3}], False)
+
+
+def test_deleted_pages_returned_to_filesystem(make_app, tmp_path):
+    app = make_app(CHAT_ARCHIVE_DIR=str(tmp_path / 'archive'), CHAT_RETENTION_MAX_MESSAGES=1)
+    retention = app.extensions['services'].chat_retention
+    retention.pause = 0
+    with app.app_context():
+        assert db.session.execute(db.text('PRAGMA auto_vacuum')).scalar() == 2
+        db.session.add_all([ChatMessage(content='х' * 2000) for _ in range(300)])
+        db.session.commit()
+        size = os.path.getsize(tmp_path / 'test.db') + os.path.getsize(tmp_path / 'test.db-wal')
+        assert retention.run_once() == 299
+        db.session.execute(db.text('PRAGMA wal_checkpoint(TRUNCATE)'))
+        db.session.commit()
+    assert os.path.getsize(tmp_path / 'test.db') < size / 2
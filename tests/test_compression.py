@@ -0,0 +1,64 @@
+import gzip
+
+from compression import negotiate, minify_css, supported_encodings
+from http_cache import IMMUTABLE
+
+
+def test_large_page_gzipped_with_its_own_etag(make_app):
+    app = make_app(COMPRESS_MIN_SIZE=100)
+    client = app.test_client()
+
+    plain = client.get('/bot')
+    packed = client.get('/bot', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in plain.headers
+    assert packed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in packed.headers['Vary']
+    assert gzip.decompress(packed.data) == plain.data
+
+    # ETag считается от сжатого тела: у двух вариантов ответа они разные
+    assert packed.headers['ETag'] != plain.headers['ETag']
+    repeat = client.get('/bot', headers={'Accept-Encoding': 'gzip', 'If-None-Match': packed.headers['ETag']})
+    assert repeat.status_code == 304
+
+
+def test_small_bodies_are_not_compressed(make_app):
+    app = make_app(COMPRESS_MIN_SIZE=10 ** 6)
+    response = app.test_client().get('/bot', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_negotiation_and_minify():
+    assert negotiate('gzip;q=0.5, br', ('br', 'gzip')) == 'br'
+    assert negotiate('br;q=0.2, gzip;q=0.8', ('br', 'gzip')) == 'gzip'
+    assert negotiate('gzip;q=0', ('gzip',)) is None
+    assert negotiate('', ('gzip',)) is None
+    assert minify_css('/* шапка */\nbody {\n  color : red ;\n}\n') == 'body{color:red}'
+
+
+def test_assets_build_serves_precompressed_files(make_app, tmp_path):
+    source = tmp_path / 'site.css'
+    source.write_text('body {\n  margin : 0 ;\n}\n', encoding='utf-8')
+    app = make_app(ASSET_SOURCES={'css/site.css': str(source)})
+    # Сборка пишет в static приложения, в тесте — во временный каталог
+    app.static_folder = str(tmp_path / 'static')
+    (tmp_path / 'static' / 'assets').mkdir(parents=True)
+
+    result = app.test_cli_runner().invoke(args=['assets', 'build'])
+    assert result.exit_code == 0, result.output
+    built = app.extensions['asset_manifest']['css/site.css']
+    assert built.startswith('assets/site.') and built.endswith('.css')
+
+    with app.test_request_context():
+        assert app.jinja_env.globals['asset_url']('css/site.css') == f'/static/{built}'
+
+    client = app.test_client()
+    response = client.get(f'/static/{built}', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Cache-Control'] == IMMUTABLE
+    assert response.mimetype == 'text/css'
+    assert gzip.decompress(response.data) == b'body{margin:0}'
+    response.close()
+    if 'br' in supported_encodings():
+        response = client.get(f'/static/{built}', headers={'Accept-Encoding': 'br, gzip'})
+        assert response.headers['Content-Encoding'] == 'br'
+        response.close()
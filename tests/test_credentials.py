@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from credentials import CredentialService, CredentialsBusy, normalize_method
+
+
+def test_inline_hash_and_verify():
+    service = CredentialService(method='pbkdf2:sha256:1000', workers=0)
+    pwhash = service.hash('секрет')
+    assert pwhash.startswith('pbkdf2:sha256:1000$')
+    assert service.verify(pwhash, 'секрет') == (True, None)
+    assert service.verify(pwhash, 'другой') == (False, None)
+
+
+def test_outdated_hash_is_replaced_on_login():
+    old = CredentialService(method='pbkdf2:sha256:1000', workers=0).hash('секрет')
+    service = CredentialService(method='pbkdf2:sha256:2000', workers=0)
+    ok, new_hash = service.verify(old, 'секрет')
+    assert ok and new_hash.startswith('pbkdf2:sha256:2000$')
+    assert service.stats()['rehashed'] == 1
+
+
+def test_default_method_is_scrypt():
+    assert CredentialService(workers=0).method == normalize_method('scrypt') == 'scrypt:32768:8:1'
+
+
+def test_pool_uses_safe_start_method_and_is_created_upfront():
+    service = CredentialService(method='pbkdf2:sha256:1000', workers=1)
+    try:
+        assert service._executor is not None
+        assert service._executor._mp_context.get_start_method() in ('forkserver', 'spawn')
+        pwhash = service.hash('секрет')
+        assert service.verify(pwhash, 'секрет') == (True, None)
+    finally:
+        service.shutdown()
+
+
+def test_full_queue_rejects_and_frees_slots():
+    release = threading.Event()
+    started = threading.Event()
+    service = CredentialService(workers=0, max_pending=1)
+
+    def slow(*args):
+        started.set()
+        release.wait(5)
+        return 'ok'
+
+    worker = threading.Thread(target=service._run, args=(slow,))
+    worker.start()
+    started.wait(5)
+    with pytest.raises(CredentialsBusy):
+        service._run(slow)
+    release.set()
+    worker.join()
+    assert service.stats()['rejected'] == 1
+    assert service._run(lambda: 'снова') == 'снова'
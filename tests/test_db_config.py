@@ -0,0 +1,40 @@
+from flask import Flask
+
+from db_config import configure_database, DEFAULT_DATABASE_URI
+
+
+def configured_uri(config=None):
+    app = Flask(__name__)
+    app.config.update(config or {})
+    configure_database(app)
+    return app.config['SQLALCHEMY_DATABASE_URI']
+
+
+def test_explicit_uri_wins_over_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:////nonexistent/env.db')
+    uri = f"sqlite:///{tmp_path / 'explicit.db'}"
+    assert configured_uri({'SQLALCHEMY_DATABASE_URI': uri}) == uri
+
+
+def test_database_url_is_fallback(monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:////srv/gw/env.db')
+    assert configured_uri() == 'sqlite:////srv/gw/env.db'
+    monkeypatch.delenv('DATABASE_URL')
+    assert configured_uri() == DEFAULT_DATABASE_URI
+
+
+def test_file_sqlite_gets_pool_and_timeout(monkeypatch):
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:////srv/gw/app.db'
+    configure_database(app)
+    options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    assert options['connect_args']['check_same_thread'] is False
+    assert options['connect_args']['timeout'] == app.config['SQLITE_PRAGMAS']['busy_timeout'] / 1000
+    assert options['pool_size'] > 1
+
+
+def test_app_uses_wal(app):
+    from extensions import db
+    with app.app_context():
+        assert db.session.execute(db.text('PRAGMA journal_mode')).scalar() == 'wal'
@@ -0,0 +1,56 @@
+import json
+import os
+
+from faq import FaqEngine
+
+
+def write_faq(path, faq, mtime=None):
+    path.write_text(json.dumps(faq, ensure_ascii=False), encoding='utf-8')
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_answer_needs_every_key_word_in_any_form(tmp_path):
+    path = tmp_path / 'faq.json'
+    write_faq(path, {'загрязнение воды': 'вода', 'засуха': 'засуха', 'и': 'союз'})
+    engine = FaqEngine(str(path))
+
+    assert engine.find('Откуда берётся загрязнение воды?') == ['вода']
+    assert engine.find('Чем опасны засухи') == ['засуха']
+    assert engine.find('загрязнение') == []
+    # Ключи из одних коротких слов в индекс не попадают
+    assert len(engine) == 2
+
+
+def test_index_is_built_on_first_question(tmp_path):
+    path = tmp_path / 'faq.json'
+    write_faq(path, {'засуха': 'засуха'})
+    engine = FaqEngine(str(path))
+    path.unlink()
+
+    assert engine._mtime is None
+    write_faq(path, {'засуха': 'засуха'})
+    assert engine.find('засуха') == ['засуха']
+
+
+def test_changed_file_is_reloaded(tmp_path):
+    path = tmp_path / 'faq.json'
+    write_faq(path, {'засуха': 'старый ответ'}, mtime=1000)
+    engine = FaqEngine(str(path), reload_interval=0)
+    assert engine.find('засуха') == ['старый ответ']
+
+    write_faq(path, {'засуха': 'новый ответ'}, mtime=2000)
+    assert engine.find('засуха') == ['новый ответ']
+
+    # Битый файл не ломает ответы: остаётся прежний индекс
+    path.write_text('{', encoding='utf-8')
+    os.utime(path, (3000, 3000))
+    assert engine.find('засуха') == ['новый ответ']
+
+
+def test_bot_page_answers(client):
+    response = client.post('/bot', data={'question': 'Как помогает озеленение городов?'})
+    assert 'снижать температуру' in response.get_data(as_text=True)
+
+    response = client.post('/bot', data={'question': 'абракадабра'})
+    assert 'пока не знаю ответа' in response.get_data(as_text=True)
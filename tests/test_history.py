@@ -0,0 +1,67 @@
+from datetime import datetime
+import re
+
+from sqlalchemy import event
+
+from conftest import sign_in
+
+
+def count_queries(engine):
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_chat_history_pages_by_timestamp_and_id(make_app):
+    app = make_app(CHAT_PER_PAGE=3)
+    client = app.test_client()
+    sign_in(client)
+    sign_in(client, 'bob')
+
+    from extensions import db
+    from models import ChatMessage, User
+    with app.app_context():
+        users = User.query.order_by(User.id).all()
+        # Одинаковое время: порядок внутри секунды задаёт id
+        same_second = datetime(2024, 1, 1, 12, 0, 0)
+        for i in range(7):
+            db.session.add(ChatMessage(content=f'сообщение {i}', user=users[i % 2], timestamp=same_second))
+        db.session.commit()
+
+    seen = []
+    url = '/chat'
+    with app.app_context():
+        statements = count_queries(db.engine)
+    while url:
+        statements.clear()
+        body = client.get(url).get_data(as_text=True)
+        seen = re.findall(r'сообщение \d', body) + seen
+        # Автор подгружается тем же запросом, а не по запросу на сообщение
+        assert len([s for s in statements if 'chat_message' in s]) == 1
+        link = re.search(r'href="(/chat\?before=\d+)"', body)
+        url = link.group(1) if link else None
+
+    assert seen == [f'сообщение {i}' for i in range(7)]
+
+
+def test_diary_pages_only_own_notes(make_app):
+    app = make_app(DIARY_PER_PAGE=2)
+    client = app.test_client()
+    sign_in(client, 'bob')
+    client.post('/diary', data={'content': 'чужая заметка'})
+    client.get('/logout')
+    sign_in(client)
+    for i in range(5):
+        client.post('/diary', data={'content': f'заметка {i}'})
+
+    seen = []
+    url = '/diary'
+    while url:
+        body = client.get(url).get_data(as_text=True)
+        page = re.findall(r'(?:заметка \d|чужая заметка)', body)
+        assert len(page) <= 2
+        seen += page
+        link = re.search(r'href="(/diary\?before=\d+)"', body)
+        url = link.group(1) if link else None
+
+    assert seen == [f'заметка {i}' for i in reversed(range(5))]
@@ -0,0 +1,40 @@
+from conftest import sign_in
+
+
+def test_public_page_revalidates_with_etag(client):
+    response = client.get('/bot')
+    assert response.headers['Cache-Control'] == 'public, max-age=300'
+    assert 'Cookie' in response.headers['Vary']
+    etag = response.headers['ETag']
+
+    repeat = client.get('/bot', headers={'If-None-Match': etag})
+    assert repeat.status_code == 304
+    assert repeat.data == b''
+
+
+def test_signed_in_pages_are_private(client):
+    sign_in(client)
+    assert client.get('/bot').headers['Cache-Control'] == 'private, no-cache'
+
+
+def test_post_and_no_store_pages_have_no_etag(client):
+    response = client.post('/bot', data={'question': 'засуха'})
+    assert 'ETag' not in response.headers
+    stats = client.get('/stats')
+    assert stats.headers['Cache-Control'] == 'no-store'
+    assert 'ETag' not in stats.headers
+
+
+def test_policy_overridden_from_config(make_app):
+    app = make_app(HTTP_CACHE_POLICIES={'bot.bot': 'public, max-age=5'})
+    assert app.test_client().get('/bot').headers['Cache-Control'] == 'public, max-age=5'
+    # Настройка одного приложения не меняет политики другого
+    assert make_app().test_client().get('/bot').headers['Cache-Control'] == 'public, max-age=300'
+
+
+def test_static_policies():
+    from http_cache import HttpCache, IMMUTABLE, STATIC_POLICY
+    cache = HttpCache()
+    assert cache.static_policy('uploads/ab/cd/abcd.png') == IMMUTABLE
+    assert cache.static_policy('assets/site.1a2b.css') == IMMUTABLE
+    assert cache.static_policy('mem1.png') == STATIC_POLICY
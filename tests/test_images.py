@@ -0,0 +1,55 @@
+import io
+import os
+
+from PIL import Image
+
+from extensions import db
+from images import build_variants, remove_variants, ImagePipeline
+from models import Meme
+from conftest import sign_in, png_bytes
+
+
+def test_variants_in_webp_and_source_format(tmp_path):
+    (tmp_path / 'wide.png').write_bytes(png_bytes(size=(800, 400)))
+
+    meta = build_variants(str(tmp_path), 'wide.png')
+
+    assert (meta['width'], meta['height']) == (800, 400)
+    assert [(v['width'], v['type']) for v in meta['variants']] == [
+        (300, 'image/webp'), (300, 'image/png'), (600, 'image/webp'), (600, 'image/png')]
+    with Image.open(tmp_path / 'variants' / 'wide_300.webp') as image:
+        assert image.size == (300, 150)
+
+    remove_variants(str(tmp_path), meta['variants'])
+    assert os.listdir(tmp_path / 'variants') == []
+
+
+def test_small_image_is_not_upscaled(tmp_path):
+    (tmp_path / 'small.png').write_bytes(png_bytes(size=(100, 50)))
+    meta = build_variants(str(tmp_path), 'small.png')
+    assert {v['width'] for v in meta['variants']} == {100}
+
+
+def test_pipeline_counts_failures():
+    pipeline = ImagePipeline(max_workers=1)
+
+    def fail():
+        raise ValueError('битый файл')
+
+    pipeline.submit(fail).exception()
+    pipeline.submit(lambda: None).result()
+    pipeline.shutdown(wait=True)
+    assert pipeline.stats() == {'pending': 0, 'processed': 1, 'failed': 1}
+
+
+def test_uploaded_meme_gets_variants_in_background(app, client):
+    sign_in(client)
+    client.post('/memes', data={'file': (io.BytesIO(png_bytes(size=(640, 480))), 'meme.png'),
+                                'description': 'мем'}, content_type='multipart/form-data')
+    app.extensions['services'].image_pipeline.shutdown(wait=True)
+
+    with app.app_context():
+        meme = db.session.execute(db.select(Meme)).scalar_one()
+        assert (meme.width, meme.height) == (640, 480)
+        assert len(meme.variants) == 4
+    assert 'srcset=' in client.get('/memes').get_data(as_text=True)
@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from instrumentation import SlowRequestProfiler
+from extensions import instrumentation
+
+
+@pytest.fixture
+def instrumented(make_app, tmp_path):
+    app = make_app(INSTRUMENTATION_ENABLED=True, PROFILER_TOKEN='секрет'.encode().hex(),
+                   PROFILER_DIR=str(tmp_path / 'profiles'))
+    yield app
+    instrumentation.profiler.disable()
+
+
+def test_metrics_and_server_timing(make_app, instrumented):
+    # Сборщики другого приложения в /metrics не попадают
+    make_app()
+    client = instrumented.test_client()
+    response = client.get('/bot')
+    assert response.headers['Server-Timing'].startswith('app;dur=')
+
+    metrics = client.get('/metrics').get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{endpoint="bot.bot",method="GET",status="200"}' in metrics
+    assert metrics.count('\nmemes_total ') == 1
+    assert 'admission_in_flight' in metrics
+
+
+def test_profiler_switch_needs_token(make_app, instrumented):
+    assert make_app(INSTRUMENTATION_ENABLED=True).test_client().post('/metrics/profiler').status_code == 404
+
+    client = instrumented.test_client()
+    token = instrumented.config['PROFILER_TOKEN']
+    assert client.post('/metrics/profiler', data={'enabled': '1'}).status_code == 403
+    assert client.post('/metrics/profiler', data={'enabled': '1'},
+                       headers={'Authorization': 'Bearer wrong'}).status_code == 403
+
+    response = client.post('/metrics/profiler', data={'enabled': '1', 'threshold': '0.5'},
+                           headers={'Authorization': f'Bearer {token}'})
+    assert response.get_json() == {'enabled': True, 'threshold': 0.5}
+    assert instrumentation.profiler.enabled
+
+
+def test_slow_request_stacks_are_dumped_and_rotated(tmp_path):
+    profiler = SlowRequestProfiler(threshold=0.01, interval=0.001, output_dir=str(tmp_path), max_dumps=1)
+    profiler.enable()
+    try:
+        for _ in range(2):
+            profiler.begin()
+            time.sleep(0.05)
+            profiler.end('main.index', 0.05)
+        # Быстрый запрос не сохраняется
+        profiler.begin()
+        profiler.end('main.index', 0.001)
+    finally:
+        profiler.disable()
+
+    assert profiler.dumped == 2
+    dumps = list(tmp_path.iterdir())
+    assert len(dumps) == 1
+    assert dumps[0].name.startswith('main.index-')
+    assert 'test_slow_request_stacks_are_dumped_and_rotated' in dumps[0].read_text(encoding='utf-8')
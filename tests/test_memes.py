@@ -0,0 +1,74 @@
+import re
+
+from extensions import db
+from models import Meme
+
+
+def add_memes(app, count):
+    with app.app_context():
+        db.session.add_all([Meme(filename=f'm{i}.png', description=f'мем №{i}') for i in range(1, count + 1)])
+        db.session.commit()
+
+
+def shown(body):
+    return [int(n) for n in re.findall(r'<p>мем №(\d+)</p>', body)]
+
+
+def links(body):
+    return dict(re.findall(r'href="/memes\?(\w+)=(\d+)"', body))
+
+
+def test_cursor_pages_go_forward_and_back(app, client):
+    add_memes(app, 25)
+
+    first = client.get('/memes').get_data(as_text=True)
+    assert shown(first) == list(range(1, 11))
+    assert links(first) == {'after': '10'}
+
+    second = client.get('/memes?after=10').get_data(as_text=True)
+    assert shown(second) == list(range(11, 21))
+    assert links(second) == {'before': '11', 'after': '20'}
+
+    third = client.get('/memes?after=20').get_data(as_text=True)
+    assert shown(third) == list(range(21, 26))
+
+    # «Назад» с третьей страницы ведёт на вторую, а не на первую
+    back = client.get('/memes?before=21').get_data(as_text=True)
+    assert shown(back) == list(range(11, 21))
+    assert links(back) == {'before': '11', 'after': '20'}
+
+    start = client.get('/memes?before=11').get_data(as_text=True)
+    assert shown(start) == list(range(1, 11))
+    assert 'Назад' not in start
+
+
+def test_count_follows_commits_of_current_app(make_app):
+    make_app()  # слушатели не должны привязываться к первому созданному приложению
+    app = make_app()
+    repo = app.extensions['services'].meme_repo
+    with app.app_context():
+        assert repo.count() == 0
+        db.session.add(Meme(filename='a.png', description='a'))
+        db.session.add(Meme(filename='b.png', description='b'))
+        db.session.commit()
+        assert repo.count() == 2
+
+        db.session.delete(db.session.get(Meme, 1))
+        db.session.rollback()
+        assert repo.count() == 2
+
+        db.session.delete(db.session.get(Meme, 1))
+        db.session.commit()
+        assert repo.count() == 1
+
+
+def test_list_cache_dropped_after_commit(app, client):
+    add_memes(app, 3)
+    assert 'мем №3' in client.get('/memes').get_data(as_text=True)
+    add_memes_after = Meme(filename='new.png', description='свежий мем')
+    with app.app_context():
+        db.session.add(add_memes_after)
+        db.session.commit()
+    body = client.get('/memes').get_data(as_text=True)
+    assert 'свежий мем' in body
+    assert 'Всего мемов: 4' in body
@@ -0,0 +1,69 @@
+import time
+
+from news_cache import NewsCache, fetch_news, news_version
+
+
+def feed(prefix, count=6):
+    return [{'title': f'{prefix} {i}', 'link': f'https://tass.ru/{prefix}/{i}'} for i in range(count)]
+
+
+def test_fetch_parses_stub_feed(news_url):
+    news = fetch_news(news_url)
+    assert len(news) == 6
+    assert news[0]['title'] == 'Климатическая новость №0'
+    # Относительные ссылки приводятся к адресу ленты
+    assert news[0]['link'] == news_url.split('/tag/')[0] + '/obschestvo/1000'
+
+
+def test_stale_news_served_while_revalidating():
+    calls = []
+
+    def fetcher(url, timeout):
+        calls.append(url)
+        return feed('новая')
+
+    cache = NewsCache(refresh_interval=60, fetcher=fetcher)
+    cache._thread = object()  # без фонового потока: обновления только через revalidate
+    cache._store(feed('старая'))
+    cache._fetched_at = time.time() - 120
+
+    news, version = cache.snapshot()
+    assert news[0]['title'] == 'старая 0'
+    assert version == news_version(feed('старая'))
+    for _ in range(50):
+        if cache.get()[0]['title'] == 'новая 0':
+            break
+        time.sleep(0.02)
+    assert calls and cache.get()[0]['title'] == 'новая 0'
+    assert cache.stats()['stale_hits'] >= 1
+
+
+def test_empty_feed_is_not_cached(app, client):
+    services = app.extensions['services']
+    services.news_cache._thread = object()
+    client.get('/')
+    assert services.render_cache.stats()['size'] == 1  # только блок ссылок
+
+
+def test_fragment_rendered_from_replaced_feed_is_not_served(app, client):
+    services = app.extensions['services']
+    news_cache = services.news_cache
+    news_cache._thread = object()
+    news_cache._store(feed('старая'))
+
+    # Лента обновилась, пока первый запрос рендерил фрагмент по старой версии:
+    # сброс кэша прошёл раньше, чем запрос сохранил свой фрагмент
+    snapshot = news_cache.snapshot
+
+    def racing_snapshot():
+        result = snapshot()
+        news_cache._store(feed('новая'))
+        return result
+
+    news_cache.snapshot = racing_snapshot
+    assert 'старая 0' in client.get('/').get_data(as_text=True)
+    news_cache.snapshot = snapshot
+
+    body = client.get('/').get_data(as_text=True)
+    assert 'новая 0' in body
+    assert 'старая 0' not in body
@@ -0,0 +1,52 @@
+import time
+
+from markupsafe import Markup
+
+from render_cache import RenderCache
+from shared_state import LocalStateStore
+
+
+def counter():
+    calls = []
+
+    def render():
+        calls.append(1)
+        return f'<p>версия {len(calls)}</p>'
+    return render, calls
+
+
+def test_disk_level_survives_restart(tmp_path):
+    render, calls = counter()
+    first = RenderCache(cache_dir=str(tmp_path))
+    assert first.get_or_render('memes:page:1', render) == Markup('<p>версия 1</p>')
+
+    # Новый процесс: память пуста, фрагмент берётся с диска
+    restarted = RenderCache(cache_dir=str(tmp_path))
+    assert restarted.get_or_render('memes:page:1', render) == Markup('<p>версия 1</p>')
+    assert restarted.stats()['disk_hits'] == 1
+
+    restarted.invalidate('memes')
+    assert restarted.get_or_render('memes:page:1', render) == Markup('<p>версия 2</p>')
+    assert len(calls) == 2
+
+
+def test_shared_level_and_invalidation_across_workers(tmp_path):
+    path = str(tmp_path / 'state.db')
+    first = RenderCache(store=LocalStateStore(path, poll_interval=0.02))
+    second = RenderCache(store=LocalStateStore(path, poll_interval=0.02))
+    render, calls = counter()
+
+    first.get_or_render('news:v1:0', render)
+    first.get_or_render('memes:page:1', render)
+    # Второй воркер не рендерит то, что уже отрендерил первый
+    assert second.get_or_render('news:v1:0', render) == Markup('<p>версия 1</p>')
+    assert second.stats()['shared_hits'] == 1
+
+    first.invalidate('news')
+    deadline = time.monotonic() + 3
+    while second._memory.get('news:v1:0') is not None and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert second.get_or_render('news:v1:0', render) == Markup('<p>версия 3</p>')
+    # Другие разделы сброс не задел
+    assert second.get_or_render('memes:page:1', render) == Markup('<p>версия 2</p>')
+    assert len(calls) == 3
@@ -0,0 +1,108 @@
+import pytest
+
+from extensions import db, services
+from models import User, Note, DiaryEntry
+
+
+@pytest.fixture(params=['whoosh', 'fts5'])
+def search_app(request, make_app):
+    return make_app(SEARCH_BACKEND=request.param)
+
+
+def add_user(username):
+    user = User(username=username, password_hash='-')
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def test_results_ranked_by_relevance(search_app):
+    with search_app.app_context():
+        db.session.add_all([
+            DiaryEntry(title='Погода', content='Сегодня ледники и облака'),
+            DiaryEntry(title='Ледники тают', content='Ледники Арктики теряют ледники быстрее'),
+            DiaryEntry(title='Океан', content='Ничего про лёд'),
+        ])
+        db.session.commit()
+        rows = services.search_backend.search('diary', 'ледники', 10)
+        assert [row.title for row in rows] == ['Ледники тают', 'Погода']
+
+
+def test_notes_scoped_to_owner(search_app):
+    with search_app.app_context():
+        alice, bob = add_user('alice'), add_user('bob')
+        db.session.add_all([Note(content=f'заметка про ледник {i}', user=bob) for i in range(30)])
+        db.session.add_all([Note(content=f'мой ледник {i}', user=alice) for i in range(3)])
+        db.session.commit()
+
+        rows = services.search_backend.search('note', 'ледник', 10, user_id=alice.id)
+        assert len(rows) == 3
+        assert {row.user_id for row in rows} == {alice.id}
+
+        page = services.search_backend.search('note', 'ледник', 10, offset=10, user_id=bob.id)
+        assert len(page) == 10
+        assert {row.user_id for row in page} == {bob.id}
+
+
+def test_whoosh_note_search_is_bounded(make_app, monkeypatch):
+    from whoosh.searching import Searcher
+
+    app = make_app(SEARCH_BACKEND='whoosh')
+    calls = []
+    original = Searcher.search
+
+    def spy(self, query, **kwargs):
+        calls.append(kwargs)
+        return original(self, query, **kwargs)
+
+    with app.app_context():
+        alice, bob = add_user('alice'), add_user('bob')
+        db.session.add_all([Note(content='ледник', user=bob) for _ in range(50)])
+        db.session.add(Note(content='ледник', user=alice))
+        db.session.commit()
+
+        monkeypatch.setattr(Searcher, 'search', spy)
+        rows = services.search_backend.search('note', 'ледник', 5, offset=5, user_id=alice.id)
+
+    assert rows == []
+    assert calls[-1]['limit'] == 10
+    assert calls[-1]['filter'] is not None
+
+
+def test_existing_notes_indexed_on_first_search(make_app, tmp_path):
+    import shutil
+
+    app = make_app(SEARCH_BACKEND='whoosh')
+    with app.app_context():
+        alice = add_user('alice')
+        db.session.add(Note(content='старая заметка про мерзлоту', user=alice))
+        db.session.commit()
+        alice_id = alice.id
+    # Как после обновления: база с заметками, индекса личных записей ещё нет
+    shutil.rmtree(tmp_path / 'whooshee' / 'note_owned')
+
+    app = make_app(SEARCH_BACKEND='whoosh')
+    with app.app_context():
+        rows = services.search_backend.search('note', 'мерзлоту', 10, user_id=alice_id)
+        assert [row.content for row in rows] == ['старая заметка про мерзлоту']
+
+
+def test_search_page_shows_only_own_notes(make_app):
+    from conftest import sign_in
+
+    app = make_app(SEARCH_BACKEND='whoosh')
+    client = app.test_client()
+    with app.app_context():
+        bob = add_user('bob')
+        db.session.add(Note(content='секрет боба про айсберг', user=bob))
+        db.session.commit()
+
+    sign_in(client, 'alice')
+    with app.app_context():
+        alice = db.session.execute(db.select(User).filter_by(username='alice')).scalar_one()
+        db.session.add(Note(content='заметка алисы про айсберг', user=alice))
+        db.session.commit()
+
+    body = client.get('/search?q=айсберг').get_data(as_text=True)
+    assert 'заметка алисы' in body
+    assert 'секрет боба' not in body
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.resp_stub import start_resp_stub
+from shared_state import create_state_store
+from conftest import sign_in
+
+
+@pytest.fixture(scope='module')
+def resp_url():
+    server, url = start_resp_stub()
+    yield url
+    server.shutdown()
+
+
+# Два экземпляра на одном хранилище — как два воркера
+@pytest.fixture(params=['memory', 'local', 'resp'])
+def stores(request, tmp_path):
+    name = request.param
+    if name == 'memory':
+        store = create_state_store('memory', prefix='t:')
+        pair = (store, store)
+    else:
+        url = str(tmp_path / 'state.db') if name == 'local' else request.getfixturevalue('resp_url')
+        prefix = f't{time.monotonic_ns()}:'
+        pair = (create_state_store(name, url, prefix), create_state_store(name, url, prefix))
+    yield pair
+    for store in pair:
+        store.close()
+
+
+def test_keys_expire_and_delete_by_prefix(stores):
+    first, second = stores
+    first.set('a', 'значение')
+    first.set('*glob', b'1')
+    first.set('*other', b'2')
+    first.set('brief', b'x', ttl=0.05)
+    assert second.get('a') == 'значение'.encode()
+    assert second.get('brief') == b'x'
+    time.sleep(0.1)
+    assert second.get('brief') is None
+
+    # Символы шаблона в префиксе понимаются буквально
+    second.delete_prefix('*g')
+    assert first.get('*glob') is None
+    assert first.get('*other') == b'2'
+    first.delete('a')
+    assert second.get('a') is None
+
+
+def test_counters_are_atomic(stores):
+    first, second = stores
+
+    def bump(store):
+        for _ in range(50):
+            store.incr('hits', ttl=60)
+
+    threads = [threading.Thread(target=bump, args=(store,)) for store in stores for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert first.incr('hits', 0) == 200
+
+
+def test_messages_reach_other_instance(stores):
+    first, second = stores
+    received = threading.Event()
+    payloads = []
+    second.subscribe('news', lambda payload: (payloads.append(payload), received.set()))
+    time.sleep(0.3)  # поток подписки успевает подключиться
+
+    first.publish('news', 'обновление')
+    assert received.wait(3)
+    assert payloads == ['обновление']
+
+
+def test_chat_message_reaches_other_worker(make_app, tmp_path):
+    config = {'STATE_BACKEND': 'local', 'STATE_URL': str(tmp_path / 'state.db'), 'CHAT_BROADCASTER': 'shared'}
+    first, second = make_app(**config), make_app(**config)
+    client = first.test_client()
+    sign_in(client)
+
+    client.post('/chat', data={'content': 'привет всем воркерам'})
+    messages = second.extensions['services'].chat_broadcaster.listen(0, timeout=3)
+    assert [m['content'] for m in messages] == ['привет всем воркерам']
+
+
+def test_unknown_backend_falls_back_to_memory():
+    assert create_state_store('etcd').name == 'memory'
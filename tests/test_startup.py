@@ -0,0 +1,26 @@
+import json
+
+from benchmarks.startup import LAZY_MODULES, _run
+
+PROBE = (
+    "import sys, json\n"
+    "from app import create_app\n"
+    "create_app()\n"
+    "print(json.dumps(sorted(m for m in sys.modules if m.split('.')[0] in {roots!r})))\n"
+)
+
+
+def loaded_after_start(workdir, roots):
+    proc = _run(PROBE.format(roots=set(roots)), str(workdir))
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+# Тяжёлые зависимости (ТАСС, картинки, миграции, ASGI) не грузятся при старте
+def test_create_app_does_not_import_lazy_modules(tmp_path):
+    assert loaded_after_start(tmp_path, LAZY_MODULES) == []
+
+
+# С поиском FTS5 Whoosh не нужен: стеммер бота загрузится с первым вопросом
+def test_fts5_start_skips_whoosh(tmp_path, monkeypatch):
+    monkeypatch.setenv('SEARCH_BACKEND', 'fts5')
+    assert loaded_after_start(tmp_path, ('whoosh', 'flask_whooshee')) == []
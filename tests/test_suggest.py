@@ -0,0 +1,86 @@
+import threading
+import time
+
+from extensions import db
+from models import DiaryEntry
+from suggest import PrefixTrie, SuggestIndex, terms_of
+
+
+def wait_built(index, rebuilds=1, timeout=3):
+    deadline = time.monotonic() + timeout
+    while index.rebuilds < rebuilds and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert index.rebuilds >= rebuilds
+
+
+def test_trie_ranks_by_weight_then_length():
+    weights = {'ледник': 3, 'ледниковый период': 3, 'лед': 1, 'лето': 5}
+    built = PrefixTrie.from_weights(weights)
+    grown = PrefixTrie()
+    for term, weight in weights.items():
+        grown.add(term, weight)
+
+    for trie in (built, grown):
+        assert trie.complete('ле') == ['лето', 'ледник', 'ледниковый период', 'лед']
+        assert trie.complete('лед', limit=2) == ['ледник', 'ледниковый период']
+        assert trie.complete('мо') == []
+
+
+def test_terms_are_words_and_opening_phrase():
+    # Однобуквенные слова пропускаются и во фразе
+    assert terms_of('Таяние ледников, и засуха!') == {'таяние', 'ледников', 'засуха', 'таяние ледников засуха'}
+
+
+def test_index_builds_in_background_and_completes_last_word():
+    loading = threading.Event()
+
+    def load_texts():
+        loading.wait(3)
+        return ['Таяние ледников', 'Ледники Арктики', 'Засуха']
+
+    index = SuggestIndex(load_texts)
+    # До первой сборки подсказок нет, запрос её не ждёт
+    assert index.suggest('лед') == []
+    loading.set()
+    wait_built(index)
+
+    assert index.suggest('Лед') == ['ледники', 'ледников', 'ледники арктики']
+    # Сначала фразы целиком, затем дополнение последнего слова
+    assert index.suggest('таяние л') == ['таяние ледников', 'таяние ледники']
+    assert index.suggest('арктики з') == ['арктики засуха']
+    assert index.suggest('?!') == []
+
+    index.add_texts(['Ледокол'])
+    assert index.suggest('ледо') == ['ледокол']
+
+
+def test_new_titles_reach_suggestions_after_commit(app, client):
+    assert client.get('/search/suggest?q=мерз').get_json()['suggestions'] == []
+    wait_built(app.extensions['services'].suggest_index)
+
+    with app.app_context():
+        db.session.add(DiaryEntry(title='Вечная мерзлота', content='тает'))
+        db.session.commit()
+    response = client.get('/search/suggest?q=мерз&limit=1')
+    assert response.get_json() == {'query': 'мерз', 'suggestions': ['мерзлота']}
+
+
+def test_repeated_search_served_from_cache(app, client):
+    backend = app.extensions['services'].search_backend
+    calls = []
+    search = backend.backend.search
+    backend.backend.search = lambda *args, **kwargs: calls.append(args) or search(*args, **kwargs)
+    with app.app_context():
+        db.session.add(DiaryEntry(title='Засуха', content='урожай'))
+        db.session.commit()
+
+    for query in ('засуха', 'Засуха!'):
+        assert 'урожай' in client.get(f'/search?q={query}').get_data(as_text=True)
+    assert len(calls) == 2  # diary и meme по одному разу
+
+    # Новая запись сбрасывает кэш после коммита
+    with app.app_context():
+        db.session.add(DiaryEntry(title='Засуха в Африке', content='реки пересохли'))
+        db.session.commit()
+    assert 'реки пересохли' in client.get('/search?q=засуха').get_data(as_text=True)
+    assert len(calls) == 4
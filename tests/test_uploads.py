@@ -0,0 +1,134 @@
+import io
+import os
+
+import pytest
+
+from extensions import db
+from models import Meme, StoredFile
+from conftest import sign_in, png_bytes
+
+
+def upload_meme(client, data, description='мем', filename='meme.png'):
+    return client.post('/memes', data={'file': (io.BytesIO(data), filename), 'description': description},
+                       content_type='multipart/form-data')
+
+
+def stored_files(app):
+    with app.app_context():
+        return {row.path: row.refcount for row in db.session.execute(db.select(StoredFile)).scalars()}
+
+
+def files_under(path):
+    return sorted(os.path.relpath(os.path.join(root, name), path)
+                  for root, _, names in os.walk(path) for name in names)
+
+
+@pytest.fixture
+def user_client(client):
+    sign_in(client)
+    return client
+
+
+def test_identical_uploads_share_one_file(app, user_client):
+    image = png_bytes()
+    upload_meme(user_client, image, 'первый')
+    upload_meme(user_client, image, 'второй')
+    app.extensions['services'].image_pipeline.shutdown(wait=True)
+
+    refs = stored_files(app)
+    assert len(refs) == 1
+    relpath, refcount = next(iter(refs.items()))
+    assert refcount == 2
+    path = app.extensions['services'].upload_store.path(relpath)
+    assert os.path.exists(path)
+
+    with app.app_context():
+        first, second = [meme.id for meme in Meme.query.order_by(Meme.id)]
+    user_client.post(f'/memes/delete/{first}')
+    assert stored_files(app) == {relpath: 1}
+    assert os.path.exists(path)
+
+    user_client.post(f'/memes/delete/{second}')
+    assert stored_files(app) == {}
+    assert not os.path.exists(path)
+
+
+def test_temporary_files_stay_out_of_static(app, user_client):
+    upload_meme(user_client, png_bytes())
+    app.extensions['services'].image_pipeline.shutdown(wait=True)
+
+    storage = app.config['STORAGE_FOLDER']
+    assert not app.config['STORAGE_WORK_DIR'].startswith(os.path.abspath('static'))
+    assert not {'tmp', 'locks'} & set(os.listdir(storage))
+    # Запасные копии убраны после коммита
+    assert os.listdir(os.path.join(app.config['STORAGE_WORK_DIR'], 'tmp')) == []
+
+
+def test_default_work_dir_is_in_instance(make_app):
+    app = make_app(STORAGE_WORK_DIR=None)
+    assert app.config['STORAGE_WORK_DIR'] == os.path.join(app.instance_path, 'storage')
+
+
+def test_failed_commit_releases_new_file(app):
+    from uploads import store_upload
+    from views.memes import add_meme
+    from werkzeug.datastructures import FileStorage
+
+    with app.test_request_context():
+        relpath = store_upload(FileStorage(io.BytesIO(png_bytes()), 'meme.png'))
+        with pytest.raises(Exception):
+            add_meme(relpath, None)  # description NOT NULL: коммит падает
+        assert not os.path.exists(app.extensions['services'].upload_store.path(relpath))
+    assert stored_files(app) == {}
+    assert os.listdir(os.path.join(app.config['STORAGE_WORK_DIR'], 'tmp')) == []
+
+
+def test_failed_commit_keeps_referenced_file(app, user_client):
+    from uploads import store_upload
+    from views.memes import add_meme
+    from werkzeug.datastructures import FileStorage
+
+    image = png_bytes()
+    upload_meme(user_client, image)
+    app.extensions['services'].image_pipeline.shutdown(wait=True)
+    (relpath, _), = stored_files(app).items()
+
+    with app.test_request_context():
+        assert store_upload(FileStorage(io.BytesIO(image), 'again.png')) == relpath
+        with pytest.raises(Exception):
+            add_meme(relpath, None)
+    assert os.path.exists(app.extensions['services'].upload_store.path(relpath))
+    assert stored_files(app) == {relpath: 1}
+
+
+@pytest.mark.parametrize('payload', [b'GIF89a' + b'\0' * 64, b'\xff\xd8\xff' + b'\0' * 64], ids=['gif', 'jpeg'])
+def test_upload_type_taken_from_content(app, user_client, payload):
+    upload_meme(user_client, payload, filename='picture.png')
+    app.extensions['services'].image_pipeline.shutdown(wait=True)
+    (relpath, _), = stored_files(app).items()
+    assert relpath.endswith('.gif' if payload.startswith(b'GIF') else '.jpg')
+
+
+def test_route_limit_rejects_before_storing(make_app):
+    app = make_app(UPLOAD_LIMITS={'memes.memes_page': 4096, 'auth.edit_profile': 1024}, MAX_CONTENT_LENGTH=2048)
+    client = app.test_client()
+    sign_in(client)
+
+    response = upload_meme(client, png_bytes() + b'\0' * 8192)
+    assert response.status_code == 302
+    assert 'Файл слишком большой' in client.get('/memes').get_data(as_text=True)
+    # Маршрут со своим лимитом выше общего MAX_CONTENT_LENGTH принимает файл
+    assert upload_meme(client, png_bytes() + b'\0' * 3000, description='в пределах').status_code == 302
+    app.extensions['services'].image_pipeline.shutdown(wait=True)
+    assert len(stored_files(app)) == 1
+
+    # Остальные маршруты живут с MAX_CONTENT_LENGTH
+    assert client.post('/bot', data={'question': 'х' * 4096}).status_code == 413
+
+
+def test_non_image_rejected_while_parsing(app, user_client):
+    upload_meme(user_client, b'<?php echo 1; ?>' + b'\0' * 64, filename='shell.png')
+    assert 'не похож на изображение' in user_client.get('/memes').get_data(as_text=True)
+    assert stored_files(app) == {}
+    assert files_under(app.config['STORAGE_FOLDER']) == []
+    assert files_under(os.path.join(app.config['STORAGE_WORK_DIR'], 'tmp')) == []
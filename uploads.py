@@ -0,0 +1,113 @@
+# Учёт загруженных файлов: содержимое лежит в ContentStore, а таблица
+# stored_file хранит счётчик ссылок, чтобы одинаковые файлы не дублировались.
+# На маршрутах из UPLOAD_LIMITS файлы из multipart пишутся прямо в хранилище
+# по мере разбора тела (UploadRequest), тип проверяется по первым байтам
+from flask import Request, current_app
+from werkzeug.exceptions import UnsupportedMediaType
+from sqlalchemy.dialects import sqlite, postgresql
+from datetime import datetime
+from extensions import db, services
+from models import StoredFile
+from storage import is_stored_path, PendingUpload
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+# Сигнатуры допустимых форматов; расширение в хранилище берётся отсюда, а не из имени файла
+MAGIC_NUMBERS = {
+    '.png': (b'\x89PNG\r\n\x1a\n',),
+    '.jpg': (b'\xff\xd8\xff',),
+    '.gif': (b'GIF87a', b'GIF89a'),
+}
+
+
+class UploadRejected(UnsupportedMediaType):
+    description = 'Файл не похож на изображение PNG, JPEG или GIF'
+
+
+def sniff_image(head):
+    for ext, signatures in MAGIC_NUMBERS.items():
+        if head.startswith(signatures):
+            return ext
+    raise UploadRejected()
+
+
+def upload_limit(endpoint):
+    return current_app.config['UPLOAD_LIMITS'].get(endpoint)
+
+
+# Лимит размера тела зависит от маршрута; Werkzeug сверяет его с Content-Length
+# до чтения тела, а для chunked-запросов обрывает чтение на лимите
+class UploadRequest(Request):
+    @property
+    def max_content_length(self):
+        if current_app:
+            limit = upload_limit(self.endpoint)
+            if limit is not None:
+                return limit
+        return super().max_content_length
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if filename and upload_limit(self.endpoint) is not None:
+            return services.upload_store.open_pending(sniff_image)
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
+def allowed_file(filename):
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+# INSERT ... ON CONFLICT есть в диалектах SQLite и PostgreSQL
+def upsert(model):
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    return dialect.insert(model)
+
+# Сохраняет загрузку в хранилище и увеличивает счётчик ссылок одним запросом
+def store_upload(file):
+    if isinstance(file.stream, PendingUpload):
+        if file.stream.ext is None:
+            raise UploadRejected()
+        stored = file.stream.commit()
+    else:
+        stored = services.upload_store.save(file.stream, sniff=sniff_image)
+    return record_upload(stored)
+
+# Запасной файл разбирается после коммита или отката (services.settle_uploads)
+def record_upload(stored):
+    db.session.execute(
+        upsert(StoredFile)
+        .values(hash=stored.digest, path=stored.relpath, size=stored.size, refcount=1,
+                created_on=datetime.utcnow())
+        .on_conflict_do_update(index_elements=[StoredFile.hash],
+                               set_={'refcount': StoredFile.refcount + 1})
+    )
+    db.session.info.setdefault('upload_spares', []).append((stored.spare, stored.relpath))
+    return stored.relpath
+
+# Уменьшает счётчик ссылок; возвращает True, если файл больше никому не нужен.
+# Сам файл удаляет remove_unused_upload после коммита
+def release_upload(relpath):
+    if not is_stored_path(relpath):
+        return False
+    db.session.execute(
+        db.update(StoredFile).where(StoredFile.path == relpath).values(refcount=StoredFile.refcount - 1))
+    deleted = db.session.execute(
+        db.delete(StoredFile).where(StoredFile.path == relpath, StoredFile.refcount <= 0))
+    return deleted.rowcount > 0
+
+# Отдельное соединение: проверка не трогает транзакцию сессии
+# и работает из обработчика after_rollback
+def is_referenced(relpath):
+    with db.engine.connect() as conn:
+        found = conn.execute(db.select(StoredFile.hash).where(StoredFile.path == relpath)).first()
+    return found is not None
+
+# Вызывается после коммита release_upload: пока шёл коммит, тот же файл
+# могли загрузить заново, поэтому ссылки перепроверяются под блокировкой
+def remove_unused_upload(relpath, cleanup=None):
+    return services.upload_store.delete_unreferenced(relpath, is_referenced, cleanup)
+
+# Транзакция с record_upload откатилась: запасной файл не нужен, а сам файл удаляется,
+# если на него нет закоммиченных ссылок (его могли загрузить только в этой транзакции)
+def release_failed_upload(spare, relpath):
+    services.upload_store.discard(spare)
+    remove_unused_upload(relpath)
@@ -0,0 +1,4 @@
+# Разделы сайта (blueprints), регистрируются в create_app()
+from views import main, auth, diary, chat, memes, bot, search
+
+BLUEPRINTS = (main.bp, auth.bp, diary.bp, chat.bp, memes.bp, bot.bp, search.bp)
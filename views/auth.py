@@ -0,0 +1,101 @@
+# Регистрация, вход и профиль пользователя
+from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask_login import login_user, login_required, logout_user, current_user
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import make_transient_to_detached
+from extensions import db, login_manager, services
+from models import User
+from uploads import allowed_file, store_upload, release_upload, remove_unused_upload
+
+bp = Blueprint('auth', __name__)
+
+# Хэш пароля в кэш пользователей не кладём, при обращении он догрузится из базы
+USER_CACHE_FIELDS = ('id', 'username', 'avatar', 'bio', 'registered_on')
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    user_cache = services.user_cache
+    data = user_cache.get(user_id)
+    if data is None:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            user_cache.set(user_id, {field: getattr(user, field) for field in USER_CACHE_FIELDS})
+        return user
+
+    user = User(**data)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        username = request.form['username'].strip()
+        password = request.form['password']
+        if not username or not password or len(username) < 3 or len(password) < 6:
+            flash('Имя пользователя и пароль должны быть не короче 3 и 6 символов соответственно.')
+            return redirect(url_for('auth.register'))
+        # Уникальность проверяет сама база: один INSERT вместо SELECT + INSERT
+        new_user = User(username=username)
+        new_user.set_password(password)
+        db.session.add(new_user)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            flash('Пользователь с таким именем уже существует.')
+            return redirect(url_for('auth.register'))
+        flash('Регистрация прошла успешно. Войдите в систему.')
+        return redirect(url_for('auth.login'))
+    return render_template('register.html')
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        user = User.query.filter_by(username=username).first()
+        if user and user.check_password(password):
+            if db.session.is_modified(user):
+                db.session.commit()
+            login_user(user)
+            return redirect(url_for('diary.diary'))
+        flash('Неверное имя пользователя или пароль.')
+    return render_template('login.html')
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash('Вы вышли из системы.')
+    return redirect(url_for('main.index'))
+
+@bp.route('/profile')
+@login_required
+def profile():
+    return render_template('profile.html', user=current_user)
+
+@bp.route('/profile/edit', methods=['GET', 'POST'])
+@login_required
+def edit_profile():
+    if request.method == 'POST':
+        bio = request.form.get('bio')
+        avatar_file = request.files.get('avatar')
+
+        if bio:
+            current_user.bio = bio
+
+        old_avatar = None
+        if avatar_file and allowed_file(avatar_file.filename):
+            old_avatar = current_user.avatar
+            current_user.avatar = store_upload(avatar_file)
+
+        unused = bool(old_avatar) and release_upload(old_avatar)
+        db.session.commit()
+        if unused:
+            remove_unused_upload(old_avatar)
+        flash('Профиль обновлён')
+        return redirect(url_for('auth.profile'))
+
+    return render_template('edit_profile.html', user=current_user)
@@ -0,0 +1,19 @@
+# Пример простого бота-ассистента с базовыми ответами
+from flask import Blueprint, render_template, request
+from extensions import services
+
+bp = Blueprint('bot', __name__)
+
+
+@bp.route('/bot', methods=['GET', 'POST'])
+def bot():
+    answer = None
+    if request.method == 'POST':
+        found_answers = services.faq_engine.find(request.form['question'])
+
+        if found_answers:
+            answer = ' '.join(found_answers)
+        else:
+            answer = 'Извините, я пока не знаю ответа на этот вопрос. Попробуйте задать вопрос другими словами.'
+
+    return render_template('bot.html', answer=answer)
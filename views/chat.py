@@ -0,0 +1,107 @@
+# Общий чат: страница с историей и поток новых сообщений (Server-Sent Events)
+from flask import Blueprint, render_template, redirect, url_for, request, jsonify, Response, \
+    stream_with_context, current_app, abort
+from flask_login import login_required, current_user
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import joinedload
+from extensions import db, services
+from models import ChatMessage, message_to_dict, messages_after
+from chat_broadcast import event_stream
+import click
+import re
+
+bp = Blueprint('chat', __name__, cli_group=None)
+
+
+@bp.route('/chat', methods=['GET', 'POST'])
+@login_required
+def chat():
+    services.chat_retention.start(current_app._get_current_object())
+    if request.method == 'POST':
+        content = request.form.get('content')
+        if content:
+            msg = ChatMessage(content=content, user=current_user)
+            db.session.add(msg)
+            db.session.commit()
+            services.chat_broadcaster.publish(message_to_dict(msg))
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify(message_to_dict(msg)), 201
+            return redirect(url_for('chat.chat'))
+
+    # Курсор ?before=<id>: сообщения старше указанного по (timestamp, id)
+    per_page = current_app.config['CHAT_PER_PAGE']
+    query = ChatMessage.query.options(joinedload(ChatMessage.user))
+    before = request.args.get('before', type=int)
+    if before:
+        # Время курсора берём подзапросом: сравнение идёт с тем же значением, что хранится в SQLite
+        cursor_ts = db.select(ChatMessage.timestamp).where(ChatMessage.id == before).scalar_subquery()
+        query = query.filter(or_(
+            ChatMessage.timestamp < cursor_ts,
+            and_(ChatMessage.timestamp == cursor_ts, ChatMessage.id < before)
+        ))
+    messages = (query
+                .order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
+                .limit(per_page + 1)
+                .all())
+    has_more = len(messages) > per_page
+    messages = messages[:per_page][::-1]
+    next_before = messages[0].id if has_more else None
+    return render_template('chat.html', messages=messages, next_before=next_before,
+                           live=not before, stream=current_app.config['CHAT_STREAM'],
+                           poll_interval=current_app.config['CHAT_CLIENT_POLL_INTERVAL'])
+
+@bp.route('/chat/messages')
+@login_required
+def chat_messages():
+    after_id = request.args.get('after_id', 0, type=int)
+    return jsonify(messages=messages_after(after_id))
+
+# Без CHAT_STREAM отвечает 204: EventSource по спецификации не переподключается
+@bp.route('/chat/stream')
+@login_required
+def chat_stream():
+    if not current_app.config['CHAT_STREAM']:
+        return Response(status=204)
+    after_id = request.headers.get('Last-Event-ID', type=int)
+    if after_id is None:
+        after_id = request.args.get('after_id', 0, type=int)
+    stream = event_stream(services.chat_broadcaster, messages_after, after_id)
+    return Response(stream_with_context(stream), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+# Архив: сообщения, перенесённые из таблицы (chat_retention.py), по месяцам
+@bp.route('/chat/archive')
+@login_required
+def chat_archive():
+    return render_template('chat_archive.html', months=services.chat_retention.archive.months(),
+                           month=None, messages=[])
+
+@bp.route('/chat/archive/<month>')
+@login_required
+def chat_archive_month(month):
+    archive = services.chat_retention.archive
+    if not re.fullmatch(r'\d{4}-\d{2}', month) or not archive.exists(month):
+        abort(404)
+    page = max(request.args.get('page', 1, type=int), 1)
+    messages, has_next = archive.page(month, page, current_app.config['CHAT_PER_PAGE'])
+    return render_template('chat_archive.html', months=archive.months(), month=month,
+                           messages=messages, page=page, has_next=has_next)
+
+
+@bp.cli.command('chat-retention')
+@click.option('--setup-vacuum', is_flag=True,
+              help='перевести базу SQLite в auto_vacuum=INCREMENTAL (разовый полный VACUUM)')
+def chat_retention_command(setup_vacuum):
+    """Переносит старые сообщения чата в архив и освобождает место в базе."""
+    retention = services.chat_retention
+    if setup_vacuum:
+        retention.setup_incremental_vacuum()
+        click.echo('auto_vacuum=INCREMENTAL включён')
+    archived = retention.run_once()
+    if archived is None:
+        click.echo('Перенос уже выполняется другим процессом')
+    else:
+        click.echo(f'Перенесено в архив: {archived}')
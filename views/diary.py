@@ -0,0 +1,34 @@
+# Личный дневник: заметки пользователя
+from flask import Blueprint, render_template, redirect, url_for, request, flash, current_app
+from flask_login import login_required, current_user
+from extensions import db
+from models import Note
+
+bp = Blueprint('diary', __name__)
+
+
+@bp.route('/diary', methods=['GET', 'POST'])
+@login_required
+def diary():
+    if request.method == 'POST':
+        content = request.form['content']
+        if content:
+            note = Note(content=content, user=current_user)
+            db.session.add(note)
+            db.session.commit()
+            flash('Заметка добавлена.')
+        else:
+            flash('Нельзя добавить пустую заметку.')
+        return redirect(url_for('diary.diary'))
+
+    # Постраничный вывод по курсору: ?before=<id последней показанной заметки>
+    per_page = current_app.config['DIARY_PER_PAGE']
+    before = request.args.get('before', type=int)
+    query = Note.query.filter(Note.user_id == current_user.id)
+    if before:
+        query = query.filter(Note.id < before)
+    notes = query.order_by(Note.id.desc()).limit(per_page + 1).all()
+    has_more = len(notes) > per_page
+    notes = notes[:per_page]
+    next_before = notes[-1].id if has_more else None
+    return render_template('diary.html', notes=notes, next_before=next_before)
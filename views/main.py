@@ -0,0 +1,224 @@
+# Главная страница и служебная статистика
+from flask import Blueprint, render_template, jsonify
+from markupsafe import Markup
+from extensions import services
+import random
+
+bp = Blueprint('main', __name__)
+
+# Похожие ссылки: список не меняется, строится один раз при импорте
+RELATED_LINKS = [
+    {
+        "title": "Климатические катастрофы участились в 3 раза – Gazeta.ru",
+        "link": "https://www.gazeta.ru/science/news/2025/06/17/26057204.shtml"
+    },
+    {
+        "title": "ООН: апрель стал самым жарким месяцем – news.un.org",
+        "link": "https://news.un.org/ru/story/2024/05/1452116"
+    },
+    {
+        "title": "Изменение климата и пожары в Европе – Copernicus",
+        "link": "https://www.gazeta.ru/science/news/2024/08/15/23690629.shtml"
+    },
+    {
+        "title": "UNEP: ущерб от климата странам Кавказа – report.az",
+        "link": "https://report.az/ru/cop29/unep-izmenenie-klimata-nanosit-znachitelnyj-usherb-shesti-stranam-kavkaza"
+    },
+    {
+        "title": "Арктика тает быстрее, чем ожидалось – National Geographic Россия",
+        "link": "https://nat-geo.ru/news/2025/07/01/arktika-taet-bystree-chem-ozhidalos"
+    },
+    {
+        "title": "Глобальное потепление и его влияние на сельское хозяйство – РИА Новости",
+        "link": "https://ria.ru/20250420/globalnoe-poteplenie-1789563457.html"
+    },
+    {
+        "title": "Как изменения климата влияют на биоразнообразие – WWF Россия",
+        "link": "https://wwf.ru/resources/news/kak-izmeneniya-klimata-vliyayut-na-bioraznoobrazie"
+    },
+    {
+        "title": "Планы России по сокращению выбросов к 2030 году – ТАСС",
+        "link": "https://tass.ru/ekonomika/17483932"
+    },
+    {
+        "title": "Последствия таяния вечной мерзлоты – РИА Новости",
+        "link": "https://ria.ru/20250310/vernaya-morozlota-1788795432.html"
+    },
+    {
+        "title": "Городские зоны риска: как климат меняет города – Коммерсантъ",
+        "link": "https://kommersant.ru/doc/5142459"
+    },
+    {
+        "title": "Климат и здоровье: рост заболеваний из-за жары – Медвестник",
+        "link": "https://medvestnik.ru/content/news/Klimat-i-zdorove-rost-zabolevanij-iz-za-zhary.html"
+    },
+    {
+        "title": "Международные соглашения по климату: что изменилось в 2025 году – РБК",
+        "link": "https://www.rbc.ru/economics/2025/01/15/63bbefad9a79474c0b9a13c7"
+    },
+    {
+        "title": "Инновации в борьбе с изменением климата – Ведомости",
+        "link": "https://www.vedomosti.ru/technology/articles/2025/04/12/985432-innovatsii-v-borbe-s-izmeneniem-klimata"
+    },
+    {
+        "title": "Влияние климатических изменений на Черное море – EcoTimes",
+        "link": "https://ecotimes.ru/novosti/2025/06/07/vliyanie-klimaticheskih-izmenenij-na-chernoe-more"
+    },
+    {
+        "title": "Возобновляемая энергия в России: перспективы и вызовы – Российская газета",
+        "link": "https://rg.ru/2025/03/23/vozobnovljaemaja-energiia-perspektivy.html"
+    },
+    {
+        "title": "Пожары в Сибири: причины и последствия – ТАСС",
+        "link": "https://tass.ru/proisshestviya/17925643"
+    },
+    {
+        "title": "Климат и экономика: как потепление влияет на рынки – Forbes Россия",
+        "link": "https://www.forbes.ru/forbesrussia/491262-klimat-i-ekonomika-kak-poteplenie-vliyaet-na-rynki"
+    },
+    {
+        "title": "Новые технологии улавливания углерода – Наука и жизнь",
+        "link": "https://www.nkj.ru/news/57540/"
+    },
+    {
+        "title": "Пластик и климат: как загрязнение влияет на глобальное потепление – Greenpeace Россия",
+        "link": "https://greenpeace.org/ru/plastik-i-klimat/"
+    },
+    {
+        "title": "Климатические миграции: где люди вынуждены покидать дома – Радио Свобода",
+        "link": "https://www.svoboda.org/a/30952461.html"
+    },
+    {
+        "title": "Лесные пожары и изменение климата: связь и последствия – Экологический Вестник",
+        "link": "https://eco-vestnik.ru/lesnye-pozhary-i-izmenenie-klimata"
+    },
+    {
+        "title": "Глобальная политика по борьбе с изменением климата: итоги и перспективы – Институт мировой экономики и международных отношений",
+        "link": "https://imemo.ru/ru/publ/klimaticheskaya-politika-2025"
+    },
+    {
+        "title": "Эффекты повышения уровня моря для прибрежных регионов России – МГУ Новости",
+        "link": "https://msu.ru/news/2025/06/22/uvelichenie-urovnya-morya"
+    },
+    {
+        "title": "Как малые города адаптируются к изменению климата – Российская газета",
+        "link": "https://rg.ru/2025/05/11/malye-goroda-i-klimaticheskie-izmeneniya.html"
+    },
+    {
+        "title": "Биоразнообразие и климат: что будет с редкими видами – WWF Россия",
+        "link": "https://wwf.ru/resources/news/bioraznoobrazie-i-klimat"
+    },
+    {
+        "title": "Роль океанов в регулировании климата – Научный журнал Nature",
+        "link": "https://nature.com/articles/oceans-climate-regulation-2025"
+    },
+    {
+        "title": "Как городские леса помогают бороться с изменением климата – Экология Сегодня",
+        "link": "https://ecologytoday.ru/urban-forests-climate-2025"
+    },
+    {
+        "title": "Климат и энергетика: переход на зеленую энергетику в России – Энергетический журнал",
+        "link": "https://energyjournal.ru/2025/04/green-energy-russia"
+    },
+    {
+        "title": "Оценка рисков для аграрного сектора из-за климатических изменений – Агробизнес сегодня",
+        "link": "https://agrobiz.ru/climate-risks-2025"
+    },
+    {
+        "title": "Воздействие засухи на водные ресурсы – Водный мир",
+        "link": "https://waterworld.ru/2025/06/drought-impact"
+    },
+    {
+        "title": "Экономические убытки от экстремальных погодных явлений в России – РБК",
+        "link": "https://rbc.ru/economics/2025/07/01/extreme-weather-losses"
+    },
+    {
+        "title": "COP28 в Дубае: ключевые решения и итоги – РИА Новости",
+        "link": "https://ria.ru/20251115/cop28-itogi-1857293472.html"
+    },
+    {
+        "title": "Подготовка к COP28: основные вызовы – ТАСС",
+        "link": "https://tass.ru/obschestvo/18545678"
+    },
+    {
+        "title": "Что ждать от COP28? Аналитика и прогнозы – РБК",
+        "link": "https://www.rbc.ru/ekonomika/2025/10/01/cop28-analitika"
+    },
+    {
+        "title": "COP29: обзор предварительных тем и задач – Ведомости",
+        "link": "https://www.vedomosti.ru/environment/articles/2025/07/20/cop29-obzor"
+    },
+    {
+        "title": "Как Россия готовится к COP29 – Интерфакс",
+        "link": "https://interfax.ru/russia/794853"
+    },
+    {
+        "title": "Влияние решений COP28 на энергетику стран СНГ – Энергетика сегодня",
+        "link": "https://energytoday.ru/news/cop28-vliyanie-na-sng"
+    },
+    {
+        "title": "Главные климатические цели COP28 – ООН Россия",
+        "link": "https://news.un.org/ru/story/2025/11/1502999"
+    },
+    {
+        "title": "COP28: изменение правил торговли углеродными квотами – Коммерсантъ",
+        "link": "https://kommersant.ru/doc/5512345"
+    },
+    {
+        "title": "Отчет по COP29: новые обязательства и финансирование – Всемирный банк",
+        "link": "https://worldbank.org/cop29-report-2026"
+    },
+    {
+        "title": "Эксперты о последствиях COP28 для глобального климата – ЭкоМир",
+        "link": "https://ecomir.ru/analitika/cop28-posledstviya"
+    },
+    {
+        "title": "COP29 и климатическое правосудие: что нового? – Human Rights Watch",
+        "link": "https://hrw.org/ru/news/2026/cop29-klimaticheskoe-pravosudie"
+    },
+    {
+        "title": "Роль молодёжи на COP28 – Молодежный форум ООН",
+        "link": "https://youth.un.org/ru/story/cop28-youth"
+    },
+    {
+        "title": "COP28 и технологии: инновационные решения для климата – Наука и жизнь",
+        "link": "https://nkj.ru/articles/cop28-innovatsii-2025"
+    },
+    {
+        "title": "Критика и ожидания от COP29 – ЭкоПортал",
+        "link": "https://ecoportal.ru/news/2026/cop29-kritika"
+    },
+    {
+        "title": "COP28: как меняются подходы к адаптации к климату – WWF Россия",
+        "link": "https://wwf.ru/resources/news/cop28-adaptaciya"
+    }
+]
+
+
+@bp.route('/')
+def index():
+    news_cache = services.news_cache
+    render_cache = services.render_cache
+    news_cache.start()
+    rand_num = random.randint(3, 6)
+
+    # Блоки страницы берутся из кэша фрагментов; новости сбрасываются при обновлении,
+    # а версия ленты в ключе не даёт закэшировать фрагмент по устаревшей ленте.
+    # Пустая лента (первый запрос до загрузки) не кэшируется вовсе
+    news, version = news_cache.snapshot()
+    render_news = lambda: render_template('_news.html', news=news[:rand_num])
+    if news:
+        news_html = render_cache.get_or_render(f'news:{version}:{rand_num}', render_news)
+    else:
+        news_html = Markup(render_news())
+    links_html = render_cache.get_or_render(
+        'links:all',
+        lambda: render_template('_related_links.html', related_links=RELATED_LINKS),
+        ttl=24 * 3600)
+    return render_template('index.html', news_html=news_html, links_html=links_html)
+
+@bp.route('/stats')
+def stats():
+    return jsonify(news=services.news_cache.stats(), user_cache=services.user_cache.stats(),
+                   memes=services.meme_repo.count(), images=services.image_pipeline.stats(),
+                   render_cache=services.render_cache.stats())
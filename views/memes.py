@@ -0,0 +1,141 @@
+# Мемы и инфографика: лента, загрузка, удаление и фоновая обработка изображений
+from flask import Blueprint, render_template, redirect, url_for, request, flash, current_app
+from flask_login import login_required
+from extensions import db, services
+from models import Meme
+from images import build_variants, remove_variants
+from uploads import allowed_file, store_upload, release_upload, remove_unused_upload
+import click
+import os
+
+bp = Blueprint('memes', __name__, cli_group=None)
+
+# Раздел мемов (статичные примеры)
+memes = [
+    {'filename': 'mem1.png', 'description': 'Экологический мем 1'},
+    {'filename': 'mem2.png', 'description': 'Экологический мем 2'},
+]
+
+
+# Выполняется в пуле потоков, поэтому приложение передаётся явно
+def process_meme_image(app, meme_id):
+    with app.app_context():
+        meme = db.session.get(Meme, meme_id)
+        if meme is None:
+            return
+        # Повторная загрузка того же файла: варианты уже построены
+        twin = Meme.query.filter(Meme.filename == meme.filename, Meme.id != meme.id,
+                                 Meme.variants.isnot(None)).first()
+        if twin:
+            meta = {'width': twin.width, 'height': twin.height, 'variants': twin.variants}
+        else:
+            folder = app.config['STORAGE_FOLDER'] if meme.is_stored else app.config['MEME_FOLDER']
+            meta = build_variants(folder, meme.filename)
+        meme.width = meta['width']
+        meme.height = meta['height']
+        meme.variants = meta['variants']
+        db.session.commit()
+
+@bp.cli.command('memes-backfill')
+def memes_backfill():
+    folder = current_app.config['MEME_FOLDER']
+    # Статичные примеры, лежащие в папке мемов, заносим в базу
+    for example in memes:
+        if os.path.exists(os.path.join(folder, example['filename'])) and \
+                not Meme.query.filter_by(filename=example['filename']).first():
+            db.session.add(Meme(**example))
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    pipeline = services.image_pipeline
+    pending = [meme.id for meme in Meme.query.filter(Meme.variants.is_(None))]
+    futures = [pipeline.submit(process_meme_image, app, meme_id) for meme_id in pending]
+    for future in futures:
+        future.exception()
+    click.echo(f'Обработано мемов: {len(pending)}, ошибок: {pipeline.failed}')
+
+def add_meme(filename, description):
+    meme = Meme(filename=filename, description=description)
+    db.session.add(meme)
+    try:
+        db.session.commit()
+    except Exception:
+        # Откат освобождает только что загруженный файл (services.forget_memes_changes)
+        db.session.rollback()
+        raise
+    services.image_pipeline.submit(process_meme_image, current_app._get_current_object(), meme.id)
+    return meme
+
+
+@bp.route('/memes', methods=['GET', 'POST'])
+def memes_page():
+    if request.method == 'POST':
+        file = request.files.get('file')
+        description = request.form.get('description')
+
+        if not file or file.filename == '':
+            flash('Файл не выбран')
+            return redirect(url_for('memes.memes_page'))
+
+        if not description:
+            flash('Описание не может быть пустым')
+            return redirect(url_for('memes.memes_page'))
+
+        if file and allowed_file(file.filename):
+            try:
+                add_meme(store_upload(file), description)
+                flash('Мем добавлен успешно!')
+            except Exception as e:
+                flash(f'Ошибка загрузки файла: {e}')
+            return redirect(url_for('memes.memes_page'))
+        else:
+            flash('Недопустимый формат файла')
+            return redirect(url_for('memes.memes_page'))
+
+    # ?after=<id> и ?before=<id> — курсоры вперёд и назад, ?page=N — обычная нумерация
+    per_page = 10
+    meme_repo = services.meme_repo
+    after = request.args.get('after', type=int)
+    before = request.args.get('before', type=int)
+    if after is not None:
+        key = f'memes:after:{after}'
+        load_page = lambda: meme_repo.after(after, per_page)
+    elif before is not None:
+        key = f'memes:before:{before}'
+        load_page = lambda: meme_repo.before(before, per_page)
+    else:
+        page = request.args.get('page', 1, type=int)
+        key = f'memes:page:{page}'
+        load_page = lambda: meme_repo.page(page, per_page)
+
+    memes_html = services.render_cache.get_or_render(
+        key, lambda: render_template('_memes_list.html', pagination=load_page()))
+    return render_template('memes.html', memes_html=memes_html)
+
+@bp.route('/memes/delete/<int:meme_id>', methods=['POST'])
+@login_required
+def delete_meme(meme_id):
+    meme_to_delete = db.session.get(Meme, meme_id)
+    if meme_to_delete:
+        filename = meme_to_delete.filename
+        variants = meme_to_delete.variants
+        # Файл из хранилища удаляется, только когда на него не осталось ссылок
+        if meme_to_delete.is_stored:
+            folder = current_app.config['STORAGE_FOLDER']
+            unused = release_upload(filename)
+        else:
+            folder = current_app.config['MEME_FOLDER']
+            unused = True
+        db.session.delete(meme_to_delete)
+        db.session.commit()
+        if unused and meme_to_delete.is_stored:
+            remove_unused_upload(filename, lambda: remove_variants(folder, variants))
+        elif unused:
+            filepath = os.path.join(folder, *filename.split('/'))
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            remove_variants(folder, variants)
+        flash(f'Мем «{meme_to_delete.description}» удалён')
+    else:
+        flash('Мем не найден')
+    return redirect(url_for('memes.memes_page'))
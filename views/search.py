@@ -0,0 +1,68 @@
+# Поиск по дневнику, мемам и заметкам
+from flask import Blueprint, render_template, request, current_app, jsonify
+from flask_login import current_user
+from extensions import services
+import click
+
+bp = Blueprint('search', __name__, cli_group=None)
+
+
+@bp.route('/search')
+def search():
+    search_query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    results = []
+
+    if not search_query:
+        return render_template('search_results.html', results=[], query='')
+
+    per_page = current_app.config['SEARCH_PER_PAGE']
+    offset = (page - 1) * per_page
+    has_next = False
+
+    # По каждому источнику берём на одну запись больше, чтобы понять, есть ли следующая страница
+    sources = ['diary', 'meme']
+    if current_user.is_authenticated:
+        sources.append('note')
+    found = {}
+    for kind in sources:
+        user_id = current_user.id if kind == 'note' else None
+        rows = services.search_backend.search(kind, search_query, per_page + 1, offset, user_id=user_id)
+        has_next = has_next or len(rows) > per_page
+        found[kind] = rows[:per_page]
+
+    # Формируем общий список результатов
+    for entry in found['diary']:
+        results.append({
+            'type': 'diary',
+            'title': entry.title,
+            'content': entry.content
+        })
+    for meme in found['meme']:
+        results.append({
+            'type': 'meme',
+            'filename': meme.filename,
+            'description': meme.description
+        })
+    for note in found.get('note', []):
+        results.append({
+            'type': 'note',
+            'title': 'Заметка',
+            'content': note.content
+        })
+
+    return render_template('search_results.html', results=results, query=search_query,
+                           page=page, has_next=has_next)
+
+# Подсказки для поля поиска: ?q=<набранный текст>
+@bp.route('/search/suggest')
+def suggest():
+    query = request.args.get('q', '')[:100]
+    limit = min(max(request.args.get('limit', 8, type=int), 1), 20)
+    return jsonify(query=query, suggestions=services.suggest_index.suggest(query, limit))
+
+@bp.cli.command('search-reindex')
+def search_reindex():
+    services.search_backend.reindex()
+    services.suggest_index.invalidate()
+    click.echo(f'Поисковый индекс ({services.search_backend.name}) перестроен')
@@ -0,0 +1,7 @@
+# WSGI-точка входа для продакшена: gunicorn -k gthread --threads 8 wsgi:app
+# Страница чата по WSGI опрашивает /chat/messages короткими запросами. Поток SSE
+# (CHAT_STREAM=1) держит поток воркера всё время, пока открыта вкладка, поэтому
+# включается только с воркерами gevent (gunicorn -k gevent) или через asgi.py
+from app import create_app
+
+app = create_app()